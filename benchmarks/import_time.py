@@ -0,0 +1,119 @@
+#!/usr/bin/env python
+"""
+Startup benchmark: how long each script module takes to import and
+whether importing it pulls in a heavy dependency or touches the network.
+
+Each module is imported in a fresh interpreter with sockets disabled, so
+a script that still does work at import time fails loudly instead of
+quietly downloading data.
+
+Usage:
+    python -m benchmarks.import_time
+"""
+import json
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+SCRIPTS_DIR = PROJECT_ROOT / "nyc_bis_scraper" / "scripts"
+
+# Modules a script may only import inside the function that needs them
+HEAVY_MODULES = (
+    "geopandas", "folium", "shapely", "pyproj", "matplotlib", "seaborn",
+    "bs4", "requests", "sqlalchemy",
+)
+
+_PROBE = """
+import json, socket, sys, time
+
+def _blocked(*args, **kwargs):
+    raise RuntimeError("network access during import")
+
+socket.socket.connect = _blocked
+socket.create_connection = _blocked
+
+start = time.perf_counter()
+error = None
+try:
+    __import__({module!r})
+except BaseException as e:
+    error = f"{{type(e).__name__}}: {{e}}"
+seconds = time.perf_counter() - start
+heavy = sorted(m for m in {heavy!r} if m in sys.modules)
+print(json.dumps({{"seconds": seconds, "heavy": heavy, "error": error}}))
+"""
+
+
+def script_modules(scripts_dir=SCRIPTS_DIR):
+    """
+    Dotted names of every script module under nyc_bis_scraper/scripts.
+    """
+    return sorted(
+        ".".join(path.relative_to(PROJECT_ROOT).with_suffix("").parts)
+        for path in scripts_dir.rglob("*.py")
+        if not path.name.startswith("__")
+    )
+
+
+def probe_import(module):
+    """
+    Imports `module` in a fresh interpreter. Returns
+    {"seconds", "heavy", "error"} for that import alone.
+    """
+    code = _PROBE.format(module=module, heavy=HEAVY_MODULES)
+    out = subprocess.run([sys.executable, "-c", code], cwd=PROJECT_ROOT,
+                         capture_output=True, text=True, timeout=120)
+    lines = out.stdout.strip().splitlines()
+    if out.returncode != 0 or not lines:
+        return {"seconds": None, "heavy": [], "error": out.stderr.strip()[-300:]}
+    return json.loads(lines[-1])
+
+
+def time_command(*args):
+    """
+    Wall time of `python run.py <args>` in seconds.
+    """
+    start = time.perf_counter()
+    subprocess.run([sys.executable, "run.py", *args], cwd=PROJECT_ROOT,
+                   capture_output=True, timeout=120, check=True)
+    return time.perf_counter() - start
+
+
+def run(ctx=None):
+    """
+    Probes every script module and the CLI entry points, recording each
+    measurement with the instrumentation layer. Returns the module results.
+    """
+    from nyc_bis_scraper.utils.instrumentation import instrument
+
+    ctx = ctx or {}
+    results = {}
+    for module in script_modules():
+        with instrument(f"startup.import.{module.rsplit('.', 1)[-1]}", **ctx) as m:
+            results[module] = probe_import(module)
+            m["heavy_modules"] = len(results[module]["heavy"])
+        result = results[module]
+        status = "❌ " + result["error"] if result["error"] else ", ".join(result["heavy"]) or "ok"
+        seconds = f"{result['seconds']:.3f}s" if result["seconds"] is not None else "   -  "
+        print(f"  {seconds}  {module}  {status}")
+
+    for args in (["list"], ["--help"]):
+        with instrument(f"startup.cli.{args[0].lstrip('-')}", **ctx):
+            seconds = time_command(*args)
+        print(f"  {seconds:.3f}s  run.py {' '.join(args)}")
+    return results
+
+
+def main():
+    results = run()
+    slow = {m: r for m, r in results.items() if r["heavy"] or r["error"]}
+    if slow:
+        print(f"\n⚠️ {len(slow)} script module(s) import heavy dependencies or fail at import")
+        sys.exit(1)
+    print("\n✅ No script module imports a heavy dependency at import time")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,285 @@
+#!/usr/bin/env python
+"""
+Offline benchmark suite.
+
+Generates synthetic NYC-scale data, serves it through the local API stub
+and times extraction, cleaning, feature building, merging, scoring and
+map building. Every benchmark is recorded with the instrumentation layer
+(wall/CPU time, peak RSS, rows, HTTP requests) into
+benchmarks/results.jsonl tagged with the current git commit, so runs on
+different commits can be compared with --compare.
+
+Usage:
+    python -m benchmarks.run_benchmarks --scale 0.1
+    python -m benchmarks.run_benchmarks --only extract clean --extract-scale 0.01
+    python -m benchmarks.run_benchmarks --compare
+"""
+import argparse
+import os
+import subprocess
+import tempfile
+from datetime import datetime
+from pathlib import Path
+
+import pandas as pd
+
+from benchmarks.synthetic import generate_dataset
+from nyc_bis_scraper.utils import instrumentation
+from nyc_bis_scraper.utils.instrumentation import instrument, print_summary
+
+RESULTS_PATH = Path(__file__).parent / "results.jsonl"
+GROUPS = ["extract", "clean", "features", "merge", "score", "map", "startup"]
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def bench_extract(data, ctx):
+    from benchmarks.stub_server import make_server, point_extractors_at
+    from etl.extract.fetch_footprints import fetch_footprints
+    from etl.extract.fetch_permits import fetch_permits
+    from etl.extract.fetch_pluto import fetch_pluto
+
+    server, base_url, _ = make_server(data)
+    point_extractors_at(base_url)
+    try:
+        for name, fn in (("footprints", fetch_footprints), ("pluto", fetch_pluto),
+                         ("permits", lambda: fetch_permits(where_clause="1=1"))):
+            with instrument(f"extract.{name}", **ctx) as m:
+                m["rows_out"] = len(fn())
+
+        # Same permits, one shard per borough streamed to Parquet
+        from etl.extract.scope import RunScope
+        from nyc_bis_scraper.scripts.extractors.fetch_construction_jobs import fetch_construction_jobs
+
+        with tempfile.TemporaryDirectory() as tmp, instrument("extract.permits_sharded", **ctx) as m:
+            counts = fetch_construction_jobs(RunScope(), output=os.path.join(tmp, "jobs.parquet"), shard_dir=tmp)
+            m["rows_out"] = sum(counts.values())
+
+        from nyc_bis_scraper.scripts.extractors import sales
+
+        sales.SALES_URL = f"{base_url}/resource/{{resource_id}}.json"
+        with tempfile.TemporaryDirectory() as tmp, instrument("extract.sales_streamed", **ctx) as m:
+            since = RunScope.from_values(start_date=data["sales"]["sale_date"].min())
+            m["rows_out"] = sales.write_sales(os.path.join(tmp, "sales.csv"), scope=since)
+
+        # Partitioned sales history: the first refresh pulls five years,
+        # a refresh three days later only the current month plus overlap
+        from etl.load.sales_store import SalesStore
+
+        last_sale = pd.Timestamp(data["sales"]["sale_date"].max())
+        with tempfile.TemporaryDirectory() as tmp:
+            store = SalesStore(tmp)
+            with instrument("extract.sales_store_full", **ctx) as m:
+                m["rows_out"] = store.refresh(sales.fetch_sales_pages, today=last_sale)["fetched"]
+            with instrument("extract.sales_store_incremental", **ctx) as m:
+                m["rows_out"] = store.refresh(sales.fetch_sales_pages, today=last_sale + pd.Timedelta(days=3))["fetched"]
+    finally:
+        server.shutdown()
+
+
+def bench_clean(data, ctx):
+    from benchmarks.stub_server import pluto_attributes
+    from etl.transform.clean_permits import clean_permits
+    from etl.transform.clean_pluto import clean_pluto
+
+    permits = data["permits"].copy()
+    with instrument("clean.permits", rows_in=len(permits), **ctx) as m:
+        m["rows_out"] = len(clean_permits(permits))
+
+    from etl.transform.cost_text import parse_cost_text
+
+    low = permits["estimated_job_cost"].astype(float)
+    quotes = ("Typically $" + (low // 10).astype(int).astype(str) + "–$" + (low // 4).astype(int).astype(str)
+              + " per sq ft, or $" + (low / 1000).round(1).astype(str) + "k per project")
+    with instrument("clean.cost_text", rows_in=len(quotes), **ctx) as m:
+        m["rows_out"] = int(parse_cost_text(quotes)["cost_low"].notna().sum())
+
+    import geopandas as gpd
+    lots = gpd.GeoDataFrame(pluto_attributes(data["lots"]), geometry="geometry", crs="EPSG:4326")
+    with instrument("clean.pluto", rows_in=len(lots), **ctx) as m:
+        m["rows_out"] = len(clean_pluto(lots))
+
+
+def bench_features(data, ctx):
+    from etl.transform.renovation_features import compute_renovation_features
+
+    with instrument("features.renovation", rows_in=len(data["sales"]) + len(data["permits"]), **ctx) as m:
+        data["features"] = compute_renovation_features(data["sales"], data["permits"])
+        m["rows_out"] = len(data["features"])
+
+    from etl.transform.cost_estimates import estimate_permit_costs, reference_bands
+    from nyc_bis_scraper.scripts.pipeline.run_pipeline import load_config
+
+    bin_bbl = data["footprints"][["BIN", "BBL"]]
+    bands = reference_bands(None, load_config()["cost_estimation"]["bands"])
+    with instrument("features.cost_estimates", rows_in=len(data["permits"]), **ctx) as m:
+        estimates = estimate_permit_costs(data["permits"], bin_bbl, data["lots"][["BBL", "LotArea", "BldgArea"]], bands)
+        m["rows_out"] = len(estimates)
+
+
+def bench_merge(data, ctx):
+    from nyc_bis_scraper.scripts.mergers.property_data_merger import merge_property_data
+
+    with tempfile.TemporaryDirectory() as tmp:
+        base = data["footprints"][["BIN", "BBL"]].merge(
+            data["lots"].drop(columns=["geometry", "lon", "lat"], errors="ignore"), on="BBL", how="left")
+        permits = data["permits"].rename(columns={"bin__": "BIN"})
+        sales = data["sales"].assign(BBL=(data["sales"]["borough"] + data["sales"]["block"].str.zfill(5)
+                                          + data["sales"]["lot"].str.zfill(4)))
+        paths = {name: os.path.join(tmp, f"{name}.csv") for name in ("base", "permits", "sales", "master")}
+        base.to_csv(paths["base"], index=False)
+        permits.to_csv(paths["permits"], index=False)
+        sales.to_csv(paths["sales"], index=False)
+
+        with instrument("merge.property_data", rows_in=len(base), **ctx) as m:
+            master = merge_property_data(paths["base"], paths["permits"], paths["sales"], paths["master"])
+            m["rows_out"] = len(master)
+
+        from etl.transform.permit_jobs import aggregate_jobs
+
+        with instrument("merge.permit_jobs", rows_in=len(permits), **ctx) as m:
+            m["rows_out"] = len(aggregate_jobs(permits, "BIN", "job__"))
+
+        from etl.transform.latest_sale import latest_sales
+
+        with instrument("merge.latest_sale", rows_in=len(sales), **ctx) as m:
+            m["rows_out"] = len(latest_sales(sales, "BBL", "sale_date", "sale_price"))
+
+        # Reopening the master: full CSV parse vs. mapping the .feather copy
+        from etl.load.master_store import MasterStore
+
+        with instrument("merge.master_read_csv", **ctx) as m:
+            m["rows_out"] = len(pd.read_csv(paths["master"], dtype=str, low_memory=False))
+        bbls = master["BBL"].dropna().sample(n=min(5_000, master["BBL"].notna().sum()), random_state=0)
+        with instrument("merge.master_open_lookup", rows_in=len(bbls), **ctx) as m:
+            store = MasterStore(os.path.splitext(paths["master"])[0] + ".feather")
+            m["rows_out"] = len(store.lookup(bbls))
+
+        # Day-over-day rebuild: new permits on 1% of buildings, patched into the stored master
+        incremental = os.path.join(tmp, "master_incremental.csv")
+        merge_property_data(paths["base"], paths["permits"], paths["sales"], incremental, incremental=True)
+        new_jobs = base["BIN"].dropna().sample(frac=0.01, random_state=0).astype(str)
+        next_day = os.path.join(tmp, "permits_next_day.csv")
+        pd.concat([permits, pd.DataFrame({"BIN": new_jobs.to_numpy(), "job__": "NEW"})]).to_csv(next_day, index=False)
+        with instrument("merge.master_incremental", rows_in=len(new_jobs), **ctx) as m:
+            m["rows_out"] = len(merge_property_data(paths["base"], next_day, paths["sales"], incremental,
+                                                    incremental=True))
+
+        # Same merge and build_master's joins, pandas vs. DuckDB
+        try:
+            import duckdb  # noqa: F401
+        except ImportError:
+            print("duckdb not installed: skipping the duckdb merge benchmarks")
+        else:
+            from nyc_bis_scraper.scripts.mergers.build_master import join_master
+
+            with instrument("merge.property_data_duckdb", rows_in=len(base), **ctx) as m:
+                m["rows_out"] = len(merge_property_data(paths["base"], paths["permits"], paths["sales"],
+                                                        os.path.join(tmp, "master_duckdb.csv"), engine="duckdb"))
+            # Keys as text, as build_master has them
+            footprints = data["footprints"].drop(columns=["geometry"], errors="ignore").astype({"BIN": str, "BBL": str})
+            lots = data["lots"].assign(geometry=None).astype({"BBL": str})
+            for engine in ("pandas", "duckdb"):
+                with instrument(f"merge.master_join_{engine}", rows_in=len(footprints), **ctx) as m:
+                    m["rows_out"] = len(join_master(footprints, lots, permits.astype({"BIN": str}), sales, engine))
+
+
+def bench_score(data, ctx):
+    from nyc_bis_scraper.scripts.analysis.score import run_profiles
+    from nyc_bis_scraper.scripts.pipeline.run_pipeline import load_config
+
+    if "features" not in data:
+        bench_features(data, ctx)
+    frame = data["features"].merge(
+        data["lots"][["BBL", "ZoneDist1", "LotArea", "BldgArea", "ResidFAR"]], on="BBL", how="left")
+    frame = frame.rename(columns={"permit_date": "issuance_date"})
+    with instrument("score.profiles", rows_in=len(frame), **ctx) as m:
+        leads = run_profiles(frame, load_config()["scoring"])
+        m["rows_out"] = sum(len(v) for v in leads.values())
+
+
+def bench_map(data, ctx, sample=15_000):
+    import json
+
+    import shapely
+
+    from shapely.geometry import mapping
+
+    from etl.transform.geometry_decode import decode_geometries
+
+    # Geometry columns as maps read them back from CSV
+    geoms = data["lots"]["geometry"].to_numpy()
+    for encoding, column in (("wkt", pd.Series(shapely.to_wkt(geoms))),
+                             ("repr", pd.Series([str(mapping(g)) for g in geoms]))):
+        with instrument(f"map.decode_{encoding}", rows_in=len(column), **ctx) as m:
+            decoded, failed = decode_geometries(column)
+            m["rows_out"] = int((~failed).sum())
+
+    lots = data["lots"].sample(n=min(sample, len(data["lots"])), random_state=42)
+    with instrument("map.geojson", rows_in=len(lots), **ctx) as m:
+        geojson = shapely.to_geojson(lots["geometry"].to_numpy())
+        props = lots[["BBL", "ZoneDist1", "YearBuilt"]].to_dict("records")
+        features = [{"type": "Feature", "geometry": json.loads(g), "properties": p} for g, p in zip(geojson, props)]
+        m["rows_out"] = len(features)
+        m["geojson_bytes"] = len(json.dumps({"type": "FeatureCollection", "features": features}))
+
+
+def bench_startup(data, ctx):
+    from benchmarks.import_time import run
+
+    run(ctx)
+
+
+BENCHMARKS = {
+    "extract": bench_extract,
+    "clean": bench_clean,
+    "features": bench_features,
+    "merge": bench_merge,
+    "score": bench_score,
+    "map": bench_map,
+    "startup": bench_startup,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run offline benchmarks on synthetic NYC data")
+    parser.add_argument("--scale", type=float, default=0.1, help="Fraction of full NYC size (1.0 = full city)")
+    parser.add_argument("--extract-scale", type=float, default=0.02,
+                        help="Scale for the HTTP extraction benchmarks (served page by page)")
+    parser.add_argument("--only", nargs="+", choices=GROUPS, help="Benchmark groups to run")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--results", default=str(RESULTS_PATH), help="Results log (JSON lines)")
+    parser.add_argument("--compare", action="store_true", help="Compare the latest run with earlier ones and exit")
+    args = parser.parse_args()
+
+    if args.compare:
+        print_summary(args.results)
+        return
+
+    commit = git_commit()
+    os.environ[instrumentation.RUN_ID_ENV] = f"{commit}-{datetime.now():%Y%m%dT%H%M%S}"
+    instrumentation.RUN_LOG = Path(args.results)
+    groups = args.only or GROUPS
+
+    print(f"Generating synthetic data at scale {args.scale}...")
+    data = generate_dataset(scale=args.scale, seed=args.seed)
+    for group in groups:
+        print(f"\n== {group.upper()} ==")
+        ctx = {"commit": commit, "scale": args.scale}
+        if group == "extract":
+            ctx["scale"] = args.extract_scale
+            BENCHMARKS[group](generate_dataset(scale=args.extract_scale, seed=args.seed), ctx)
+        else:
+            BENCHMARKS[group](data, ctx)
+
+    print()
+    print_summary(args.results)
+
+
+if __name__ == "__main__":
+    main()
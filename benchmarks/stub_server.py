@@ -0,0 +1,218 @@
+"""
+Local HTTP stub that replays NYC Open Data paging for benchmarks.
+
+Serves synthetic frames through the same three protocols the extractors
+speak:
+
+- Socrata SODA   /resource/<id>.json          ($limit/$offset/$select,
+                                               `in (...)` and date $where)
+- Socrata OData  /api/odata/v4/<id>           ($top/$skip/$select, startswith() $filter)
+- ArcGIS REST    /arcgis/.../FeatureServer/0/query
+                 (resultOffset/resultRecordCount/outFields/returnGeometry,
+                  `<field> IN (...)` where, Esri rings)
+
+Other SODA $where clauses (within_box, OR-ed conditions) are not evaluated.
+
+Requests are counted per path so a benchmark can report how many pages
+an extractor needed. `max_page` caps every page the way a server's
+maxRecordCount does, and `drop_requests` closes that many connections
+without answering, for exercising the extractors' paging and retries.
+"""
+import json
+import re
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import shapely
+
+ARCGIS_PATH = "/arcgis/rest/services/MAPPLUTO/FeatureServer/0/query"
+
+
+def _columns(frame, select):
+    if not select:
+        return [c for c in frame.columns if c != "geometry"]
+    wanted = [c.strip() for c in select.split(",")]
+    return [c for c in wanted if c in frame.columns and c != "geometry"]
+
+
+def _odata_filter(frame, expr):
+    """
+    Evaluates `startswith(field,'x') or ...` filters (RunScope boroughs).
+    """
+    if not expr:
+        return frame
+    terms = re.findall(r"startswith\((\w+),'([^']*)'\)", expr)
+    mask = False
+    for field, prefix in terms:
+        mask = mask | frame[field].astype(str).str.startswith(prefix)
+    return frame[mask]
+
+
+def _soda_where(frame, where):
+    """
+    Evaluates the `<field> in ('a', ...)` clauses of a $where (RunScope
+    boroughs) and, in an all-AND $where, `<field> >= / < '<ISO date>'`
+    (date windows, compared as text); everything else passes.
+    """
+    for field, values in re.findall(r"(\w+) in \(([^)]*)\)", where or ""):
+        if field in frame.columns:
+            frame = frame[frame[field].astype(str).isin(re.findall(r"'([^']*)'", values))]
+    if " OR " not in (where or "").upper():
+        for field, op, value in re.findall(r"(\w+) (>=|<) '([^']*)'", where or ""):
+            if field in frame.columns:
+                text = frame[field].astype(str)
+                frame = frame[text >= value if op == ">=" else text < value]
+    return frame
+
+
+def _arcgis_where(frame, where):
+    """
+    Evaluates `1=1` and `<field> IN ('a', ...)` (RunScope boroughs).
+    """
+    match = re.fullmatch(r"\s*(\w+) IN \((.*)\)\s*", where or "")
+    if not match:
+        return frame
+    values = re.findall(r"'([^']*)'", match.group(2))
+    return frame[frame[match.group(1)].astype(str).isin(values)]
+
+
+def _records(page, columns):
+    return json.loads(page[columns].to_json(orient="records", date_format="iso"))
+
+
+def _esri_rings(geom):
+    oriented = shapely.orient_polygons(geom, exterior_cw=True)
+    parts = shapely.get_parts(oriented)
+    rings = []
+    for part in parts:
+        rings.append(shapely.get_coordinates(part.exterior).tolist())
+        rings.extend(shapely.get_coordinates(r).tolist() for r in part.interiors)
+    return rings
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    # Filled in by make_server
+    datasets = {}
+    filtered = {}
+    latency = 0.0
+    max_page = None
+    drops = None
+    counts = Counter()
+
+    def log_message(self, *args):
+        pass
+
+    def _send(self, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _size(self, requested):
+        return min(int(requested), self.max_page or int(requested))
+
+    def do_GET(self):
+        if self.latency:
+            time.sleep(self.latency)
+        url = urlparse(self.path)
+        params = {k: v[0] for k, v in parse_qs(url.query).items()}
+        self.counts[url.path] += 1
+        with self.drops["lock"]:
+            drop = self.drops["left"] > 0
+            self.drops["left"] -= drop
+        if drop:
+            self.close_connection = True
+            return
+
+        if url.path.startswith("/resource/"):
+            key = (url.path, params.get("$where"))
+            if key not in self.filtered:
+                # Every page of a paged pull repeats the same $where
+                self.filtered[key] = _soda_where(self.datasets[url.path[len("/resource/"):-len(".json")]], key[1])
+            frame = self.filtered[key]
+            start, size = int(params.get("$offset", 0)), self._size(params.get("$limit", 1000))
+            page = frame.iloc[start:start + size]
+            return self._send(_records(page, _columns(frame, params.get("$select"))))
+
+        if url.path.startswith("/api/odata/v4/"):
+            frame = _odata_filter(self.datasets[url.path[len("/api/odata/v4/"):]], params.get("$filter"))
+            start, size = int(params.get("$skip", 0)), self._size(params.get("$top", 1000))
+            page = frame.iloc[start:start + size]
+            records = _records(page, _columns(frame, params.get("$select")))
+            if "geometry" in frame.columns:
+                for record, geojson in zip(records, shapely.to_geojson(page["geometry"].to_numpy())):
+                    record["the_geom"] = json.loads(geojson)
+            return self._send({"value": records})
+
+        if url.path == ARCGIS_PATH:
+            frame = _arcgis_where(self.datasets["pluto"], params.get("where"))
+            start, size = int(params.get("resultOffset", 0)), self._size(params.get("resultRecordCount", 2000))
+            page = frame.iloc[start:start + size]
+            out_fields = params.get("outFields")
+            columns = _columns(frame, None if out_fields in (None, "*") else out_fields)
+            if params.get("returnGeometry", "true") == "false":
+                features = [{"attributes": attrs} for attrs in _records(page, columns)]
+            else:
+                features = [
+                    {"attributes": attrs, "geometry": {"rings": _esri_rings(geom)} if geom is not None else None}
+                    for attrs, geom in zip(_records(page, columns), page["geometry"])
+                ]
+            return self._send({"features": features, "exceededTransferLimit": start + size < len(frame)})
+
+        self.send_error(404, f"No stub for {url.path}")
+
+
+def pluto_attributes(lots):
+    """
+    Renames synthetic lot columns to the lowercase MapPLUTO field names.
+    """
+    out = lots.rename(columns={
+        "BBL": "bbl", "LotArea": "lotarea", "BldgArea": "bldgarea", "ResidFAR": "residfar",
+        "ZoneDist1": "zonedist1", "LandUse": "landuse", "UnitsRes": "unitsres",
+        "UnitsTotal": "unitstotal", "YearBuilt": "yearbuilt",
+    })
+    # MapPLUTO stores boroughs as two-letter codes
+    out["borough"] = out["borough"].map({1: "MN", 2: "BX", 3: "BK", 4: "QN", 5: "SI"})
+    return out.drop(columns=["lon", "lat"])
+
+
+def make_server(data, port=0, latency=0.0, max_page=None, drop_requests=0):
+    """
+    Starts the stub on a background thread for a generate_dataset() dict.
+    `latency` adds that many seconds to every response (a remote API);
+    `max_page` and `drop_requests` are described in the module docstring.
+    Returns (server, base_url, request_counts).
+    """
+    footprints = data["footprints"].rename(columns={"BIN": "bin", "BBL": "base_bbl"}).drop(columns=["lot_index"])
+    footprints["base_bbl"] = footprints["base_bbl"].astype(str)
+    datasets = {
+        "5zhs-2jue": footprints,
+        "ipu4-2q9a": data["permits"],
+        "usep-8jbt": data["sales"],
+        "pluto": pluto_attributes(data["lots"]),
+    }
+    handler = type("Handler", (StubHandler,), {
+        "datasets": datasets, "filtered": {}, "counts": Counter(), "latency": latency, "max_page": max_page,
+        "drops": {"left": drop_requests, "lock": threading.Lock()},
+    })
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}", handler.counts
+
+
+def point_extractors_at(base_url):
+    """
+    Redirects the extractor modules' endpoint constants to the stub.
+    """
+    from etl.extract import fetch_footprints, fetch_permits, fetch_pluto
+    from nyc_bis_scraper.scripts.extractors import fetch_construction_jobs
+
+    fetch_footprints.API_ENDPOINT = f"{base_url}/api/odata/v4/5zhs-2jue"
+    fetch_permits.BASE_URL = f"{base_url}/resource/ipu4-2q9a.json"
+    fetch_construction_jobs.BASE_URL = f"{base_url}/resource/ipu4-2q9a.json"
+    fetch_pluto.BASE_URL = f"{base_url}{ARCGIS_PATH}"
@@ -0,0 +1,194 @@
+"""
+Synthetic NYC-scale datasets for benchmarks.
+
+At scale=1.0 this produces roughly the size of the real sources:
+1.1M building footprints on 860k PLUTO lots, 3M DOB permits and 500k
+sales. Keys overlap the way they do in the real data (most lots have one
+building, some several; permits concentrate on a minority of buildings;
+a few percent of permit BINs and sale BBLs match nothing), and polygon
+vertex counts follow a long-tailed distribution with a small share of
+multi-ring lots.
+"""
+import numpy as np
+import pandas as pd
+import shapely
+
+FULL_SIZE = {
+    "lots": 860_000,
+    "footprints": 1_100_000,
+    "permits": 3_000_000,
+    "sales": 500_000,
+}
+
+# borough digit: (share of lots, lon/lat bounding box)
+BOROUGHS = {
+    1: (0.05, (-74.02, 40.70, -73.91, 40.88)),
+    2: (0.10, (-73.93, 40.80, -73.77, 40.92)),
+    3: (0.32, (-74.04, 40.57, -73.86, 40.74)),
+    4: (0.38, (-73.96, 40.54, -73.70, 40.80)),
+    5: (0.15, (-74.26, 40.49, -74.05, 40.65)),
+}
+BOROUGH_NAMES = {1: "MANHATTAN", 2: "BRONX", 3: "BROOKLYN", 4: "QUEENS", 5: "STATEN ISLAND"}
+ZONES = np.array(["R6", "R5", "R4", "R7A", "R3-2", "C4-4", "C2-8", "M1-1", "R8", "R6B"])
+JOB_TYPES = np.array(["A1", "A2", "A3", "NB", "DM", "SG"])
+JOB_TYPE_P = [0.12, 0.55, 0.15, 0.08, 0.05, 0.05]
+NEIGHBORHOODS = np.array([f"NEIGHBORHOOD {i:03d}" for i in range(250)])
+DAY0 = np.datetime64("2019-01-01")
+
+
+def _sizes(scale):
+    return {name: max(10, int(n * scale)) for name, n in FULL_SIZE.items()}
+
+
+def random_polygons(rng, centers, multi_ring_share=0.0):
+    """
+    Star-shaped polygons around `centers` (n x 2 lon/lat) with
+    long-tailed vertex counts. Returns a shapely geometry array; a
+    `multi_ring_share` of them are MultiPolygons with two parts.
+    """
+    n = len(centers)
+    vertices = np.clip(rng.lognormal(np.log(8), 0.6, n), 4, 200).astype(np.int64)
+    ring_len = vertices + 1  # closed rings repeat the first vertex
+    total = ring_len.sum()
+    ring_start = np.repeat(np.cumsum(ring_len) - ring_len, ring_len)
+    step = np.arange(total) - ring_start
+    step = np.where(step == np.repeat(vertices, ring_len), 0, step)
+
+    owner = np.repeat(np.arange(n), ring_len)
+    angle = 2 * np.pi * step / vertices[owner]
+    radius = rng.uniform(5e-5, 2e-4, n)[owner] * rng.uniform(0.7, 1.0, total)
+    radius = np.where(step == 0, radius[ring_start], radius)  # keep rings closed
+    coords = np.column_stack([
+        centers[owner, 0] + radius * np.cos(angle),
+        centers[owner, 1] + radius * np.sin(angle) * 0.76,
+    ])
+    ring_offsets = np.concatenate([[0], np.cumsum(ring_len)])
+    geoms = shapely.from_ragged_array(shapely.GeometryType.POLYGON, coords, (ring_offsets, np.arange(n + 1)))
+
+    multi = rng.random(n) < multi_ring_share
+    if multi.any():
+        shifted = shapely.transform(geoms[multi], lambda xy: xy + 4e-4)
+        geoms[multi] = shapely.multipolygons(np.column_stack([geoms[multi], shifted]))
+    return geoms
+
+
+def generate_lots(rng, n):
+    """
+    PLUTO-like lots: unique BBLs, ~30 lots per block, area/zoning attributes.
+    """
+    boro = rng.choice(list(BOROUGHS), n, p=[v[0] for v in BOROUGHS.values()])
+    boro.sort()
+    # Sequential block/lot numbering within each borough
+    first = np.searchsorted(boro, boro)
+    idx = np.arange(n) - first
+    block, lot = 1 + idx // 30, 1 + idx % 30
+
+    bbox = np.array([BOROUGHS[b][1] for b in range(1, 6)])[boro - 1]
+    centers = np.column_stack([rng.uniform(bbox[:, 0], bbox[:, 2]), rng.uniform(bbox[:, 1], bbox[:, 3])])
+    lot_area = np.round(rng.lognormal(np.log(2500), 0.6, n))
+    return pd.DataFrame({
+        "BBL": boro * 1_000_000_000 + block * 10_000 + lot,
+        "borough": boro,
+        "block": block,
+        "lot": lot,
+        "LotArea": lot_area,
+        "BldgArea": np.round(lot_area * rng.uniform(0, 4, n)),
+        "ResidFAR": rng.choice([0.6, 1.25, 2.0, 3.0, 4.0, 6.02], n),
+        "ZoneDist1": rng.choice(ZONES, n),
+        "LandUse": rng.integers(1, 12, n),
+        "UnitsRes": rng.integers(0, 20, n),
+        "UnitsTotal": rng.integers(0, 25, n),
+        "YearBuilt": rng.integers(1880, 2024, n),
+        "lon": centers[:, 0],
+        "lat": centers[:, 1],
+    })
+
+
+def generate_footprints(rng, lots, n):
+    """
+    Building footprints: ~92% of lots get one building, the rest of the
+    buildings land on lots that already have one.
+    """
+    occupied = rng.permutation(len(lots))[: int(len(lots) * 0.92)]
+    extra = rng.choice(occupied, max(0, n - len(occupied)))
+    lot_idx = np.sort(np.concatenate([occupied, extra])[:n])
+    boro = lots["borough"].to_numpy()[lot_idx]
+    seq = np.arange(n) - np.searchsorted(boro, boro)
+    return pd.DataFrame({
+        "BIN": boro * 1_000_000 + seq + 1,
+        "BBL": lots["BBL"].to_numpy()[lot_idx],
+        "cnstrct_yr": lots["YearBuilt"].to_numpy()[lot_idx],
+        "heightroof": np.round(rng.lognormal(np.log(30), 0.5, n), 1),
+        "lot_index": lot_idx,
+    })
+
+
+def generate_permits(rng, footprints, lots, n):
+    """
+    DOB permits concentrated on a minority of buildings (Zipf-like),
+    with ~3% BINs that match no footprint.
+    """
+    weights = 1 / np.arange(1, len(footprints) + 1) ** 0.6
+    building = rng.choice(rng.permutation(len(footprints)), n, p=weights / weights.sum())
+    lot_idx = footprints["lot_index"].to_numpy()[building]
+    bins = footprints["BIN"].to_numpy()[building].copy()
+    orphan = rng.random(n) < 0.03
+    bins[orphan] = rng.integers(1_900_000, 5_999_999, orphan.sum())
+    issued = DAY0 + rng.integers(0, 6 * 365, n).astype("timedelta64[D]")
+    boro = lots["borough"].to_numpy()[lot_idx]
+    return pd.DataFrame({
+        "bin__": bins.astype(str),
+        "job__": (100_000_000 + np.arange(n)).astype(str),
+        "job_type": rng.choice(JOB_TYPES, n, p=JOB_TYPE_P),
+        "permit_type": rng.choice(["EW", "PL", "EQ", "AL", "NB"], n),
+        "work_type": rng.choice(["PL", "MH", "OT", "SP", "BL"], n),
+        "borough": pd.Series(boro).map(BOROUGH_NAMES).to_numpy(),
+        "block": pd.Series(lots["block"].to_numpy()[lot_idx]).astype(str).str.zfill(5).to_numpy(),
+        "lot": pd.Series(lots["lot"].to_numpy()[lot_idx]).astype(str).str.zfill(5).to_numpy(),
+        "filing_date": (issued - rng.integers(1, 90, n).astype("timedelta64[D]")).astype(str),
+        "issuance_date": issued.astype(str),
+        "estimated_job_cost": np.round(rng.lognormal(np.log(40_000), 1.2, n)),
+    })
+
+
+def generate_sales(rng, lots, n):
+    """
+    Sales: ~15% non-arm's-length ($0) transfers, ~3% unmatched BBLs.
+    """
+    lot_idx = rng.integers(0, len(lots), n)
+    block = lots["block"].to_numpy()[lot_idx].copy()
+    block[rng.random(n) < 0.03] += 90_000
+    price = np.round(rng.lognormal(np.log(900_000), 0.8, n))
+    price[rng.random(n) < 0.15] = 0
+    sold = DAY0 + rng.integers(0, 5 * 365, n).astype("timedelta64[D]")
+    return pd.DataFrame({
+        "borough": lots["borough"].to_numpy()[lot_idx].astype(str),
+        "block": block.astype(str),
+        "lot": lots["lot"].to_numpy()[lot_idx].astype(str),
+        "sale_date": sold.astype("datetime64[s]").astype(str),
+        "sale_price": price.astype(np.int64).astype(str),
+        "neighborhood": rng.choice(NEIGHBORHOODS, n),
+        "building_class_at_time_of_sale": rng.choice(["A1", "A5", "B1", "C0", "D4"], n),
+    })
+
+
+def generate_dataset(scale=1.0, seed=0, geometry=True):
+    """
+    Returns {"lots", "footprints", "permits", "sales"} DataFrames. With
+    `geometry`, lots and footprints carry a shapely `geometry` column.
+    """
+    rng = np.random.default_rng(seed)
+    sizes = _sizes(scale)
+    lots = generate_lots(rng, sizes["lots"])
+    footprints = generate_footprints(rng, lots, sizes["footprints"])
+    if geometry:
+        centers = lots[["lon", "lat"]].to_numpy()
+        lots["geometry"] = random_polygons(rng, centers, multi_ring_share=0.01)
+        offsets = rng.normal(0, 3e-5, (len(footprints), 2))
+        footprints["geometry"] = random_polygons(rng, centers[footprints["lot_index"].to_numpy()] + offsets)
+    return {
+        "lots": lots,
+        "footprints": footprints,
+        "permits": generate_permits(rng, footprints, lots, sizes["permits"]),
+        "sales": generate_sales(rng, lots, sizes["sales"]),
+    }
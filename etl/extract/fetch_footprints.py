@@ -1,26 +1,33 @@
-import requests
-import pandas as pd
 import geopandas as gpd
 from shapely.geometry import shape
 
+from etl.extract.sources import ODataSource
+
 API_ENDPOINT = "https://data.cityofnewyork.us/api/odata/v4/5zhs-2jue"
+GEOMETRY_COLUMN = "the_geom"
+# Unique per footprint (BINs repeat), so $skip paging sees every row once
+ORDER_COLUMN = "doitt_id"
 
-def fetch_footprints(top=10000, skip=0):
-    chunks = []
-    while True:
-        params = {"$top": top, "$skip": skip}
-        print(f"Fetching records: skip={skip}")
-        resp = requests.get(API_ENDPOINT, params=params)
-        if resp.status_code != 200:
-            raise Exception(f"Failed fetch: {resp.status_code} - {resp.text}")
-        data = resp.json().get("value", [])
-        if not data:
-            break
-        df_chunk = pd.DataFrame(data)
-        chunks.append(df_chunk)
-        skip += top
+def footprints_source(top=10000, columns=None, scope=None):
+    """
+    OData source for footprints. `columns` is pushed down as $select;
+    the geometry column is always included. A RunScope's boroughs become
+    a $filter on base_bbl.
+    """
+    select = list(dict.fromkeys(list(columns) + [GEOMETRY_COLUMN])) if columns else None
+    return ODataSource(API_ENDPOINT, page_size=top, select=select, order=ORDER_COLUMN,
+                       filter=scope.odata_filter() if scope else None)
 
-    df = pd.concat(chunks, ignore_index=True)
-    df["geometry"] = df["the_geom"].apply(shape)
+def to_footprints_frame(df, scope=None):
+    """
+    Parses the OData GeoJSON geometries into a GeoDataFrame. OData has no
+    spatial filter, so a scope's bbox is applied here.
+    """
+    if df.empty:
+        return gpd.GeoDataFrame(columns=["geometry"], geometry="geometry", crs="EPSG:4326")
+    df["geometry"] = df[GEOMETRY_COLUMN].apply(shape)
     gdf = gpd.GeoDataFrame(df, geometry="geometry", crs="EPSG:4326")
-    return gdf
\ No newline at end of file
+    return scope.clip(gdf) if scope else gdf
+
+def fetch_footprints(top=10000, skip=0, columns=None, scope=None):
+    return to_footprints_frame(footprints_source(top, columns, scope).fetch(offset=skip), scope)
@@ -1,43 +1,35 @@
-import requests
-import pandas as pd
 from datetime import datetime, timedelta
 
+from etl.extract.scope import and_clauses
+from etl.extract.sources import SocrataSource
+
 # Socrata API endpoint for DOB Permit Issuance
 BASE_URL = "https://data.cityofnewyork.us/resource/ipu4-2q9a.json"
 
-def fetch_permits(limit=50000, where_clause=None):
+def default_where():
+    two_years_ago = (datetime.now() - timedelta(days=730)).strftime("%Y-%m-%dT%H:%M:%S.%f")
+    return f"(issuance_date >= '{two_years_ago}' OR permit_type = 'EW')"
+
+def permits_source(limit=50000, where_clause=None, columns=None, scope=None):
+    """
+    A RunScope's boroughs and date window (on issuance_date) are added to
+    the $where; its date window replaces the default two-year lookback.
+    """
+    if where_clause is None and not (scope and (scope.start_date or scope.end_date)):
+        where_clause = default_where()
+    if scope:
+        where_clause = and_clauses(where_clause, scope.socrata_where(date_field="issuance_date"))
+    return SocrataSource(BASE_URL, page_size=limit, where=where_clause, select=columns)
+
+def fetch_permits(limit=50000, where_clause=None, columns=None, scope=None):
     """
     Fetch DOB permits from the NYC Open Data API.
     By default, fetches permits from the last 2 years or any Emergency Work (EW) permits.
+    `columns` limits the fields requested ($select); None pulls every field.
     """
-    two_years_ago = (datetime.now() - timedelta(days=730)).strftime("%Y-%m-%dT%H:%M:%S.%f")
-    default_where = f"(issuance_date >= '{two_years_ago}' OR permit_type = 'EW')"
-
-    where = where_clause if where_clause else default_where
-    offset = 0
-    permits = []
-
-    while True:
-        params = {
-            "$limit": limit,
-            "$offset": offset,
-            "$where": where
-        }
-
-        response = requests.get(BASE_URL, params=params)
-        response.raise_for_status()
-        batch = response.json()
-
-        if not batch:
-            break
-
-        permits.extend(batch)
-        offset += limit
-
-    df = pd.DataFrame(permits)
-    return df
+    return permits_source(limit, where_clause, columns, scope).fetch()
 
 if __name__ == "__main__":
     df = fetch_permits()
     print(f"Fetched {len(df)} records")
-    df.to_csv("dob_permits_raw.csv", index=False)
\ No newline at end of file
+    df.to_csv("dob_permits_raw.csv", index=False)
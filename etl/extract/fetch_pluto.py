@@ -1,51 +1,47 @@
-import requests
-import pandas as pd
 import geopandas as gpd
-from shapely.geometry import shape
+
+from etl.extract.sources import ArcGISSource
+from etl.transform.crs import ensure_crs
+from etl.transform.geometry_qa import esri_rings_to_geometries
 
 BASE_URL = (
     "https://services5.arcgis.com/GfwWNkhOj9bNBqoJ/arcgis/rest/services/"
     "MAPPLUTO/FeatureServer/0/query"
 )
+OUT_FIELDS = ['bbl', 'lotarea', 'zonedist1', 'zonedist2', 'zonedist3', 'zonedist4', 'landuse', 'unitsres', 'unitstotal']
 
-def fetch_pluto(top=2000, skip=0):
+def pluto_source(top=2000, columns=None, geometry=True, scope=None):
     """
-    Fetches NYC MapPLUTO parcel data via ArcGIS REST API.
-    Returns a GeoDataFrame with geometry and selected fields.
+    ArcGIS source for MapPLUTO; `columns` is pushed down as outFields and
+    geometry=False skips the parcel rings entirely. A RunScope becomes the
+    `where` (boroughs) and an envelope `geometry` (bbox).
     """
-    chunks = []
-    params = {
-        'where': '1=1',
-        'outFields': 'bbl,lotarea,zonedist1,zonedist2,zonedist3,zonedist4,landuse,unitsres,unitstotal',
-        'f': 'json',
-        'resultRecordCount': top,
-    }
-
-    while True:
-        params['resultOffset'] = skip
-        print(f"Fetching parcels: skip={skip}, top={top}")
-        resp = requests.get(BASE_URL, params=params)
-        if resp.status_code != 200:
-            raise Exception(f"Failed to fetch data: {resp.status_code}\n{resp.text}")
-        
-        data = resp.json()
-        features = data.get('features', [])
-        if not features:
-            break
-
-        records = []
-        for feat in features:
-            attr = feat.get('attributes', {})
-            geom = feat.get('geometry')
-            if geom:
-                geom = shape({'type': 'Polygon', 'coordinates': geom['rings']})
-            records.append({**attr, 'geometry': geom})
-
-        gdf_chunk = gpd.GeoDataFrame(records, crs="EPSG:4326")
-        chunks.append(gdf_chunk)
-        skip += top
+    return ArcGISSource(
+        BASE_URL, page_size=top, out_fields=columns or OUT_FIELDS, geometry=geometry,
+        where=scope.arcgis_where() if scope else "1=1",
+        params=scope.arcgis_geometry() if scope else None,
+    )
 
-    if chunks:
-        return gpd.GeoDataFrame(pd.concat(chunks, ignore_index=True), crs="EPSG:4326")
+def to_pluto_frame(df):
+    """
+    Turns ArcGIS records (attributes + Esri rings) into a GeoDataFrame.
+    Rings are assembled into (Multi)Polygons by orientation; the assembly
+    counts are kept in `gdf.attrs["geometry_assembly"]` for geometry QA.
+    The source asks for outSR=4326; ensure_crs fails loudly if the server
+    sent another CRS anyway.
+    """
+    if df.empty:
+        return gpd.GeoDataFrame(columns=['geometry'])
+    if 'geometry' not in df.columns or df['geometry'].isna().all():
+        return gpd.GeoDataFrame(df.drop(columns=['geometry'], errors='ignore'))
+    geoms, stats = esri_rings_to_geometries(df['geometry'].tolist())
+    gdf = ensure_crs(gpd.GeoDataFrame(df.assign(geometry=geoms), geometry='geometry', crs="EPSG:4326"))
+    gdf.attrs['geometry_assembly'] = stats
+    return gdf
 
-    return gpd.GeoDataFrame(columns=['geometry'])
\ No newline at end of file
+def fetch_pluto(top=2000, skip=0, columns=None, geometry=True, scope=None):
+    """
+    Fetches NYC MapPLUTO parcel data via ArcGIS REST API.
+    Returns a GeoDataFrame with geometry and selected fields.
+    """
+    return to_pluto_frame(pluto_source(top, columns, geometry, scope).fetch(offset=skip))
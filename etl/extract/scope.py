@@ -0,0 +1,177 @@
+"""
+Run scope: the boroughs, date window and (optional) bounding box a
+pipeline run covers.
+
+Every extractor translates the same scope into its server's filter
+syntax, so a Brooklyn-only refresh downloads only Brooklyn rows:
+
+- Socrata SODA   $where     borough / date / within_box()
+- Socrata OData  $filter    borough via the BBL's leading digit
+- ArcGIS REST    where + geometry envelope
+
+An empty scope means citywide, all dates.
+"""
+import argparse
+from dataclasses import dataclass
+from datetime import date, timedelta
+
+import pandas as pd
+
+from etl.transform.keys import borough_code
+
+BOROUGH_NAMES = {1: 'MANHATTAN', 2: 'BRONX', 3: 'BROOKLYN', 4: 'QUEENS', 5: 'STATEN ISLAND'}
+BOROUGH_ABBRS = {1: 'MN', 2: 'BX', 3: 'BK', 4: 'QN', 5: 'SI'}
+
+
+def and_clauses(*clauses, joiner=" AND "):
+    """
+    Joins the non-empty filter clauses, each parenthesized; None if none.
+    """
+    parts = [f"({c})" for c in clauses if c]
+    return joiner.join(parts) if parts else None
+
+
+def _quoted(values):
+    return ", ".join(f"'{v}'" for v in values)
+
+
+@dataclass(frozen=True)
+class RunScope:
+    """
+    boroughs: DOF borough digits (1-5); empty = citywide.
+    start_date / end_date: inclusive ISO dates for dated datasets.
+    bbox: (min_lon, min_lat, max_lon, max_lat) in EPSG:4326.
+    """
+    boroughs: tuple = ()
+    start_date: str = None
+    end_date: str = None
+    bbox: tuple = None
+
+    @classmethod
+    def from_values(cls, boroughs=None, start_date=None, end_date=None, bbox=None):
+        """
+        Builds a scope from loose values: borough names, abbreviations or
+        digits, dates as str/date, bbox as a sequence or "a,b,c,d" string.
+        """
+        boroughs = list(boroughs or [])
+        codes = borough_code(pd.Series(boroughs, dtype=str))
+        if codes.isna().any():
+            bad = [b for b, c in zip(boroughs, codes) if pd.isna(c)]
+            raise ValueError(f"Unknown borough(s) in run scope: {bad}")
+        if isinstance(bbox, str):
+            bbox = bbox.split(",")
+        if bbox is not None:
+            bbox = tuple(float(v) for v in bbox)
+            if len(bbox) != 4 or bbox[0] >= bbox[2] or bbox[1] >= bbox[3]:
+                raise ValueError(f"bbox must be min_lon,min_lat,max_lon,max_lat; got {bbox}")
+        start = pd.Timestamp(start_date).date().isoformat() if start_date else None
+        end = pd.Timestamp(end_date).date().isoformat() if end_date else None
+        if start and end and start > end:
+            raise ValueError(f"Run scope starts after it ends: {start} > {end}")
+        return cls(tuple(sorted(set(int(c) for c in codes))), start, end, bbox)
+
+    @classmethod
+    def from_config(cls, config):
+        """
+        Reads the `scope:` section of config.yaml (missing = citywide).
+        """
+        section = (config or {}).get('scope') or {}
+        return cls.from_values(
+            section.get('boroughs'), section.get('start_date'), section.get('end_date'), section.get('bbox'),
+        )
+
+    @classmethod
+    def from_args(cls, args, config=None):
+        """
+        Scope from add_scope_arguments() flags; flags override config.yaml.
+        """
+        base = cls.from_config(config)
+        return cls.from_values(
+            args.borough or base.boroughs,
+            args.since or base.start_date,
+            args.until or base.end_date,
+            args.bbox or base.bbox,
+        )
+
+    @property
+    def is_citywide(self):
+        return not (self.boroughs or self.start_date or self.end_date or self.bbox)
+
+    def date_clause(self, field):
+        """
+        SODA/ArcGIS-style inclusive date window on `field`.
+        """
+        clauses = []
+        if self.start_date:
+            clauses.append(f"{field} >= '{self.start_date}T00:00:00'")
+        if self.end_date:
+            next_day = (date.fromisoformat(self.end_date) + timedelta(days=1)).isoformat()
+            clauses.append(f"{field} < '{next_day}T00:00:00'")
+        return and_clauses(*clauses)
+
+    def socrata_where(self, borough_field='borough', date_field=None, geometry_field=None):
+        """
+        $where for a SODA dataset. Borough columns differ between datasets
+        (names vs digits), so both spellings are accepted.
+        """
+        borough = None
+        if self.boroughs and borough_field:
+            values = [BOROUGH_NAMES[b] for b in self.boroughs] + [str(b) for b in self.boroughs]
+            borough = f"{borough_field} in ({_quoted(values)})"
+        box = None
+        if self.bbox and geometry_field:
+            min_lon, min_lat, max_lon, max_lat = self.bbox
+            box = f"within_box({geometry_field}, {max_lat}, {min_lon}, {min_lat}, {max_lon})"
+        return and_clauses(borough, self.date_clause(date_field) if date_field else None, box)
+
+    def odata_filter(self, bbl_field='base_bbl'):
+        """
+        $filter for an OData dataset keyed by BBL: the first BBL digit is
+        the borough.
+        """
+        if not self.boroughs:
+            return None
+        return " or ".join(f"startswith({bbl_field},'{b}')" for b in self.boroughs)
+
+    def arcgis_where(self, borough_field='borough'):
+        """
+        ArcGIS `where`; MapPLUTO stores boroughs as two-letter codes.
+        """
+        if not self.boroughs:
+            return "1=1"
+        return f"{borough_field} IN ({_quoted(BOROUGH_ABBRS[b] for b in self.boroughs)})"
+
+    def arcgis_geometry(self):
+        """
+        ArcGIS envelope query parameters for the bbox ({} without one).
+        """
+        if not self.bbox:
+            return {}
+        return {
+            "geometry": ",".join(str(v) for v in self.bbox),
+            "geometryType": "esriGeometryEnvelope",
+            "inSR": "4326",
+            "spatialRel": "esriSpatialRelIntersects",
+        }
+
+    def clip(self, gdf):
+        """
+        Client-side bbox filter for sources that cannot filter spatially.
+        """
+        if not self.bbox or gdf.empty:
+            return gdf
+        min_lon, min_lat, max_lon, max_lat = self.bbox
+        return gdf.cx[min_lon:max_lon, min_lat:max_lat]
+
+
+def add_scope_arguments(parser: argparse.ArgumentParser):
+    """
+    --borough/--since/--until/--bbox flags shared by the pipeline CLIs.
+    """
+    group = parser.add_argument_group("run scope")
+    group.add_argument("--borough", action="append",
+                       help="Limit the run to a borough (name, BK/MN/... or 1-5); repeatable")
+    group.add_argument("--since", help="Only records dated on/after this date (YYYY-MM-DD)")
+    group.add_argument("--until", help="Only records dated on/before this date (YYYY-MM-DD)")
+    group.add_argument("--bbox", help="min_lon,min_lat,max_lon,max_lat in EPSG:4326")
+    return parser
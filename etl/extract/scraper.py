@@ -0,0 +1,252 @@
+"""
+Concurrent, cached scraper for web pages described by CSS selectors
+(contractor cost guides).
+
+Each site in config.yaml's `scraping.sites` lists its pages and one or
+more extractors: an `items` selector and, per output field, where to
+find the value relative to each item:
+
+    fields:
+      job_type:   {selector: ""}                            # the item's own text
+      quote_text: {after: "div.mb4 span.b, p", contains: "$"}
+      notes:      {selector: "span, p", not_contains: "$", all: true}
+
+`selector` searches inside the item, `after` searches the elements that
+follow it up to the next item. `contains` / `not_contains` /
+`min_length` filter the matches by text, `all` joins every match
+instead of taking the first and `default` fills an empty value. Items
+missing any of the extractor's `required` fields are dropped.
+
+Pages are fetched concurrently over one aiohttp session, at most
+`max_per_host` at a time per host and no closer together than
+`delay_seconds`. Raw HTML is cached with its ETag / Last-Modified and
+revalidated with a conditional GET; the records parsed from a page are
+cached with it, so a page that has not changed (304, or the same bytes)
+is not parsed again. Pages are parsed with the lxml backend.
+"""
+import asyncio
+import hashlib
+import json
+import os
+from bisect import bisect_right
+from collections import defaultdict
+from contextlib import asynccontextmanager
+from urllib.parse import urlparse
+
+from etl.extract.sources import open_session
+from nyc_bis_scraper.utils.instrumentation import record_http
+
+USER_AGENT = (
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+    "(KHTML, like Gecko) Chrome/90.0.4430.212 Safari/537.36"
+)
+CACHE_DIR = "data/cache/html"
+
+
+def _digest(text):
+    return hashlib.sha256(text.encode() if isinstance(text, str) else text).hexdigest()
+
+
+def spec_hash(extractors):
+    """
+    Fingerprint of a site's extractors: cached records are only reused
+    when the page *and* the way it is parsed are unchanged.
+    """
+    return _digest(json.dumps(extractors, sort_keys=True))[:16]
+
+
+class HtmlCache:
+    """
+    One `<sha>.html` body plus a `<sha>.json` entry (validators, content
+    hash, parsed records) per URL.
+    """
+
+    def __init__(self, cache_dir=CACHE_DIR):
+        self.cache_dir = cache_dir
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _path(self, url, ext):
+        return os.path.join(self.cache_dir, f"{_digest(url)[:32]}.{ext}")
+
+    def entry(self, url):
+        path = self._path(url, "json")
+        if not os.path.exists(path):
+            return None
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+
+    def body(self, url):
+        with open(self._path(url, "html"), encoding="utf-8") as f:
+            return f.read()
+
+    def store(self, url, body, entry):
+        with open(self._path(url, "html"), "w", encoding="utf-8") as f:
+            f.write(body)
+        with open(self._path(url, "json"), "w", encoding="utf-8") as f:
+            json.dump(entry, f)
+
+    def update(self, url, entry):
+        with open(self._path(url, "json"), "w", encoding="utf-8") as f:
+            json.dump(entry, f)
+
+
+class HostThrottle:
+    """
+    Per-host politeness: at most `max_per_host` requests in flight and
+    request starts at least `delay` seconds apart.
+    """
+
+    def __init__(self, max_per_host=2, delay=1.0):
+        self.delay = delay
+        self._slots = defaultdict(lambda: asyncio.Semaphore(max_per_host))
+        self._locks = defaultdict(asyncio.Lock)
+        self._last = {}
+
+    @asynccontextmanager
+    async def slot(self, host):
+        async with self._slots[host]:
+            async with self._locks[host]:
+                loop = asyncio.get_running_loop()
+                wait = self._last.get(host, float("-inf")) + self.delay - loop.time()
+                if wait > 0:
+                    await asyncio.sleep(wait)
+                self._last[host] = loop.time()
+            yield
+
+
+def _text(element):
+    return element.get_text(" ", strip=True)
+
+
+def _field_value(spec, item, following):
+    """
+    Value of one field for one item (see the module docstring).
+    """
+    if "after" in spec:
+        matches = following(spec["after"])
+    elif spec.get("selector"):
+        matches = item.select(spec["selector"])
+    else:
+        matches = [item]
+    texts = [_text(m) for m in matches]
+    if spec.get("contains"):
+        texts = [t for t in texts if spec["contains"] in t]
+    if spec.get("not_contains"):
+        texts = [t for t in texts if spec["not_contains"] not in t]
+    if spec.get("min_length"):
+        texts = [t for t in texts if len(t) >= spec["min_length"]]
+    value = " ".join(texts) if spec.get("all") else (texts[0] if texts else "")
+    return value or spec.get("default", "")
+
+
+def parse_page(html, extractors):
+    """
+    Runs a site's extractors over one page. Returns a list of records
+    (one dict of fields per item, plus `item_number`).
+    """
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(html, "lxml")
+    # Document order of every element, for the `after` lookups
+    order = {id(el): i for i, el in enumerate(soup.find_all(True))}
+    records = []
+    for extractor in extractors:
+        items = soup.select(extractor["items"])[:extractor.get("max_items")]
+        positions = [order[id(it)] for it in items]
+        selected = {}
+
+        for n, item in enumerate(items):
+            start = positions[n]
+            stop = positions[n + 1] if n + 1 < len(items) else len(order)
+
+            def following(selector, start=start, stop=stop):
+                if selector not in selected:
+                    found = soup.select(selector)
+                    selected[selector] = (found, [order[id(el)] for el in found])
+                found, where = selected[selector]
+                lo = bisect_right(where, start)
+                hi = bisect_right(where, stop - 1)
+                return found[lo:hi]
+
+            record = {name: _field_value(spec, item, following) for name, spec in extractor["fields"].items()}
+            if all(record[f] for f in extractor.get("required", ())) and any(record.values()):
+                records.append({"item_number": len(records) + 1, **record})
+    return records
+
+
+async def _fetch_page(session, throttle, cache, url, extractors, headers):
+    """
+    Fetches (or revalidates) one page. Returns (records, status) where
+    status is 'parsed', 'not_modified', 'unchanged' or 'stale' (fetch
+    failed, cached records reused).
+    """
+    entry = cache.entry(url) or {}
+    request_headers = {"User-Agent": USER_AGENT, **(headers or {})}
+    if entry.get("etag"):
+        request_headers["If-None-Match"] = entry["etag"]
+    if entry.get("last_modified"):
+        request_headers["If-Modified-Since"] = entry["last_modified"]
+    parser_hash = spec_hash(extractors)
+
+    try:
+        async with throttle.slot(urlparse(url).netloc):
+            async with session.get(url, headers=request_headers) as resp:
+                if resp.status == 304 and entry:
+                    body, status = None, "not_modified"
+                elif resp.status == 200:
+                    raw = await resp.read()
+                    record_http(len(raw))
+                    body = raw.decode(resp.charset or "utf-8", errors="replace")
+                    status = "unchanged" if _digest(body) == entry.get("sha256") else "parsed"
+                else:
+                    raise Exception(f"HTTP {resp.status}")
+                validators = {"etag": resp.headers.get("ETag"), "last_modified": resp.headers.get("Last-Modified")}
+    except Exception as e:
+        if "records" in entry:
+            print(f"⚠️ {url}: {e}; using cached records")
+            return entry["records"], "stale"
+        print(f"❌ {url}: {e}")
+        return [], "failed"
+
+    if status != "parsed" and entry.get("parser") == parser_hash and "records" in entry:
+        cache.update(url, {**entry, **{k: v for k, v in validators.items() if v}})
+        return entry["records"], status
+
+    if body is None:
+        body = cache.body(url)
+    # Parsing is CPU-bound; keep the event loop free for other downloads
+    records = await asyncio.to_thread(parse_page, body, extractors)
+    cache.store(url, body, {
+        "url": url, "sha256": _digest(body), "parser": parser_hash, "records": records,
+        **{k: v for k, v in validators.items() if v},
+    })
+    return records, "parsed"
+
+
+async def scrape_sites_async(sites, on_records, cache_dir=CACHE_DIR, max_per_host=2,
+                             delay_seconds=1.0, connections=16):
+    """
+    Scrapes every page of every site concurrently. `on_records(site,
+    url, records)` is called as each page completes. Returns a
+    {status: page count} summary.
+    """
+    cache = HtmlCache(cache_dir)
+    throttle = HostThrottle(max_per_host, delay_seconds)
+    summary = defaultdict(int)
+
+    async with open_session(connections) as session:
+        async def one(site, url):
+            records, status = await _fetch_page(session, throttle, cache, url,
+                                                site["extractors"], site.get("headers"))
+            summary[status] += 1
+            on_records(site, url, records)
+
+        await asyncio.gather(*(one(site, url) for site in sites for url in site["urls"]))
+    return dict(summary)
+
+
+def scrape_sites(sites, on_records, **kwargs):
+    """
+    Blocking wrapper around scrape_sites_async.
+    """
+    return asyncio.run(scrape_sites_async(sites, on_records, **kwargs))
@@ -0,0 +1,112 @@
+"""
+Sharded extraction: one dataset pulled as several filtered shards (e.g.
+one per borough) at the same time, each streamed page by page into its
+own Parquet file, then combined into one file.
+
+Shards run in one event loop over one connection pool; give their
+sources a shared `RequestBudget` to keep the whole pull inside the API's
+rate limit. Memory holds one page per shard, not the dataset.
+"""
+import asyncio
+import os
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from etl.extract.sources import open_session
+
+
+def string_schema(columns):
+    """
+    All-string schema: SODA returns every value as text and leaves out
+    missing fields, so pages only agree on column names.
+    """
+    return pa.schema([(c, pa.string()) for c in columns])
+
+
+def _string_column(values):
+    try:
+        return pa.array(values).cast(pa.string())
+    except (pa.ArrowInvalid, pa.ArrowTypeError, pa.ArrowNotImplementedError):
+        # Mixed value types in one column
+        return pa.array([None if v is None else str(v) for v in values], pa.string())
+
+
+def _page_table(records, schema):
+    """
+    One page of records as an Arrow table with `schema`'s columns.
+    """
+    try:
+        return pa.Table.from_pylist(records, schema=schema)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        # Non-string values (numbers, booleans): convert column by column
+        return pa.Table.from_arrays(
+            [_string_column([r.get(name) for r in records]) for name in schema.names], schema=schema)
+
+
+async def stream_to_parquet(source, session, path, columns):
+    """
+    Writes every page of `source` to `path` as it arrives (one row group
+    per page). The file only appears once the shard is complete.
+    Returns the number of rows written.
+    """
+    schema = string_schema(columns)
+    tmp_path = f"{path}.tmp"
+    rows = 0
+    with pq.ParquetWriter(tmp_path, schema) as writer:
+        async for records in source.batches(session):
+            # Page → Arrow conversion is CPU work; keep the other shards downloading
+            writer.write_table(await asyncio.to_thread(_page_table, records, schema))
+            rows += len(records)
+            print(f"Fetched {len(records)} records ({rows} total) → {os.path.basename(path)}")
+    os.replace(tmp_path, path)
+    return rows
+
+
+def combine_shards(paths, output):
+    """
+    Concatenates shard files into `output`, one row group at a time.
+    Returns the number of rows written.
+    """
+    schema = pq.read_schema(paths[0])
+    tmp_path = f"{output}.tmp"
+    rows = 0
+    with pq.ParquetWriter(tmp_path, schema) as writer:
+        for path in paths:
+            shard = pq.ParquetFile(path)
+            for i in range(shard.num_row_groups):
+                table = shard.read_row_group(i)
+                writer.write_table(table)
+                rows += table.num_rows
+    os.replace(tmp_path, output)
+    return rows
+
+
+async def fetch_shards_async(shards, shard_paths, columns, connections=8):
+    """
+    Streams every shard concurrently. Returns {name: rows}; a failed
+    shard raises after the others have finished.
+    """
+    async with open_session(connections) as session:
+        names = list(shards)
+        results = await asyncio.gather(
+            *(stream_to_parquet(shards[n], session, shard_paths[n], columns) for n in names),
+            return_exceptions=True,
+        )
+    failed = {n: r for n, r in zip(names, results) if isinstance(r, BaseException)}
+    if failed:
+        raise RuntimeError(f"Shard(s) failed: {', '.join(f'{n} ({e})' for n, e in failed.items())}")
+    return dict(zip(names, results))
+
+
+def fetch_shards(shards, shard_dir, output, columns, prefix="", connections=8):
+    """
+    Pulls {name: source} shards into `<shard_dir>/<prefix><name>.parquet`
+    and combines them into `output`. Returns {name: rows}.
+    """
+    os.makedirs(shard_dir, exist_ok=True)
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    shard_paths = {name: os.path.join(shard_dir, f"{prefix}{name}.parquet") for name in shards}
+    counts = asyncio.run(fetch_shards_async(shards, shard_paths, columns, connections))
+    combine_shards(list(shard_paths.values()), output)
+    return counts
@@ -0,0 +1,294 @@
+"""
+Common paged dataset sources for NYC Open Data and ArcGIS.
+
+A source knows how to ask for one page (`page_params`) and how to turn a
+response into records (`parse_page`); paging, retries, connection pooling
+and HTTP accounting live here once. Sources are async iterators of
+record batches, so several of them can stream in a single event loop
+over one shared connection pool:
+
+    frames = fetch_all({
+        "permits": SocrataSource(PERMITS_URL, where="issuance_date >= '2024-01-01'"),
+        "footprints": ODataSource(FOOTPRINTS_URL),
+    })
+
+Adding a dataset means picking (or subclassing) a source, not writing a
+new request loop. Sources that share a `RequestBudget` also share one
+rate limit, however many of them run at once.
+"""
+import asyncio
+import contextlib
+
+import aiohttp
+import pandas as pd
+
+from nyc_bis_scraper.utils.instrumentation import record_http
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class RequestBudget:
+    """
+    Rate limit shared by several sources hitting the same API: at most
+    `max_in_flight` requests open at once and request starts at least
+    1 / `per_second` seconds apart (None = no spacing).
+    """
+
+    def __init__(self, max_in_flight=4, per_second=None):
+        self.interval = 1 / per_second if per_second else 0
+        self._slots = asyncio.Semaphore(max_in_flight)
+        self._lock = asyncio.Lock()
+        self._next_start = float("-inf")
+
+    @contextlib.asynccontextmanager
+    async def request(self):
+        async with self._slots:
+            async with self._lock:
+                loop = asyncio.get_running_loop()
+                wait = self._next_start - loop.time()
+                if wait > 0:
+                    await asyncio.sleep(wait)
+                self._next_start = loop.time() + self.interval
+            yield
+
+
+class DatasetSource:
+    """
+    Offset-paged JSON dataset. Subclasses implement `page_params` and
+    `parse_page`, and `more_pages` when the API says more directly than
+    by returning an empty page.
+    """
+
+    def __init__(self, url, page_size=50000, params=None, prefetch=2, retries=3, budget=None):
+        self.url = url
+        self.page_size = page_size
+        self.params = dict(params or {})
+        self.prefetch = prefetch
+        self.retries = retries
+        self.budget = budget
+
+    def page_params(self, offset, size):
+        raise NotImplementedError
+
+    def parse_page(self, payload):
+        raise NotImplementedError
+
+    def more_pages(self, payload, records):
+        """
+        Whether pages follow this one. A short page is not the end: some
+        servers cap pages below the requested size.
+        """
+        return bool(records)
+
+    async def _get(self, session, offset, size):
+        """
+        One page as (records, more). Retryable statuses, connection errors
+        and timeouts are retried with exponential backoff.
+        """
+        params = {**self.params, **self.page_params(offset, size)}
+        for attempt in range(self.retries + 1):
+            try:
+                async with self.budget.request() if self.budget else contextlib.nullcontext():
+                    async with session.get(self.url, params=params) as resp:
+                        if resp.status not in RETRY_STATUSES or attempt == self.retries:
+                            if resp.status != 200:
+                                text = await resp.text()
+                                raise Exception(f"Failed fetch: {resp.status} - {text[:500]}")
+                            body = await resp.read()
+                            record_http(len(body))
+                            payload = await resp.json(content_type=None)
+                            records = self.parse_page(payload)
+                            return records, bool(records) and self.more_pages(payload, records)
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                if attempt == self.retries:
+                    raise
+                print(f"⚠️ {type(e).__name__} fetching {self.url} at offset {offset}; retrying")
+            # Back off outside the budget so other sources keep going
+            await asyncio.sleep(2 ** attempt)
+
+    async def batches(self, session, offset=0):
+        """
+        Yields lists of records in order, keeping up to `prefetch` pages
+        in flight, until a page says there are no more. When the server
+        returns fewer records than asked for but more remain, paging
+        continues right after them at the server's page size.
+        """
+        size = self.page_size
+        in_flight = []
+        done = False
+        while not done or in_flight:
+            while not done and len(in_flight) < self.prefetch:
+                in_flight.append((offset, asyncio.ensure_future(self._get(session, offset, size))))
+                offset += size
+            page_offset, task = in_flight.pop(0)
+            records, more = await task
+            if records:
+                yield records
+            if not more or len(records) < size:
+                # Past the end, or the prefetched offsets assumed full pages: drop them
+                for _, pending in in_flight:
+                    pending.cancel()
+                in_flight = []
+                done = not more
+                offset, size = page_offset + len(records), len(records) or size
+
+    def fetch(self, offset=0, on_batch=None):
+        """
+        Blocking convenience: the whole dataset as one DataFrame, each
+        page passed through `on_batch` (see collect) as it arrives.
+        """
+        async def run():
+            async with open_session() as session:
+                return await collect(self, session, offset=offset, on_batch=on_batch)
+
+        return asyncio.run(run())
+
+    def iter_batches(self, offset=0, on_batch=None):
+        """
+        Blocking generator over the pages, each passed through
+        `on_batch` (default: a DataFrame of the records), for callers
+        that consume them one at a time outside an event loop. Requests
+        only make progress while the next page is awaited, up to
+        `prefetch` of them in flight.
+        """
+        loop = asyncio.new_event_loop()
+
+        async def start():
+            return open_session()
+
+        session = loop.run_until_complete(start())
+        pages = self.batches(session, offset=offset)
+        try:
+            while True:
+                try:
+                    records = loop.run_until_complete(pages.__anext__())
+                except StopAsyncIteration:
+                    return
+                print(f"Fetched {len(records)} records from {self.url}")
+                yield on_batch(records) if on_batch else pd.DataFrame.from_records(records)
+        finally:
+            loop.run_until_complete(pages.aclose())
+            loop.run_until_complete(session.close())
+            loop.close()
+
+
+class SocrataSource(DatasetSource):
+    """
+    Socrata SODA endpoint (`/resource/<id>.json`).
+    """
+
+    def __init__(self, url, page_size=50000, where=None, select=None, order=":id", **kwargs):
+        super().__init__(url, page_size, **kwargs)
+        if where:
+            self.params["$where"] = where
+        if select:
+            self.params["$select"] = ",".join(select)
+        if order:
+            # Offset paging is only stable with a total order
+            self.params["$order"] = order
+
+    def page_params(self, offset, size):
+        return {"$limit": size, "$offset": offset}
+
+    def parse_page(self, payload):
+        return payload
+
+
+class ODataSource(DatasetSource):
+    """
+    Socrata OData v4 endpoint (`/api/odata/v4/<id>`).
+    """
+
+    def __init__(self, url, page_size=10000, filter=None, select=None, order=None, **kwargs):
+        super().__init__(url, page_size, **kwargs)
+        if filter:
+            self.params["$filter"] = filter
+        if select:
+            self.params["$select"] = ",".join(select)
+        if order:
+            # Offset paging is only stable with a total order
+            self.params["$orderby"] = order
+
+    def page_params(self, offset, size):
+        return {"$top": size, "$skip": offset}
+
+    def parse_page(self, payload):
+        return payload.get("value", [])
+
+
+class ArcGISSource(DatasetSource):
+    """
+    ArcGIS FeatureServer layer query. Records are the feature attributes
+    plus the raw Esri geometry under `geometry`, reprojected by the server
+    to `out_sr` (lon/lat by default) instead of the layer's native CRS.
+    """
+
+    def __init__(self, url, page_size=2000, where="1=1", out_fields=None, geometry=True, out_sr=4326, **kwargs):
+        super().__init__(url, page_size, **kwargs)
+        self.params.update({
+            "where": where,
+            "outFields": ",".join(out_fields) if out_fields else "*",
+            "returnGeometry": "true" if geometry else "false",
+            "outSR": str(out_sr),
+            "f": "json",
+        })
+
+    def page_params(self, offset, size):
+        return {"resultOffset": offset, "resultRecordCount": size}
+
+    def parse_page(self, payload):
+        if "error" in payload:
+            raise Exception(f"ArcGIS error: {payload['error']}")
+        return [{**f.get("attributes", {}), "geometry": f.get("geometry")} for f in payload.get("features", [])]
+
+    def more_pages(self, payload, records):
+        # The layer's maxRecordCount can cut pages short; the server says when more remain
+        return bool(payload.get("exceededTransferLimit"))
+
+
+def union_columns(*column_lists):
+    """
+    Ordered union of the columns several downstream consumers need, for
+    pushing a single projection ($select / outFields) to the server.
+    None means "all columns" and wins over any list.
+    """
+    if any(cols is None for cols in column_lists):
+        return None
+    return list(dict.fromkeys(c for cols in column_lists for c in cols))
+
+
+def open_session(connections=8):
+    """
+    aiohttp session with one connection pool shared by every source.
+    """
+    return aiohttp.ClientSession(
+        connector=aiohttp.TCPConnector(limit=connections * 2, limit_per_host=connections),
+        timeout=aiohttp.ClientTimeout(total=None, sock_read=300),
+    )
+
+
+async def collect(source, session, offset=0, on_batch=None):
+    """
+    Drains one source into a DataFrame. `on_batch(records)` may transform
+    each batch (e.g. into a typed DataFrame) before it is kept.
+    """
+    frames = []
+    async for records in source.batches(session, offset=offset):
+        print(f"Fetched {len(records)} records from {source.url}")
+        frames.append(on_batch(records) if on_batch else pd.DataFrame.from_records(records))
+    return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+
+
+async def fetch_all_async(sources, offset=0, connections=8):
+    async with open_session(connections) as session:
+        names = list(sources)
+        frames = await asyncio.gather(*(collect(sources[n], session, offset) for n in names))
+    return dict(zip(names, frames))
+
+
+def fetch_all(sources, offset=0, connections=8):
+    """
+    Streams every source concurrently in one event loop.
+    Returns {name: DataFrame}.
+    """
+    return asyncio.run(fetch_all_async(sources, offset=offset, connections=connections))
@@ -15,4 +15,37 @@ def load_to_postgis(df, table_name, db_url, if_exists="replace"):
     else:
         df.to_sql(table_name, engine, if_exists=if_exists, index=False)
 
-    print(f"✅ Loaded {len(df)} records into PostGIS table '{table_name}'")
\ No newline at end of file
+    print(f"✅ Loaded {len(df)} records into PostGIS table '{table_name}'")
+
+def apply_delta_to_postgis(df, table_name, key, diff, db_url):
+    """
+    Applies a SnapshotDiff instead of reloading the table: rows whose
+    `key` changed or disappeared are deleted, then the inserted/updated
+    rows from `df` are appended, all in one transaction.
+    """
+    from sqlalchemy import text
+    from etl.transform.keys import to_int_key
+
+    if not len(diff.changed):
+        print(f"✅ '{table_name}' is up to date; nothing to load.")
+        return
+
+    engine = create_engine(db_url)
+    staging = f"_{table_name}_delta_keys"
+    rows = df[to_int_key(df[key]).isin(diff.upserts).to_numpy()]
+
+    with engine.begin() as conn:
+        pd.DataFrame({key: diff.changed.astype("int64")}).to_sql(staging, conn, if_exists="replace", index=False)
+        deleted = conn.execute(text(
+            f'DELETE FROM "{table_name}" t USING "{staging}" d '
+            f'WHERE t."{key}"::numeric::bigint = d."{key}"'
+        )).rowcount
+        conn.execute(text(f'DROP TABLE "{staging}"'))
+        if not rows.empty:
+            if isinstance(rows, gpd.GeoDataFrame) and rows.geometry.name in rows.columns:
+                rows.to_postgis(table_name, conn, if_exists="append", index=False)
+            else:
+                rows.to_sql(table_name, conn, if_exists="append", index=False)
+
+    print(f"✅ Applied delta to '{table_name}': {deleted} rows removed, {len(rows)} rows written "
+          f"({len(diff.inserts)} new, {len(diff.updates)} changed, {len(diff.deletes)} gone)")
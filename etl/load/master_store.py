@@ -0,0 +1,136 @@
+"""
+Read-optimized, memory-mapped copy of the property master.
+
+The master is written as an uncompressed Arrow IPC (Feather v2) file
+sorted by BBL, next to a sidecar `.keys.npy` holding the sorted integer
+BBLs. Opening the store maps both files instead of parsing them, so it
+is instant and every process that opens the same file shares the pages
+through the OS cache:
+
+    store = MasterStore("data/properties_master.feather")
+    store.lookup(["3012340056"], columns=["Address", "LotArea"])   # binary search
+    store.scan(borough=3, block=1234)                              # one contiguous slice
+    store.column("LotArea")                                        # zero-copy Arrow column
+
+A BBL is borough * 10^9 + block * 10^4 + lot, so sorting by BBL also
+sorts by borough and block: a borough or block is a contiguous range.
+"""
+import os
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+
+from etl.transform.keys import to_int_key
+
+KEY_METADATA = b"master_store.key"
+# Rows without a usable BBL sort first and never match a lookup
+MISSING_KEY = -1
+
+
+def keys_path(path):
+    return os.path.splitext(path)[0] + ".keys.npy"
+
+
+def write_master_store(df: pd.DataFrame, path: str, key: str = "BBL", chunk_size: int = 65536):
+    """
+    Writes `df` sorted by `key` as an uncompressed Feather file plus the
+    sorted key sidecar. Shapely geometry columns are stored as WKB.
+    Both files are written to a temp name first and swapped in, so
+    readers never see a half-written store. Returns the written row
+    order (positions in `df`).
+    """
+    import shapely
+
+    keys = to_int_key(df[key]).fillna(MISSING_KEY).to_numpy(dtype="int64")
+    order = np.argsort(keys, kind="stable")
+    frame = pd.DataFrame(df.iloc[order]).reset_index(drop=True)
+    for col in frame.columns:
+        values = frame[col]
+        if str(values.dtype) == "geometry" or (
+                values.dtype == object and values.map(lambda v: isinstance(v, shapely.Geometry)).any()):
+            frame[col] = shapely.to_wkb(np.asarray(values, dtype=object))
+
+    table = pa.Table.from_pandas(frame, preserve_index=False)
+    table = table.replace_schema_metadata({**(table.schema.metadata or {}), KEY_METADATA: key.encode()})
+
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    index_file = keys_path(path)
+    # Sidecar first, data file last: a reader validates one against the other
+    with open(index_file + ".tmp", "wb") as f:
+        np.save(f, keys[order])
+    feather.write_feather(table, path + ".tmp", compression="uncompressed", chunksize=chunk_size)
+    os.replace(index_file + ".tmp", index_file)
+    os.replace(path + ".tmp", path)
+    print(f"✅ Wrote memory-mapped master ({len(frame):,} rows, sorted by {key}) to {path}")
+    return order
+
+
+class MasterStore:
+    """
+    Memory-mapped view of a store written by write_master_store.
+    Row access returns pandas DataFrames; column() returns the Arrow
+    column without copying.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.table = pa.ipc.open_file(pa.memory_map(path, "r")).read_all()
+        self.keys = np.load(keys_path(path), mmap_mode="r")
+        self.key = (self.table.schema.metadata or {}).get(KEY_METADATA, b"BBL").decode()
+        if len(self.keys) != self.table.num_rows:
+            raise ValueError(f"Key index {keys_path(path)} does not match {path} "
+                             f"({len(self.keys)} keys for {self.table.num_rows} rows); rewrite the store")
+
+    def __len__(self):
+        return self.table.num_rows
+
+    @property
+    def columns(self):
+        return self.table.column_names
+
+    def column(self, name):
+        """
+        One column as a pyarrow ChunkedArray backed by the mapped file.
+        """
+        return self.table.column(name)
+
+    def _frame(self, table, columns=None):
+        return (table.select(columns) if columns else table).to_pandas()
+
+    def take(self, rows, columns=None) -> pd.DataFrame:
+        """
+        Rows by position (e.g. a random sample) without reading the rest.
+        """
+        return self._frame(self.table.take(pa.array(np.asarray(rows, dtype="int64"))), columns)
+
+    def lookup(self, bbls, columns=None) -> pd.DataFrame:
+        """
+        Every row for each BBL (a BBL can span several rows, e.g. one per
+        building), by binary search over the sorted key index.
+        """
+        wanted = np.unique(to_int_key(pd.Series(list(bbls))).dropna().to_numpy(dtype="int64"))
+        starts = np.searchsorted(self.keys, wanted, side="left")
+        ends = np.searchsorted(self.keys, wanted, side="right")
+        counts = ends - starts
+        offsets = np.cumsum(counts) - counts
+        rows = np.repeat(starts - offsets, counts) + np.arange(counts.sum())
+        return self.take(rows, columns)
+
+    def key_range(self, lo, hi):
+        """
+        (start, stop) row positions of keys in [lo, hi).
+        """
+        return int(np.searchsorted(self.keys, lo, side="left")), int(np.searchsorted(self.keys, hi, side="left"))
+
+    def scan(self, borough, block=None, columns=None) -> pd.DataFrame:
+        """
+        All rows of a borough (1-5), or of one block in it, as a single
+        contiguous slice.
+        """
+        lo = int(borough) * 10**9 + int(block or 0) * 10**4
+        hi = lo + (10**4 if block is not None else 10**9)
+        start, stop = self.key_range(lo, hi)
+        return self._frame(self.table.slice(start, stop - start), columns)
+
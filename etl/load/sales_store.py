@@ -0,0 +1,260 @@
+"""
+Sales history on disk, one Parquet partition per sale month:
+
+    data/sales_history/
+        sale_month=2024-01/part.parquet
+        sale_month=2024-02/part.parquet
+        ...
+        _manifest.json        last complete month, rows per month
+
+Past sales do not change, so a refresh only downloads from the first
+month after the last complete one, reaching back `overlap_days` for
+sales DOF records late. Whatever the store held for the refetched date
+range is replaced, so overlapping pulls never duplicate a sale.
+
+A refresh never holds the whole pull: each downloaded page is split by
+month into `_incoming/` as it arrives, and once the pull has finished
+every month it touched is rebuilt from those pieces, one at a time.
+
+Reads go through pyarrow.dataset: a date window prunes whole month
+partitions and, with a BBL filter, is pushed down to the Parquet
+row-group statistics (rows are sorted by BBL inside each partition):
+
+    store = SalesStore("data/sales_history")
+    store.refresh(fetch)                                  # fetch(start) -> pages of typed sales
+    store.read(columns=["BBL", "SALE DATE", "SALE PRICE"], since="2023-01-01")
+"""
+import json
+import os
+import shutil
+from datetime import date
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from etl.transform.keys import to_int_key
+
+PARTITION = "sale_month"
+MANIFEST = "_manifest.json"
+# Pages of a running refresh; the leading "_" keeps dataset reads out
+INCOMING = "_incoming"
+OVERLAP_DAYS = 14
+HISTORY_DAYS = 5 * 365
+# Typed columns kept per sale (to_sales_frame names); BBL is stored as int64
+STORE_COLUMNS = {
+    "BBL": "int64",
+    "SALE DATE": "datetime64[ns]",
+    "SALE PRICE": "float64",
+    "NEIGHBORHOOD": "string",
+    "BUILDING CLASS AT TIME OF SALE": "string",
+    "borough": "string",
+    "block": "string",
+    "lot": "string",
+}
+SCHEMA = pa.schema([
+    ("BBL", pa.int64()),
+    ("SALE DATE", pa.timestamp("ns")),
+    ("SALE PRICE", pa.float64()),
+    *((name, pa.string()) for name, dtype in STORE_COLUMNS.items() if dtype == "string"),
+])
+
+
+def to_store_frame(sales: pd.DataFrame) -> pd.DataFrame:
+    """
+    STORE_COLUMNS out of a to_sales_frame() result, typed. Sales without
+    a BBL or a sale date cannot be placed and are dropped.
+    """
+    out = pd.DataFrame(index=sales.index)
+    for name, dtype in STORE_COLUMNS.items():
+        values = sales[name] if name in sales.columns else pd.Series(None, index=sales.index, dtype=object)
+        if name == "BBL":
+            out[name] = to_int_key(values)
+        elif dtype == "datetime64[ns]":
+            out[name] = pd.to_datetime(values, errors="coerce").astype(dtype)
+        elif dtype == "float64":
+            out[name] = pd.to_numeric(values, errors="coerce").astype(dtype)
+        else:
+            out[name] = values.astype(dtype)
+    dropped = out["BBL"].isna() | out["SALE DATE"].isna()
+    if dropped.any():
+        print(f"⚠️ {int(dropped.sum())} sales without BBL or sale date left out of the store")
+    out = out[~dropped]
+    out["BBL"] = out["BBL"].astype("int64")
+    return out.reset_index(drop=True)
+
+
+class SalesStore:
+    """
+    Month-partitioned sales history rooted at `root`.
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+
+    def _month_dir(self, month):
+        return os.path.join(self.root, f"{PARTITION}={month}")
+
+    def manifest(self) -> dict:
+        path = os.path.join(self.root, MANIFEST)
+        if not os.path.exists(path):
+            return {}
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+
+    def months(self) -> list:
+        """
+        Months with a partition on disk, oldest first.
+        """
+        if not os.path.isdir(self.root):
+            return []
+        prefix = f"{PARTITION}="
+        return sorted(d[len(prefix):] for d in os.listdir(self.root) if d.startswith(prefix))
+
+    def _read_month(self, month) -> pd.DataFrame:
+        path = os.path.join(self._month_dir(month), "part.parquet")
+        if not os.path.exists(path):
+            return None
+        return pq.read_table(path, schema=SCHEMA).to_pandas()
+
+    def _write_month(self, month, frame):
+        """
+        Swaps in a month's partition (sorted by BBL, then date); an empty
+        frame removes the partition.
+        """
+        target = self._month_dir(month)
+        if frame.empty:
+            shutil.rmtree(target, ignore_errors=True)
+            return
+        frame = frame.sort_values(["BBL", "SALE DATE"], kind="stable")
+        os.makedirs(target, exist_ok=True)
+        path = os.path.join(target, "part.parquet")
+        pq.write_table(pa.Table.from_pandas(frame, schema=SCHEMA, preserve_index=False), path + ".tmp")
+        os.replace(path + ".tmp", path)
+
+    def refresh_start(self, today=None, overlap_days=OVERLAP_DAYS, history_days=HISTORY_DAYS) -> pd.Timestamp:
+        """
+        First sale date the next refresh downloads: `overlap_days` before
+        the month after the last complete one, or the start of the month
+        `history_days` back for an empty store.
+        """
+        today = pd.Timestamp(today or date.today()).normalize()
+        complete_through = self.manifest().get("complete_through")
+        if complete_through:
+            return (pd.Period(complete_through, "M") + 1).start_time - pd.Timedelta(days=overlap_days)
+        return (today - pd.Timedelta(days=history_days)).to_period("M").start_time
+
+    def _stage_page(self, page, index):
+        """
+        Splits one downloaded page by sale month into _incoming/.
+        """
+        for month, rows in page.groupby(page["SALE DATE"].dt.to_period("M")):
+            target = os.path.join(self.root, INCOMING, f"{PARTITION}={month}")
+            os.makedirs(target, exist_ok=True)
+            pq.write_table(pa.Table.from_pandas(rows, schema=SCHEMA, preserve_index=False),
+                           os.path.join(target, f"page-{index:05d}.parquet"))
+
+    def _read_staged(self, month) -> pd.DataFrame:
+        target = os.path.join(self.root, INCOMING, f"{PARTITION}={month}")
+        if not os.path.isdir(target):
+            return None
+        return ds.dataset(target, format="parquet", schema=SCHEMA).to_table().to_pandas()
+
+    def refresh(self, fetch, today=None, overlap_days=OVERLAP_DAYS, history_days=HISTORY_DAYS) -> dict:
+        """
+        Downloads sales dated on/after refresh_start() with
+        `fetch(start)`, which returns an iterable of to_sales_frame()
+        pages (or a single frame), and rewrites the months that range
+        touches. Pages are staged by month as they arrive; a pull that
+        fails leaves the store as it was. Months before the current one
+        are then complete. Returns a summary dict.
+        """
+        today = pd.Timestamp(today or date.today()).normalize()
+        start = self.refresh_start(today, overlap_days, history_days)
+        incoming = os.path.join(self.root, INCOMING)
+        shutil.rmtree(incoming, ignore_errors=True)
+        pages = fetch(start)
+        if isinstance(pages, pd.DataFrame):
+            pages = [pages]
+
+        try:
+            fetched = 0
+            for index, page in enumerate(pages):
+                page = to_store_frame(page)
+                page = page[page["SALE DATE"] >= start]
+                self._stage_page(page, index)
+                fetched += len(page)
+
+            staged = os.listdir(incoming) if os.path.isdir(incoming) else []
+            months = set(pd.period_range(start.to_period("M"), today.to_period("M"), freq="M")) | {
+                pd.Period(d.split("=", 1)[1], "M") for d in staged}
+            rows = {}
+            for month in sorted(months):
+                parts = [self._read_staged(str(month))]
+                existing = self._read_month(str(month))
+                if existing is not None:
+                    # Keep what precedes the refetched range
+                    parts.insert(0, existing[existing["SALE DATE"] < start])
+                parts = [p for p in parts if p is not None]
+                frame = pd.concat(parts, ignore_index=True) if parts else to_store_frame(pd.DataFrame())
+                self._write_month(str(month), frame)
+                rows[str(month)] = len(frame)
+        finally:
+            shutil.rmtree(incoming, ignore_errors=True)
+
+        manifest = self.manifest()
+        manifest_rows = {**manifest.get("months", {}), **rows}
+        manifest = {
+            "complete_through": str(today.to_period("M") - 1),
+            "refreshed_at": pd.Timestamp.now().isoformat(timespec="seconds"),
+            "last_start": start.date().isoformat(),
+            "months": {m: n for m, n in sorted(manifest_rows.items()) if n},
+        }
+        os.makedirs(self.root, exist_ok=True)
+        path = os.path.join(self.root, MANIFEST)
+        with open(path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(path + ".tmp", path)
+        return {"start": start.date().isoformat(), "fetched": fetched, "months_written": len(rows)}
+
+    def iter_months(self, columns=None):
+        """
+        The stored sales one month partition at a time, oldest first,
+        for consumers that need all of them but not at once.
+        """
+        for month in self.months():
+            frame = self._read_month(month)
+            if frame is not None:
+                yield frame if columns is None else frame[list(columns)]
+
+    def read(self, columns=None, since=None, until=None, bbls=None) -> pd.DataFrame:
+        """
+        Sales as a DataFrame, reading only `columns` and only the
+        partitions / row groups that can match the inclusive
+        [since, until] sale-date window and the `bbls` filter.
+        """
+        if not self.months():
+            return pd.DataFrame({c: pd.Series(dtype=t) for c, t in STORE_COLUMNS.items()
+                                 if columns is None or c in columns})
+        dataset = ds.dataset(self.root, format="parquet", schema=SCHEMA.append(pa.field(PARTITION, pa.string())),
+                             partitioning=ds.partitioning(pa.schema([(PARTITION, pa.string())]), flavor="hive"))
+        predicate = None
+
+        def both(a, b):
+            return b if a is None else a & b
+
+        if since is not None:
+            since = pd.Timestamp(since)
+            predicate = both(predicate, (ds.field(PARTITION) >= str(since.to_period("M")))
+                             & (ds.field("SALE DATE") >= pa.scalar(since.to_pydatetime(), pa.timestamp("ns"))))
+        if until is not None:
+            end = pd.Timestamp(until).normalize() + pd.Timedelta(days=1)
+            predicate = both(predicate, (ds.field(PARTITION) <= str(pd.Timestamp(until).to_period("M")))
+                             & (ds.field("SALE DATE") < pa.scalar(end.to_pydatetime(), pa.timestamp("ns"))))
+        if bbls is not None:
+            keys = to_int_key(pd.Series(list(bbls))).dropna().astype("int64").unique()
+            predicate = both(predicate, ds.field("BBL").isin(pa.array(keys, pa.int64())))
+
+        names = list(columns) if columns is not None else list(SCHEMA.names)
+        return dataset.to_table(columns=names, filter=predicate).to_pandas()
@@ -0,0 +1,77 @@
+import argparse
+import os
+
+import pandas as pd
+
+from etl.extract.scope import RunScope
+from etl.transform.cost_estimates import estimate_permit_costs, reference_bands, summarize_flags
+from nyc_bis_scraper.utils.instrumentation import instrument
+
+PERMITS_PATH = "data/raw/permits/construction_jobs.parquet"
+BIN_BBL_PATH = "data/api_data/bin_to_bbl_mapping.csv"
+AREAS_PATH = "data/final_properties.csv"
+REFERENCE_PATH = "data/raw/quotes/reference_job_costs.csv"
+ESTIMATES_PATH = "data/processed/permit_cost_estimates.parquet"
+
+
+def load_areas(path, scope):
+    """
+    BBL / BldgArea / LotArea per lot: from `path` when it exists and has
+    all three, otherwise just those columns from PLUTO (no geometry).
+    """
+    if os.path.exists(path):
+        header = pd.read_csv(path, nrows=0).columns
+        wanted = [c for c in header if c.lower() in ("bbl", "bldgarea", "lotarea")]
+        if len({c.lower() for c in wanted}) == 3:
+            return pd.read_csv(path, usecols=wanted, dtype=str).drop_duplicates()
+        print(f"⚠️ {path} lacks BBL, BldgArea or LotArea; reading areas from PLUTO")
+    from etl.extract.fetch_pluto import fetch_pluto
+
+    return pd.DataFrame(fetch_pluto(columns=["bbl", "bldgarea", "lotarea"], geometry=False, scope=scope))
+
+
+def main(config=None):
+    parser = argparse.ArgumentParser(description="Estimate permit cost per square foot against reference bands")
+    parser.add_argument("--permits", default=PERMITS_PATH, help="Permits (Parquet or CSV)")
+    parser.add_argument("--bin-bbl", default=BIN_BBL_PATH, help="BIN→BBL mapping CSV")
+    parser.add_argument("--areas", default=AREAS_PATH, help="CSV with BBL, BldgArea and LotArea (PLUTO if missing)")
+    parser.add_argument("--output", default=None, help="Estimates table (Parquet)")
+    parser.add_argument("--tolerance", type=float, default=None, help="Widen every band by this fraction")
+    args, _ = parser.parse_known_args()
+
+    if config is None:
+        from nyc_bis_scraper.scripts.pipeline.run_pipeline import load_config
+        config = load_config()
+    settings = config.get("cost_estimation", {})
+    output = args.output or settings.get("output", ESTIMATES_PATH)
+    tolerance = args.tolerance if args.tolerance is not None else settings.get("tolerance", 0.0)
+
+    print("🚀 Starting permit cost estimation pipeline...")
+    if args.permits.endswith(".parquet"):
+        permits = pd.read_parquet(args.permits)
+    else:
+        permits = pd.read_csv(args.permits, dtype=str, low_memory=False)
+    bin_bbl = pd.read_csv(args.bin_bbl, dtype=str)
+    reference_path = settings.get("reference", REFERENCE_PATH)
+    reference = pd.read_csv(reference_path) if os.path.exists(reference_path) else None
+    print(f"📥 Loaded {len(permits)} permits")
+
+    with instrument("cost_estimates.areas") as m:
+        areas = load_areas(args.areas, RunScope.from_config(config))
+        m["rows_out"] = len(areas)
+
+    bands = reference_bands(reference, settings.get("bands", {}))
+    print(f"📏 $/sq ft bands:\n{bands}")
+
+    with instrument("cost_estimates.transform", rows_in=len(permits)) as m:
+        estimates = estimate_permit_costs(permits, bin_bbl, areas, bands, tolerance=tolerance)
+        m["rows_out"] = len(estimates)
+
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    estimates.to_parquet(output, index=False)
+    print(summarize_flags(estimates))
+    print(f"✅ Wrote {len(estimates)} job cost estimates to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,19 +1,71 @@
+import argparse
+
 from config import db_url
 from etl.extract.fetch_footprints import fetch_footprints
+from etl.extract.scope import RunScope, add_scope_arguments
 from etl.transform import bin_bb_mapper
-from etl.load.load_to_postgis import load_to_postgis
+from etl.transform.geometry_qa import geometry_qa
+from etl.transform.snapshot_diff import (
+    diff_snapshots, load_manifest, merge_manifest, quarantined_keys, record_hashes, restrict_to_boroughs,
+    save_changes, save_manifest,
+)
+from etl.load.load_to_postgis import apply_delta_to_postgis, load_to_postgis
+from nyc_bis_scraper.utils.instrumentation import instrument
 import pandas as pd
 
-def main():
+MANIFEST_PATH = "data/snapshots/footprints_manifest.parquet"
+CHANGES_PATH = "data/snapshots/footprints_changes.parquet"
+
+def main(config=None):
+    parser = argparse.ArgumentParser(description="Fetch building footprints and rebuild the BIN→BBL mapping")
+    parser.add_argument("--full-reload", action="store_true", help="Replace the table instead of applying the delta")
+    add_scope_arguments(parser)
+    args = parser.parse_args()
+    scope = RunScope.from_args(args, config)
+
     print("🚀 Starting footprints pipeline...")
 
-    gdf = fetch_footprints()
-    bin_bbl_df = bin_bb_mapper.extract_bin_bbl(gdf)
+    with instrument("footprints.extract") as m:
+        # BIN/BBL + geometry only: the footprint refresh needs nothing else
+        gdf = fetch_footprints(columns=bin_bb_mapper.REQUIRED_COLUMNS, scope=scope)
+        m["rows_out"] = len(gdf)
+
+    with instrument("footprints.transform", rows_in=len(gdf)) as m:
+        bin_bbl_df = bin_bb_mapper.extract_bin_bbl(gdf)
+        m["rows_out"] = len(bin_bbl_df)
 
     bin_bbl_df.to_csv("data/api_data/bin_to_bbl_mapping.csv", index=False)
     print("✅ Saved bin_to_bbl_mapping.csv")
 
-    load_to_postgis(gdf, "footprints", db_url())
+    # The mapping keeps every building; only loadable geometries go to PostGIS
+    with instrument("footprints.geometry_qa", rows_in=len(gdf)) as m:
+        raw = gdf
+        gdf, qa_stats = geometry_qa(gdf, "footprints")
+        m.update(qa_stats, rows_out=len(gdf))
+
+    with instrument("footprints.diff", rows_in=len(gdf)) as m:
+        previous = load_manifest(MANIFEST_PATH)
+        # Quarantined buildings keep their last good row (a full reload replaces everything)
+        held = quarantined_keys(raw, gdf, "bin") if not args.full_reload else None
+        hashes = record_hashes(gdf, "bin")
+        if held is not None and len(held):
+            print(f"⏸️ Holding {len(held)} quarantined BINs at their previous snapshot")
+            hashes = hashes.drop(held, errors="ignore")
+        diff = diff_snapshots(hashes, restrict_to_boroughs(previous, scope.boroughs, key_digits=7), held)
+        if scope.bbox:
+            # A bbox pull says nothing about buildings outside it
+            diff.deletes = diff.deletes[:0]
+        m.update(diff.summary(), rows_out=len(diff.changed))
+    print(f"🔍 Footprint changes since last snapshot: {diff.summary()}")
+
+    with instrument("footprints.load", rows_in=len(diff.upserts)):
+        if previous is None or args.full_reload:
+            load_to_postgis(gdf, "footprints", db_url())
+        else:
+            apply_delta_to_postgis(gdf, "footprints", "bin", diff, db_url())
+
+    save_manifest(merge_manifest(previous, hashes, diff), MANIFEST_PATH)
+    save_changes(diff, CHANGES_PATH)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
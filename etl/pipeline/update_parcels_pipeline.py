@@ -1,21 +1,72 @@
+import argparse
+
 from etl.extract.fetch_pluto import fetch_pluto
+from etl.extract.scope import RunScope, add_scope_arguments
 from etl.transform.clean_pluto import clean_pluto
-from etl.load.load_to_postgis import load_to_postgis
+from etl.transform.geometry_qa import geometry_qa
+from etl.transform.snapshot_diff import (
+    diff_snapshots, load_manifest, merge_manifest, quarantined_keys, record_hashes, restrict_to_boroughs,
+    save_changes, save_manifest,
+)
+from etl.load.load_to_postgis import apply_delta_to_postgis, load_to_postgis
+from nyc_bis_scraper.utils.instrumentation import instrument
 from config import db_url  # assumes your db_url() function lives here
 
-def main():
+MANIFEST_PATH = "data/snapshots/parcels_manifest.parquet"
+CHANGES_PATH = "data/snapshots/parcels_changes.parquet"
+
+def main(config=None):
+    parser = argparse.ArgumentParser(description="Fetch, clean and load MapPLUTO parcels")
+    parser.add_argument("--full-reload", action="store_true", help="Replace the table instead of applying the delta")
+    add_scope_arguments(parser)
+    args = parser.parse_args()
+    scope = RunScope.from_args(args, config)
+
     print("🚀 Starting PLUTO parcel ETL pipeline...")
 
     # Extract
-    gdf = fetch_pluto()
+    with instrument("parcels.extract") as m:
+        gdf = fetch_pluto(scope=scope)
+        m["rows_out"] = len(gdf)
     print(f"📥 Extracted {len(gdf)} raw records")
 
+    # Geometry QA: repair what we can, quarantine the rest
+    with instrument("parcels.geometry_qa", rows_in=len(gdf)) as m:
+        raw = gdf
+        gdf, qa_stats = geometry_qa(gdf, "parcels")
+        m.update(qa_stats, rows_out=len(gdf))
+
     # Transform
-    cleaned = clean_pluto(gdf)
+    with instrument("parcels.transform", rows_in=len(gdf)) as m:
+        cleaned = clean_pluto(gdf)
+        m["rows_out"] = len(cleaned)
     print(f"🧼 Cleaned down to {len(cleaned)} valid records")
 
+    # Diff against the previous snapshot
+    with instrument("parcels.diff", rows_in=len(cleaned)) as m:
+        previous = load_manifest(MANIFEST_PATH)
+        # Quarantined lots keep their last good row (a full reload replaces everything)
+        held = quarantined_keys(raw, gdf, "bbl") if not args.full_reload else None
+        hashes = record_hashes(cleaned, "bbl")
+        if held is not None and len(held):
+            print(f"⏸️ Holding {len(held)} quarantined BBLs at their previous snapshot")
+            hashes = hashes.drop(held, errors="ignore")
+        diff = diff_snapshots(hashes, restrict_to_boroughs(previous, scope.boroughs, key_digits=10), held)
+        if scope.bbox:
+            # A bbox pull says nothing about lots outside it
+            diff.deletes = diff.deletes[:0]
+        m.update(diff.summary(), rows_out=len(diff.changed))
+    print(f"🔍 Parcel changes since last snapshot: {diff.summary()}")
+
     # Load
-    load_to_postgis(cleaned, table_name="parcels", db_url=db_url())
+    with instrument("parcels.load", rows_in=len(diff.upserts)):
+        if previous is None or args.full_reload:
+            load_to_postgis(cleaned, table_name="parcels", db_url=db_url())
+        else:
+            apply_delta_to_postgis(cleaned, "parcels", "bbl", diff, db_url())
+
+    save_manifest(merge_manifest(previous, hashes, diff), MANIFEST_PATH)
+    save_changes(diff, CHANGES_PATH)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
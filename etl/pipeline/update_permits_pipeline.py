@@ -1,18 +1,31 @@
+import argparse
+
 from etl.extract.fetch_permits import fetch_permits
-from etl.transform.clean_permits import clean_permits
+from etl.extract.scope import RunScope, add_scope_arguments
+from etl.transform.clean_permits import REQUIRED_COLUMNS, clean_permits
 from etl.load.load_to_postgis import load_to_postgis
+from nyc_bis_scraper.utils.instrumentation import instrument
 from config import db_url
 
-def main():
+def main(config=None):
+    parser = argparse.ArgumentParser(description="Fetch, clean and load DOB permits")
+    add_scope_arguments(parser)
+    scope = RunScope.from_args(parser.parse_args(), config)
+
     print("Fetching DOB permits...")
-    raw = fetch_permits()
+    with instrument("permits.extract") as m:
+        raw = fetch_permits(columns=REQUIRED_COLUMNS, scope=scope)
+        m["rows_out"] = len(raw)
     
     print("Cleaning permit data...")
-    cleaned = clean_permits(raw)
+    with instrument("permits.transform", rows_in=len(raw)) as m:
+        cleaned = clean_permits(raw)
+        m["rows_out"] = len(cleaned)
 
     print("Loading to PostGIS...")
-    load_to_postgis(cleaned, table_name="permits", db_url=db_url(), if_exists="replace")
+    with instrument("permits.load", rows_in=len(cleaned)):
+        load_to_postgis(cleaned, table_name="permits", db_url=db_url(), if_exists="replace")
     print("ETL for DOB permits completed.")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,105 @@
+import argparse
+import os
+
+import pandas as pd
+
+from etl.transform.renovation_features import (
+    LOT_COLUMNS, add_lot_columns, compute_renovation_features, flag_properties, lots_for_bins, rebuild_lots,
+    update_renovation_features,
+)
+from etl.transform.snapshot_diff import clear_changes, load_changed_keys
+from nyc_bis_scraper.utils.instrumentation import instrument
+
+SALES_PATH = "data/sales.csv"
+PERMITS_PATH = "data/raw/permits/construction_jobs.parquet"
+BIN_BBL_PATH = "data/api_data/bin_to_bbl_mapping.csv"
+# BINs whose footprint changed since the features last applied them (update_footprints_pipeline.py)
+FOOTPRINT_CHANGES_PATH = "data/snapshots/footprints_changes.parquet"
+FEATURES_PATH = "data/processed/renovation_features.parquet"
+MASTER_PATH = "data/properties_master.csv"
+FLAGS_PATH = "data/processed/properties_with_renovation_flags.csv"
+CHUNK_ROWS = 250_000
+
+
+def read_permits(path):
+    if path.endswith(".parquet"):
+        return pd.read_parquet(path)
+    return pd.read_csv(path, dtype=str, low_memory=False)
+
+
+def write_property_flags(master_path, features, output_path, chunk_rows=CHUNK_ROWS):
+    """
+    Streams the master through flag_properties() into `output_path`
+    (scoring and the renovation map read it), a chunk at a time.
+    """
+    tmp = output_path + ".tmp"
+    rows = 0
+    for chunk in pd.read_csv(master_path, dtype=str, chunksize=chunk_rows, low_memory=False):
+        flag_properties(chunk, features).to_csv(tmp, mode="a" if rows else "w", header=not rows, index=False)
+        rows += len(chunk)
+    if not rows:
+        print(f"Warning: {master_path} has no rows; {output_path} not written")
+        return 0
+    os.replace(tmp, output_path)
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the renovation-after-sale feature table")
+    parser.add_argument("--sales", default=SALES_PATH, help="Sales CSV (output of extractors/sales.py)")
+    parser.add_argument("--permits", default=PERMITS_PATH, help="Permits (Parquet or CSV)")
+    parser.add_argument("--all-permits", default=PERMITS_PATH,
+                        help="Every permit, for the lots --incremental rebuilds after footprint changes")
+    parser.add_argument("--output", default=FEATURES_PATH, help="Feature table (Parquet)")
+    parser.add_argument("--master", default=MASTER_PATH, help="Master to flag (output of property_data_merger.py)")
+    parser.add_argument("--flags-output", default=FLAGS_PATH, help="Master with the flags of each lot's latest sale")
+    parser.add_argument("--window-days", type=int, default=365, help="Days after a sale that count as renovation")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Apply --permits as new permits to the existing feature table")
+    args = parser.parse_args()
+
+    print("🚀 Starting renovation features pipeline...")
+    permits = read_permits(args.permits)
+    bin_bbl = pd.read_csv(BIN_BBL_PATH, dtype=str) if os.path.exists(BIN_BBL_PATH) else None
+    print(f"📥 Loaded {len(permits)} permits")
+
+    with instrument("renovation_features.transform", rows_in=len(permits)) as m:
+        if args.incremental and os.path.exists(args.output):
+            features = pd.read_parquet(args.output)
+            features = update_renovation_features(features, permits, bin_bbl=bin_bbl, window_days=args.window_days)
+            # Changed footprints can move a building's permits to another lot
+            moved = load_changed_keys(FOOTPRINT_CHANGES_PATH)
+            if moved is not None and len(moved):
+                lots = lots_for_bins(features, moved, bin_bbl)
+                print(f"🔁 Rebuilding {len(lots)} lots touched by {len(moved)} changed footprints")
+                sales = pd.read_csv(args.sales, dtype=str, low_memory=False)
+                features = rebuild_lots(features, sales, read_permits(args.all_permits), lots,
+                                        bin_bbl=bin_bbl, window_days=args.window_days)
+        else:
+            sales = pd.read_csv(args.sales, dtype=str, low_memory=False)
+            print(f"📥 Loaded {len(sales)} sales")
+            features = compute_renovation_features(sales, permits, bin_bbl=bin_bbl, window_days=args.window_days)
+        m["rows_out"] = len(features)
+
+    if os.path.exists(args.master):
+        lots = pd.read_csv(args.master, dtype=str, usecols=lambda c: c in ("BBL", *LOT_COLUMNS))
+        features = add_lot_columns(features, lots)
+
+    os.makedirs(os.path.dirname(args.output), exist_ok=True)
+    features.to_parquet(args.output, index=False)
+    # Full builds and incremental ones alike have applied every footprint change
+    clear_changes(FOOTPRINT_CHANGES_PATH)
+    print(f"✅ Wrote {len(features)} sale features "
+          f"({int(features['renovation_after_sale'].sum())} renovated, "
+          f"{int(features['off_market_candidate'].sum())} off-market candidates) to {args.output}")
+
+    if not os.path.exists(args.master):
+        print(f"Warning: {args.master} not found; {args.flags_output} not written")
+        return
+    with instrument("renovation_features.flag_properties") as m:
+        m["rows_out"] = write_property_flags(args.master, features, args.flags_output)
+    print(f"✅ Wrote {m['rows_out']} flagged properties to {args.flags_output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,6 @@
+# Footprint fields needed for the BIN→BBL mapping
+REQUIRED_COLUMNS = ["bin", "base_bbl"]
+
 def extract_bin_bbl(df):
     bin_col = next((c for c in df.columns if "bin" in c.lower()), None)
     bbl_col = next((c for c in df.columns if "bbl" in c.lower()), None)
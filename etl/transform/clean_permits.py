@@ -1,5 +1,12 @@
 import pandas as pd
 
+# Source fields clean_permits reads; fetch_permits(columns=...) pushes these
+# down as $select so the long free-text fields never leave the server
+REQUIRED_COLUMNS = [
+    'bin__', 'job_type', 'permit_type', 'permit_status', 'borough', 'block', 'lot',
+    'community_board', 'work_type', 'filing_date', 'issuance_date', 'expiration_date',
+]
+
 def clean_permits(df):
     # Normalize BIN field
     if 'bin__' in df.columns:
@@ -0,0 +1,134 @@
+"""
+Implied cost per square foot of permitted jobs, checked against
+reference cost bands.
+
+Each job's `estimated_job_cost` is divided by the building area of its
+lot (PLUTO BldgArea, or LotArea where there is no building yet), found
+through BIN → BBL. The result is compared with a $/sq ft band per permit
+job type: the median of the scraped reference costs whose description
+matches the job type, or the configured fallback band. Jobs far below
+the band are likely under-reported; far above, likely mis-keyed.
+
+Everything is array arithmetic over integer keys and job-type codes;
+per-group statistics use np.bincount / groupby on the codes.
+"""
+import numpy as np
+import pandas as pd
+
+from etl.transform.cost_text import parse_amount
+from etl.transform.keys import borough_code, to_int_key
+
+FLAGS = np.array(['unknown', 'under', 'within', 'over'], dtype=object)
+
+
+def reference_bands(reference: pd.DataFrame, bands_config: dict) -> pd.DataFrame:
+    """
+    $/sq ft band per permit job type. `bands_config` maps a job type to
+    {match: regex over reference job_type, low, high}; the median of the
+    matching per-sq-ft reference rows wins over the configured numbers.
+    Returns a frame indexed by job type with low, high and source.
+    """
+    if reference is None or 'cost_unit' not in reference.columns:
+        per_sqft = pd.DataFrame(columns=['job_type', 'cost_low', 'cost_high'])
+    else:
+        per_sqft = reference[reference['cost_unit'] == 'sqft']
+    rows = {}
+    for job_type, band in bands_config.items():
+        matched = per_sqft.iloc[0:0]
+        if band.get('match'):
+            matched = per_sqft[per_sqft['job_type'].astype(str).str.contains(band['match'], case=False, regex=True)]
+        if len(matched):
+            rows[job_type] = (matched['cost_low'].median(), matched['cost_high'].median(), 'reference')
+        else:
+            rows[job_type] = (band.get('low', np.nan), band.get('high', np.nan), 'config')
+    bands = pd.DataFrame.from_dict(rows, orient='index', columns=['low', 'high', 'source'])
+    return bands.astype({'low': float, 'high': float})
+
+
+def _lookup(keys, index_keys, values):
+    """
+    values[i] where index_keys[i] == key, NaN when the key is unknown:
+    a binary search over the sorted index instead of a merge.
+    """
+    out = np.full(len(keys), np.nan)
+    if not len(index_keys):
+        return out
+    order = np.argsort(index_keys, kind='stable')
+    sorted_keys = index_keys[order]
+    pos = np.minimum(np.searchsorted(sorted_keys, keys), len(sorted_keys) - 1)
+    found = sorted_keys[pos] == keys
+    values = pd.Series(values).to_numpy(dtype=float, na_value=np.nan)
+    out[found] = values[order][pos[found]]
+    return out
+
+
+def estimate_permit_costs(permits: pd.DataFrame, bin_bbl: pd.DataFrame, areas: pd.DataFrame,
+                          bands: pd.DataFrame, tolerance: float = 0.0) -> pd.DataFrame:
+    """
+    One row per job (permits deduplicated on job__/job_doc__) with
+    BBL, area, cost_per_sqft, the band and cost_flag (under / within /
+    over / unknown), plus ratio_to_median: the job's $/sq ft over the
+    median of its job type in its borough.
+
+    `bin_bbl` has bin/bbl columns, `areas` BBL plus BldgArea/LotArea
+    (any capitalization). `tolerance` widens the band (0.25 = ±25%).
+    """
+    keys = [c for c in ('job__', 'job_doc__') if c in permits.columns]
+    jobs = permits.drop_duplicates(keys) if keys else permits
+    jobs = jobs.reset_index(drop=True)
+
+    bins = to_int_key(jobs['bin__']).fillna(-1).to_numpy('int64')
+    cost = parse_amount(jobs['estimated_job_cost']).to_numpy()
+
+    mapping = bin_bbl.rename(columns=str.lower)
+    map_bins = to_int_key(mapping['bin']).fillna(-2).to_numpy('int64')
+    bbl = _lookup(bins, map_bins, to_int_key(mapping['bbl']))
+
+    areas = areas.rename(columns=str.lower)
+    area_bbls = to_int_key(areas['bbl']).fillna(-2).to_numpy('int64')
+    bbl_keys = np.where(np.isnan(bbl), -1, bbl).astype('int64')
+    bldg_area = _lookup(bbl_keys, area_bbls, pd.to_numeric(areas['bldgarea'], errors='coerce'))
+    lot_area = _lookup(bbl_keys, area_bbls, pd.to_numeric(areas['lotarea'], errors='coerce'))
+    use_bldg = bldg_area > 0
+    area = np.where(use_bldg, bldg_area, np.where(lot_area > 0, lot_area, np.nan))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        cost_per_sqft = np.where(cost > 0, cost / area, np.nan)
+
+    # Band per job type through integer codes
+    job_type = jobs['job_type'].astype(str).str.strip().str.upper()
+    codes = bands.index.get_indexer(job_type)
+    # Code -1 (no band for this job type) picks the trailing NaN
+    low = np.append(bands['low'].to_numpy(float), np.nan)[codes] * (1 - tolerance)
+    high = np.append(bands['high'].to_numpy(float), np.nan)[codes] * (1 + tolerance)
+
+    known = ~np.isnan(cost_per_sqft) & ~np.isnan(low)
+    flag = np.select([~known, cost_per_sqft < low, cost_per_sqft > high], [0, 1, 3], default=2)
+
+    # Median $/sq ft per (job type, borough) group
+    borough = borough_code(jobs['borough']) if 'borough' in jobs.columns else pd.Series(pd.NA, index=jobs.index)
+    group_median = pd.Series(cost_per_sqft).groupby([job_type, borough], dropna=False).transform('median')
+    with np.errstate(divide='ignore', invalid='ignore'):
+        ratio = cost_per_sqft / group_median.to_numpy()
+
+    out = jobs[[c for c in ('job__', 'job_doc__', 'bin__', 'borough', 'job_type', 'work_type') if c in jobs.columns]].copy()
+    out['BBL'] = pd.array(bbl, dtype='Float64').astype('Int64')
+    out['estimated_job_cost'] = cost
+    out['area_sqft'] = area
+    out['area_basis'] = np.where(use_bldg, 'BldgArea', np.where(np.isnan(area), None, 'LotArea'))
+    out['cost_per_sqft'] = cost_per_sqft
+    out['band_low'] = low
+    out['band_high'] = high
+    out['cost_flag'] = FLAGS[flag]
+    out['ratio_to_median'] = ratio
+    return out
+
+
+def summarize_flags(estimates: pd.DataFrame) -> pd.DataFrame:
+    """
+    Count of jobs per job type and flag (np.bincount over the codes).
+    """
+    types, type_codes = np.unique(estimates['job_type'].astype(str), return_inverse=True)
+    flag_codes = pd.Index(FLAGS).get_indexer(estimates['cost_flag'])
+    counts = np.bincount(type_codes * len(FLAGS) + flag_codes, minlength=len(types) * len(FLAGS))
+    return pd.DataFrame(counts.reshape(len(types), len(FLAGS)), index=pd.Index(types, name='job_type'),
+                        columns=FLAGS)
@@ -0,0 +1,110 @@
+"""
+Vectorized parsing of cost text ("$150–$400 per sq ft", "$1.2M",
+"Usually $1,500 to $5,000") into numeric low / high / unit columns.
+
+One precompiled pattern runs over a whole Series with `str.extractall`,
+so every amount in every string is found in a single pass; the suffix
+(k / M) and unit handling is plain column arithmetic. Cost strings repeat
+a lot (permit cost formats, the same guide line on many pages), so
+parse_cost_text parses each distinct string once.
+"""
+import re
+
+import numpy as np
+import pandas as pd
+
+_NUMBER = r"\d[\d,]*(?:\.\d+)?"
+_SUFFIX = r"(?:[kKmM]\b|thousand\b|million\b)"
+_SEPARATOR = r"\s*(?:-|–|—|to)\s*"
+_UNIT = (
+    r"(?:per\s*|/\s*|an?\s+)"
+    r"(?P<unit>sq(?:uare)?\.?\s*f(?:oo)?t\.?|square\s+f(?:oo|ee)t|sf|project|job|hour|hr|"
+    r"linear\s+f(?:oo|ee)t|lin(?:ear)?\.?\s*ft|room|unit|each)"
+)
+COST_PATTERN = re.compile(
+    rf"\$\s*(?P<low>{_NUMBER})\s*(?P<low_suffix>{_SUFFIX})?"
+    rf"(?:{_SEPARATOR}\$?\s*(?P<high>{_NUMBER})\s*(?P<high_suffix>{_SUFFIX})?)?"
+    rf"(?:\s*{_UNIT})?",
+    re.IGNORECASE,
+)
+
+SUFFIX_MULTIPLIERS = {"k": 1e3, "thousand": 1e3, "m": 1e6, "million": 1e6}
+# Spellings → normalized unit
+UNITS = {
+    "sqft": "sqft", "sf": "sqft", "squarefoot": "sqft", "squarefeet": "sqft",
+    "project": "project", "job": "project",
+    "hour": "hour", "hr": "hour",
+    "linearfoot": "linear_ft", "linearfeet": "linear_ft", "linft": "linear_ft", "linearft": "linear_ft",
+    "room": "each", "unit": "each", "each": "each",
+}
+
+
+def _number(text: pd.Series) -> pd.Series:
+    return pd.to_numeric(text.str.replace(",", "", regex=False), errors="coerce")
+
+
+def _multiplier(suffix: pd.Series) -> pd.Series:
+    return suffix.str.lower().map(SUFFIX_MULTIPLIERS).astype(float).fillna(1.0)
+
+
+def normalize_unit(unit: pd.Series) -> pd.Series:
+    """
+    'per sq. ft' / 'square feet' / 'sf' → 'sqft', etc. Missing stays missing.
+    """
+    key = unit.str.lower().str.replace(r"[^a-z]", "", regex=True)
+    key = key.str.replace(r"^squa?r?e?f", "squaref", regex=True).str.replace(r"^sqf(oo)?t$", "sqft", regex=True)
+    return key.map(UNITS).where(unit.notna())
+
+
+def extract_costs(text: pd.Series) -> pd.DataFrame:
+    """
+    Every cost expression in every string: one row per match, indexed by
+    (original index, match). Columns: low, high (= low for a single
+    amount) and unit (normalized, or missing).
+    """
+    matches = text.astype("string").str.extractall(COST_PATTERN)
+    # "$150–400k": a range with one suffix applies it to both ends
+    low_suffix = matches["low_suffix"].fillna(matches["high_suffix"].where(matches["high"].notna()))
+    low = (_number(matches["low"]) * _multiplier(low_suffix)).astype(float)
+    high = (_number(matches["high"]) * _multiplier(matches["high_suffix"])).astype(float).fillna(low)
+    return pd.DataFrame({
+        "low": np.minimum(low, high),
+        "high": np.maximum(low, high),
+        "unit": normalize_unit(matches["unit"]),
+    })
+
+
+def parse_cost_text(text: pd.Series) -> pd.DataFrame:
+    """
+    One row per input string: cost_low / cost_high over the matches that
+    share the first stated unit (or all matches when none states one),
+    cost_unit, and n_amounts (all matches).
+    Strings without a dollar amount get missing values.
+    """
+    codes, uniques = pd.factorize(text)
+    costs = extract_costs(pd.Series(uniques))
+    level = costs.index.get_level_values(0)
+    first_unit = costs["unit"].groupby(level).transform("first")
+    same_unit = (costs["unit"] == first_unit).fillna(False) | (costs["unit"].isna() & first_unit.isna())
+    kept = costs[same_unit.to_numpy()]
+    by_row = kept.groupby(kept.index.get_level_values(0))
+
+    per_unique = pd.DataFrame(index=pd.RangeIndex(len(uniques)))
+    per_unique["cost_low"] = by_row["low"].min()
+    per_unique["cost_high"] = by_row["high"].max()
+    per_unique["cost_unit"] = by_row["unit"].first().astype(object)
+    per_unique["n_amounts"] = costs.groupby(level).size().reindex(per_unique.index, fill_value=0)
+
+    # Missing strings (code -1) get an all-missing row
+    per_unique.loc[len(uniques)] = [np.nan, np.nan, None, 0]
+    out = per_unique.take(np.where(codes < 0, len(uniques), codes))
+    out.index = text.index
+    return out.astype({"n_amounts": int})
+
+
+def parse_amount(values: pd.Series) -> pd.Series:
+    """
+    Single money values ("$45,000.00", "45000", 45000.0) → float.
+    """
+    text = values.astype("string").str.replace(r"[$,\s]", "", regex=True)
+    return pd.to_numeric(text, errors="coerce").astype(float)
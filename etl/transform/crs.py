@@ -0,0 +1,125 @@
+"""
+Coordinate reference system handling.
+
+Everything the pipeline stores is in TARGET_CRS (lon/lat). Data is
+reprojected once, when it enters the pipeline; later steps only check.
+Transforms go through a cached pyproj Transformer applied to whole
+coordinate arrays, and the CRS of a frame is checked against what its
+coordinates look like instead of being assumed.
+"""
+from functools import lru_cache
+
+import geopandas as gpd
+import numpy as np
+import shapely
+from pyproj import CRS, Transformer
+
+from etl.transform.geometry_decode import decode_geometries, detect_encodings
+
+TARGET_CRS = "EPSG:4326"
+
+# Envelope of the five boroughs (with margin) in the CRSs NYC sources use
+NYC_EXTENTS = {
+    "EPSG:4326": (-74.35, 40.40, -73.60, 41.00),
+    "EPSG:2263": (880_000, 100_000, 1_080_000, 290_000),     # NY State Plane Long Island, US ft
+    "EPSG:3857": (-8_280_000, 4_920_000, -8_190_000, 5_010_000),  # Web Mercator (ArcGIS default)
+}
+
+
+def _crs_name(crs):
+    return CRS.from_user_input(crs).to_string()
+
+
+@lru_cache(maxsize=None)
+def get_transformer(src: str, dst: str) -> Transformer:
+    """
+    Cached always_xy Transformer; building one costs far more than using it.
+    """
+    return Transformer.from_crs(src, dst, always_xy=True)
+
+
+def transform_geometries(geoms, src, dst=TARGET_CRS):
+    """
+    Reprojects a geometry array with one vectorized call on all coordinates.
+    """
+    transformer = get_transformer(_crs_name(src), _crs_name(dst))
+
+    def _project(coords):
+        x, y = transformer.transform(coords[:, 0], coords[:, 1])
+        return np.column_stack([x, y])
+
+    return shapely.transform(np.asarray(geoms, dtype=object), _project)
+
+
+def detect_crs(geoms):
+    """
+    Which known CRS the coordinates fall in for NYC, from the 1st-99th
+    percentile of the geometry bounds (so a few stray shapes don't
+    decide). None if they match no known extent.
+    """
+    bounds = shapely.bounds(np.asarray(geoms, dtype=object))
+    bounds = bounds[~np.isnan(bounds).any(axis=1)]
+    if not len(bounds):
+        return None
+    minx, miny = np.percentile(bounds[:, 0], 1), np.percentile(bounds[:, 1], 1)
+    maxx, maxy = np.percentile(bounds[:, 2], 99), np.percentile(bounds[:, 3], 99)
+    for name, (x0, y0, x1, y1) in NYC_EXTENTS.items():
+        if x0 <= minx and maxx <= x1 and y0 <= miny and maxy <= y1:
+            return name
+    return None
+
+
+def detect_column_crs(series, sample=50_000):
+    """
+    detect_crs for a geometry text column, from a fixed sample of at most
+    `sample` of its non-missing values. None if it has none.
+    """
+    values = series.dropna()
+    if len(values) > sample:
+        values = values.sample(sample, random_state=0)
+    geoms, _ = decode_geometries(values)
+    return detect_crs(geoms)
+
+
+def ensure_crs(gdf: gpd.GeoDataFrame, target=TARGET_CRS) -> gpd.GeoDataFrame:
+    """
+    Returns `gdf` in `target`, reprojecting only if needed.
+
+    The source CRS is the declared one, checked against the coordinates;
+    an undeclared CRS is detected from them. Raises ValueError when the
+    declared CRS contradicts the coordinates or when neither is known.
+    """
+    geoms = gdf.geometry.to_numpy()
+    declared = _crs_name(gdf.crs) if gdf.crs is not None else None
+    detected = detect_crs(geoms)
+    if declared and detected and declared != detected:
+        raise ValueError(f"CRS mismatch: frame declares {declared} but its coordinates look like {detected}")
+    source = declared or detected
+    if source is None:
+        raise ValueError("Cannot determine the CRS: none declared and coordinates match no known NYC extent")
+
+    target = _crs_name(target)
+    if source == target:
+        return gdf if declared else gdf.set_crs(target)
+    print(f"🌐 Reprojecting {len(gdf)} geometries {source} → {target}")
+    out = gdf.copy()
+    out[gdf.geometry.name] = gpd.GeoSeries(transform_geometries(geoms, source, target), index=gdf.index, crs=target)
+    return out.set_crs(target, allow_override=True)
+
+
+def wkt_to_target(series, target=TARGET_CRS, source=None):
+    """
+    Reprojects a geometry text column (as read from CSV: WKT, WKB hex or
+    GeoJSON, see decode_geometries) to `target` as WKT. The source CRS is
+    detected (detect_column_crs) unless given as `source`, e.g. when it
+    was detected once on the whole column and only some rows are
+    converted. A WKT column already in `target` is returned as is,
+    without decoding it; otherwise unparseable values become missing.
+    """
+    source = source or detect_column_crs(series)
+    if (source is not None and _crs_name(source) == _crs_name(target)
+            and detect_encodings(series).dropna().eq("wkt").all()):
+        return series
+    geoms, _ = decode_geometries(series)
+    gdf = ensure_crs(gpd.GeoDataFrame(geometry=gpd.GeoSeries(geoms, index=series.index), crs=source), target)
+    return gdf.geometry.to_wkt().where(gdf.geometry.notna())
@@ -0,0 +1,146 @@
+"""
+Decoding of geometry columns read back from CSV.
+
+Geometry text comes in several encodings depending on which step wrote
+the file: WKT (shapely/geopandas exports), WKB hex (PostGIS), GeoJSON,
+or the Python repr of a GeoJSON-like dict (str() of an API record, as in
+the merged master's geometry_x). `decode_geometries` detects the
+encoding per row and decodes each group with one vectorized shapely call.
+Python-repr dicts are rewritten to JSON with vectorized string ops first;
+only rows that still fail are parsed one by one with ast.literal_eval,
+spread over a process pool in chunks when there are many of them.
+"""
+import ast
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import geopandas as gpd
+import numpy as np
+import pandas as pd
+import shapely
+from shapely.geometry import shape
+
+# Python-repr dicts are parsed in-process below this many rows
+POOL_THRESHOLD = 20_000
+CHUNK_SIZE = 10_000
+
+
+def detect_encodings(values: pd.Series) -> pd.Series:
+    """
+    Encoding of each value: 'wkt', 'wkb_hex', 'wkb', 'geojson', 'repr',
+    'mapping' (an actual dict / __geo_interface__ object), 'geometry'
+    (already shapely); missing values stay missing.
+    """
+    kinds = pd.Series(None, index=values.index, dtype=object)
+    present = values.notna()
+    is_str = present & values.map(lambda v: isinstance(v, str))
+    text = values[is_str].str.lstrip()
+
+    dict_like = text.str.startswith('{')
+    kinds[text.index[dict_like]] = np.where(text[dict_like].str.contains('"type"', regex=False), 'geojson', 'repr')
+    hex_like = ~dict_like & text.str.fullmatch(r'(?:[0-9A-Fa-f]{2})+\s*')
+    kinds[text.index[hex_like]] = 'wkb_hex'
+    kinds[text.index[~dict_like & ~hex_like]] = 'wkt'
+
+    other = values[present & ~is_str]
+    if len(other):
+        kinds[other.index] = [
+            'geometry' if isinstance(v, shapely.Geometry) else
+            'wkb' if isinstance(v, (bytes, bytearray)) else
+            'mapping' for v in other
+        ]
+    return kinds
+
+
+def _shape_or_none(value):
+    try:
+        return shape(value)
+    except Exception:
+        return None
+
+
+def _decode_repr_chunk(texts):
+    """
+    Worker: Python-repr dicts → WKB (cheaper to send back than geometries).
+    """
+    out = []
+    for text in texts:
+        try:
+            geom = shape(ast.literal_eval(text))
+            out.append(shapely.to_wkb(geom))
+        except Exception:
+            out.append(None)
+    return out
+
+
+# repr → JSON: quotes, tuples → arrays, None → null
+_REPR_TO_JSON = str.maketrans({"'": '"', '(': '[', ')': ']'})
+
+
+def _repr_as_geojson(texts: pd.Series):
+    """
+    Vectorized rewrite of GeoJSON-like dict reprs as JSON, decoded with
+    from_geojson. Rows it cannot handle (quotes inside strings, odd
+    values) come back as None.
+    """
+    json_text = (texts.str.translate(_REPR_TO_JSON)
+                 .str.replace(r',\s*\]', ']', regex=True)
+                 .str.replace(r'\bNone\b', 'null', regex=True))
+    return shapely.from_geojson(json_text.to_numpy(dtype=object), on_invalid='ignore')
+
+
+def _decode_repr(texts, workers=None, chunk_size=CHUNK_SIZE):
+    """
+    Python-repr dicts: vectorized JSON rewrite, then literal_eval for the
+    rows that rewrite missed.
+    """
+    out = _repr_as_geojson(pd.Series(texts, dtype=object))
+    missed = np.flatnonzero(shapely.is_missing(out))
+    if len(missed):
+        out[missed] = _literal_eval_repr(np.asarray(texts, dtype=object)[missed], workers, chunk_size)
+    return out
+
+
+def _literal_eval_repr(texts, workers=None, chunk_size=CHUNK_SIZE):
+    texts = list(texts)
+    if len(texts) < POOL_THRESHOLD or workers == 1:
+        wkb = _decode_repr_chunk(texts)
+    else:
+        chunks = [texts[i:i + chunk_size] for i in range(0, len(texts), chunk_size)]
+        with ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as pool:
+            wkb = [g for part in pool.map(_decode_repr_chunk, chunks) for g in part]
+    return shapely.from_wkb(np.array(wkb, dtype=object))
+
+
+def decode_geometries(values, crs=None, workers=None):
+    """
+    Decodes a column of geometries in any of the encodings above.
+
+    Returns (GeometryArray, failed): `failed` is a boolean array marking
+    rows that held a value which could not be decoded. Missing values
+    decode to None and are not counted as failures.
+    """
+    values = pd.Series(values).reset_index(drop=True)
+    kinds = detect_encodings(values)
+    out = np.full(len(values), None, dtype=object)
+
+    for kind, rows in kinds.groupby(kinds, sort=False).groups.items():
+        rows = rows.to_numpy()
+        chunk = values.to_numpy(dtype=object)[rows]
+        if kind == 'wkt':
+            out[rows] = shapely.from_wkt(chunk, on_invalid='ignore')
+        elif kind in ('wkb_hex', 'wkb'):
+            if kind == 'wkb_hex':
+                chunk = np.array([v.strip() for v in chunk], dtype=object)
+            out[rows] = shapely.from_wkb(chunk, on_invalid='ignore')
+        elif kind == 'geojson':
+            out[rows] = shapely.from_geojson(chunk, on_invalid='ignore')
+        elif kind == 'repr':
+            out[rows] = _decode_repr(chunk, workers)
+        elif kind == 'mapping':
+            out[rows] = [_shape_or_none(v) for v in chunk]
+        else:
+            out[rows] = chunk
+
+    failed = kinds.notna().to_numpy() & shapely.is_missing(out)
+    return gpd.array.from_shapely(out, crs=crs), failed
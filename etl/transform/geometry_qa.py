@@ -0,0 +1,231 @@
+"""
+Vectorized geometry assembly, repair and validation for parcels and
+footprints.
+
+Esri JSON polygons are a flat list of rings: outer rings run clockwise,
+holes counter-clockwise, and a lot with several buildings has several
+outer rings. `esri_rings_to_geometries` turns them into Polygons /
+MultiPolygons by orientation in one pass over all coordinates.
+
+`geometry_qa` then runs shapely's validity checks over the whole column,
+repairs invalid shapes with `make_valid` and sets aside (quarantines)
+rows that cannot be turned into a polygon, writing them to disk with
+the reason instead of dropping them silently.
+"""
+import os
+from collections import Counter
+from itertools import chain
+
+import numpy as np
+import pandas as pd
+import shapely
+
+POLYGONAL = (shapely.GeometryType.POLYGON, shapely.GeometryType.MULTIPOLYGON)
+QUARANTINE_DIR = "data/quarantine"
+
+
+def _ring_signed_areas(coords, starts, lengths):
+    """
+    Shoelace area per ring (positive = counter-clockwise). Coordinates are
+    shifted to each ring's first vertex to keep lon/lat products exact.
+    """
+    owner = np.repeat(np.arange(len(starts)), lengths)
+    local = coords - coords[starts][owner]
+    x, y = local[:, 0], local[:, 1]
+    cross = np.zeros(len(coords))
+    cross[:-1] = x[:-1] * y[1:] - x[1:] * y[:-1]
+    cross[starts + lengths - 1] = 0  # no segment between one ring's end and the next ring's start
+    return np.add.reduceat(cross, starts) / 2 if len(starts) else np.zeros(0)
+
+
+def _take_rings(coords, starts, lengths, order):
+    """
+    Coordinates of the rings in `order`, plus their new start offsets.
+    """
+    lengths = lengths[order]
+    offsets = np.concatenate([[0], np.cumsum(lengths)])
+    index = np.repeat(starts[order] - offsets[:-1], lengths) + np.arange(offsets[-1])
+    return coords[index], offsets
+
+
+def esri_rings_to_geometries(geometries):
+    """
+    Assembles Esri ring lists ({'rings': [...]}, a bare ring list, or None
+    per feature) into a shapely array of Polygon / MultiPolygon / None.
+
+    Each hole goes to the outer ring before it when that ring contains it,
+    otherwise to whichever outer ring of the same feature does. Features
+    with no clockwise ring (wrong winding) treat every ring as an outer
+    ring. Returns (geometries, stats).
+    """
+    n = len(geometries)
+    rings = [g.get('rings') if isinstance(g, dict) else g for g in geometries]
+    rings_per = np.fromiter((len(r) if r else 0 for r in rings), np.int64, n)
+    flat = list(chain.from_iterable(r for r in rings if r))
+    lengths = np.fromiter((len(r) for r in flat), np.int64, len(flat))
+    coords = np.fromiter(
+        chain.from_iterable(p[:2] for p in chain.from_iterable(flat)), np.float64, int(lengths.sum()) * 2,
+    ).reshape(-1, 2)
+    starts = np.concatenate([[0], np.cumsum(lengths)[:-1]]).astype(np.int64) if len(flat) else np.zeros(0, np.int64)
+    feature = np.repeat(np.arange(n), rings_per)
+
+    stats = Counter()
+    # Rings that cannot form a LinearRing (too short or not closed)
+    ok = lengths >= 4
+    ok[ok] = (coords[starts[ok]] == coords[starts[ok] + lengths[ok] - 1]).all(axis=1)
+    stats['dropped_rings'] = int((~ok).sum())
+    coords, offsets = _take_rings(coords, starts, lengths, np.flatnonzero(ok))
+    starts, lengths, feature = offsets[:-1], lengths[ok], feature[ok]
+
+    area = _ring_signed_areas(coords, starts, lengths)
+    clockwise = area < 0
+    has_clockwise = np.bincount(feature[clockwise], minlength=n) > 0
+    exterior = clockwise | ~has_clockwise[feature]
+    stats['rewound_features'] = int((~has_clockwise & (np.bincount(feature, minlength=n) > 0)).sum())
+
+    # Provisional owner of each hole: the closest outer ring before it
+    polygon = np.cumsum(exterior) - 1
+    poly_feature = feature[exterior]
+    hole = np.flatnonzero(~exterior)
+    orphan = (polygon[hole] < 0) | (poly_feature[np.maximum(polygon[hole], 0)] != feature[hole])
+
+    if len(hole):
+        shells = shapely.from_ragged_array(
+            shapely.GeometryType.POLYGON,
+            *_ring_shells(coords, starts, lengths, exterior),
+        )
+        probe = shapely.points(coords[starts[hole]])
+        inside = np.zeros(len(hole), bool)
+        checked = ~orphan
+        inside[checked] = shapely.contains(shells[polygon[hole][checked]], probe[checked])
+        # Rare: hole listed after another outer ring of the same feature
+        for i in np.flatnonzero(~inside):
+            candidates = np.flatnonzero(poly_feature == feature[hole[i]])
+            owner = candidates[shapely.contains(shells[candidates], probe[i])]
+            if len(owner):
+                polygon[hole[i]] = owner[0]
+                stats['reassigned_holes'] += 1
+            else:
+                polygon[hole[i]] = -1
+                stats['orphan_holes'] += 1
+
+    keep = polygon >= 0
+    order = np.flatnonzero(keep)[np.lexsort((~exterior[keep], polygon[keep]))]
+    ring_coords, ring_offsets = _take_rings(coords, starts, lengths, order)
+    rings_per_poly = np.bincount(polygon[order], minlength=int(exterior.sum()))
+    poly_offsets = np.concatenate([[0], np.cumsum(rings_per_poly)])
+    polygons = shapely.from_ragged_array(
+        shapely.GeometryType.POLYGON, ring_coords, (ring_offsets, poly_offsets),
+    ) if len(order) else np.empty(0, dtype=object)
+
+    out = np.full(n, None, dtype=object)
+    parts_per = np.bincount(poly_feature, minlength=n)
+    single = parts_per == 1
+    out[single] = polygons[np.isin(poly_feature, np.flatnonzero(single))]
+    multi = np.flatnonzero(parts_per > 1)
+    if len(multi):
+        in_multi = np.isin(poly_feature, multi)
+        grouped = shapely.multipolygons(polygons[in_multi], indices=np.searchsorted(multi, poly_feature[in_multi]))
+        out[multi] = grouped
+    stats['multipart'] = int(len(multi))
+    stats['missing'] = int((parts_per == 0).sum())
+    return out, dict(stats)
+
+
+def _ring_shells(coords, starts, lengths, exterior):
+    """
+    (coords, offsets) for single-ring polygons of the outer rings only.
+    """
+    order = np.flatnonzero(exterior)
+    ring_coords, ring_offsets = _take_rings(coords, starts, lengths, order)
+    return ring_coords, (ring_offsets, np.arange(len(order) + 1))
+
+
+def _polygonal_part(geoms):
+    """
+    Polygonal part of each geometry (make_valid can return collections
+    with stray lines/points); None where nothing polygonal is left.
+    """
+    out = np.full(len(geoms), None, dtype=object)
+    types = shapely.get_type_id(geoms)
+    direct = np.isin(types, POLYGONAL)
+    out[direct] = geoms[direct]
+    mixed = np.flatnonzero(types == shapely.GeometryType.GEOMETRYCOLLECTION)
+    if len(mixed):
+        parts, idx = shapely.get_parts(geoms[mixed], return_index=True)
+        # MultiPolygon members of a collection → single polygons
+        parts, sub = shapely.get_parts(parts, return_index=True)
+        idx = idx[sub]
+        polygonal = shapely.get_type_id(parts) == shapely.GeometryType.POLYGON
+        if polygonal.any():
+            rebuilt = shapely.multipolygons(parts[polygonal], indices=idx[polygonal])
+            has = np.unique(idx[polygonal])
+            out[mixed[has]] = rebuilt[has]
+    return out
+
+
+def repair_geometries(geoms):
+    """
+    Validates and repairs a geometry array.
+    Returns (geometries, status, reason): status is 'valid', 'repaired'
+    or 'quarantined'; reason holds is_valid_reason for anything not valid.
+    """
+    geoms = np.asarray(geoms, dtype=object)
+    status = np.full(len(geoms), 'valid', dtype=object)
+    reason = np.full(len(geoms), None, dtype=object)
+    out = geoms.copy()
+
+    missing = shapely.is_missing(geoms) | shapely.is_empty(geoms)
+    status[missing], reason[missing] = 'quarantined', 'Missing geometry'
+
+    invalid = ~missing & ~shapely.is_valid(geoms)
+    if invalid.any():
+        reason[invalid] = shapely.is_valid_reason(geoms[invalid])
+        fixed = _polygonal_part(shapely.make_valid(geoms[invalid]))
+        failed = shapely.is_missing(fixed) | shapely.is_empty(fixed)
+        out[invalid] = np.where(failed, None, fixed)
+        status[np.flatnonzero(invalid)[~failed]] = 'repaired'
+        status[np.flatnonzero(invalid)[failed]] = 'quarantined'
+
+    # Valid but not polygonal (e.g. a stray point) is not a parcel either
+    wrong_type = (status == 'valid') & ~np.isin(shapely.get_type_id(geoms), POLYGONAL)
+    status[wrong_type] = 'quarantined'
+    reason[wrong_type] = [f"Not a polygon: {g.geom_type}" for g in geoms[wrong_type]]
+    return out, status, reason
+
+
+def geometry_qa(gdf, dataset, quarantine_dir=QUARANTINE_DIR):
+    """
+    Repairs `gdf`'s geometry column in place of the originals and moves
+    unrepairable rows to <quarantine_dir>/<dataset>.parquet (with a
+    `qa_reason` column). Returns (clean GeoDataFrame, stats dict); stats
+    include any ring-assembly counts left in gdf.attrs by the extractor.
+    """
+    original = gdf.geometry.to_numpy()
+    geoms, status, reason = repair_geometries(original)
+    gdf = gdf.copy()
+    gdf[gdf.geometry.name] = geoms
+
+    bad = status == 'quarantined'
+    stats = {
+        'total': len(gdf),
+        'valid': int((status == 'valid').sum()),
+        'repaired': int((status == 'repaired').sum()),
+        'quarantined': int(bad.sum()),
+        # "Self-intersection[x y]" → "Self-intersection"
+        'reasons': dict(Counter(str(r).split('[')[0] for r in reason[status != 'valid'])),
+        **gdf.attrs.get('geometry_assembly', {}),
+    }
+
+    if bad.any():
+        quarantined = gdf[bad].assign(qa_reason=reason[bad])
+        os.makedirs(quarantine_dir, exist_ok=True)
+        path = os.path.join(quarantine_dir, f"{dataset}.parquet")
+        pd.DataFrame(quarantined.drop(columns=gdf.geometry.name)).assign(
+            wkb=shapely.to_wkb(original[bad])
+        ).to_parquet(path, index=False)
+        print(f"⚠️ Quarantined {int(bad.sum())} {dataset} rows to {path}")
+
+    print(f"🧪 Geometry QA for {dataset}: {stats['valid']} valid, {stats['repaired']} repaired, "
+          f"{stats['quarantined']} quarantined")
+    return gdf[~bad], stats
@@ -0,0 +1,77 @@
+import pandas as pd
+
+# Borough names/abbreviations used across NYC datasets → DOF borough digit
+BOROUGH_CODES = {
+    'MANHATTAN': 1, 'MN': 1, '1': 1,
+    'BRONX': 2, 'BX': 2, '2': 2,
+    'BROOKLYN': 3, 'BK': 3, '3': 3,
+    'QUEENS': 4, 'QN': 4, '4': 4,
+    'STATEN ISLAND': 5, 'SI': 5, '5': 5,
+}
+
+
+def borough_code(series: pd.Series) -> pd.Series:
+    """
+    Maps borough names, abbreviations or digits to the 1-5 DOF code.
+    Unknown values become <NA>.
+    """
+    text = series.astype(str).str.strip().str.upper().str.replace(r"\.0+$", "", regex=True)
+    return text.map(BOROUGH_CODES).astype("Int64")
+
+
+def _arrow_int_key(series: pd.Series):
+    """
+    to_int_key for Arrow-backed strings, parsed inside pyarrow. None when
+    some value is not a plain integer (the generic path handles those).
+    """
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    text = pc.replace_substring_regex(pc.utf8_trim_whitespace(pa.array(series.array)), r"\.0+$", "")
+    text = pc.if_else(pc.equal(text, ""), pa.scalar(None, text.type), text)
+    if pc.all(pc.match_substring_regex(text, r"^[+-]?[0-9]{1,18}$")).as_py() is False:
+        return None
+    ints = pc.cast(text, pa.int64())
+    return pd.Series(pd.Int64Dtype().__from_arrow__(ints), index=series.index, name=series.name)
+
+
+def to_int_key(series: pd.Series) -> pd.Series:
+    """
+    Converts a BIN/BBL column (str, float or int) to nullable Int64.
+    Handles trailing '.0' left behind by CSV round trips.
+    """
+    if pd.api.types.is_integer_dtype(series):
+        return series.astype("Int64")
+    if isinstance(series.dtype, pd.StringDtype) and series.dtype.storage == "pyarrow":
+        keys = _arrow_int_key(series)
+        if keys is not None:
+            return keys
+    text = series.astype(str).str.strip().str.replace(r"\.0+$", "", regex=True)
+    return pd.to_numeric(text, errors="coerce").astype("Int64")
+
+
+def bbl_from_parts(borough: pd.Series, block: pd.Series, lot: pd.Series) -> pd.Series:
+    """
+    Builds an integer BBL (boro * 1e9 + block * 1e4 + lot) without
+    string padding. Works for both 4- and 5-digit lot formats.
+    """
+    boro = borough_code(borough)
+    block = pd.to_numeric(block, errors="coerce").astype("Int64")
+    lot = pd.to_numeric(lot, errors="coerce").astype("Int64")
+    return boro * 1_000_000_000 + block * 10_000 + lot
+
+
+def bbl_to_str(series: pd.Series) -> pd.Series:
+    """
+    Formats integer BBLs as the 10-digit strings used in CSV outputs.
+    """
+    keys = series.astype("Int64")
+    return keys.astype(str).str.zfill(10).where(keys.notna())
+
+
+def bin_to_str(series: pd.Series) -> pd.Series:
+    """
+    Formats integer BINs as 7-digit strings.
+    """
+    keys = series.astype("Int64")
+    return keys.astype(str).str.zfill(7).where(keys.notna())
@@ -0,0 +1,73 @@
+"""
+Latest and previous sale per lot, without sorting the sales.
+
+Lots are factorized once (a hash pass over integer BBLs), the latest date
+per lot is a grouped maximum over int64 nanoseconds (np.maximum.at) and
+its row is the last row holding that maximum. Masking those rows out and
+repeating gives the previous sale, so resales (flips) come out with the
+price change between the two.
+"""
+import numpy as np
+import pandas as pd
+
+from etl.transform.keys import to_int_key
+
+_MISSING = np.iinfo(np.int64).min
+
+
+def _latest_rows(codes, stamps, n_groups):
+    """
+    Row of the latest stamp per group (the last such row on ties);
+    -1 for groups without a valid stamp.
+    """
+    latest = np.full(n_groups, _MISSING, dtype=np.int64)
+    np.maximum.at(latest, codes, stamps)
+    hit = (stamps == latest[codes]) & (stamps != _MISSING)
+    rows = np.full(n_groups, -1, dtype=np.int64)
+    np.maximum.at(rows, codes[hit], np.flatnonzero(hit))
+    return rows
+
+
+def latest_sales(sales: pd.DataFrame, key: str = "BBL", date_col: str = "SALE DATE",
+                 price_col: str = "SALE PRICE") -> pd.DataFrame:
+    """
+    One row per lot with its latest sale (`date_col`, `price_col`) and the
+    sale before it: previous_sale_date, previous_sale_price,
+    sale_price_delta (latest minus previous) and days_since_previous_sale.
+    `key` is returned as Int64; sales without a key or date are ignored.
+    """
+    keys = to_int_key(sales[key])
+    dates = pd.to_datetime(sales[date_col], errors="coerce").astype("datetime64[ns]")
+    prices = (pd.to_numeric(sales[price_col], errors="coerce").to_numpy(dtype=float, na_value=np.nan)
+              if price_col in sales.columns else np.full(len(sales), np.nan))
+
+    valid = (keys.notna() & dates.notna()).to_numpy()
+    codes, lots = pd.factorize(keys[valid].to_numpy(dtype="int64"))
+    stamps = dates[valid].to_numpy().view(np.int64)
+    prices = prices[valid]
+
+    latest = _latest_rows(codes, stamps, len(lots))
+    # Previous sale: the latest among the rows that are not the latest
+    masked = stamps.copy()
+    masked[latest] = _MISSING
+    previous = _latest_rows(codes, masked, len(lots))
+    has_previous = previous >= 0
+
+    def at(values, rows, fill):
+        out = np.full(len(rows), fill, dtype=values.dtype)
+        out[rows >= 0] = values[rows[rows >= 0]]
+        return out
+
+    last_date = stamps[latest].view("datetime64[ns]")
+    prev_date = at(stamps, previous, _MISSING).view("datetime64[ns]")
+    prev_date[~has_previous] = np.datetime64("NaT")
+    out = pd.DataFrame({
+        key: pd.array(lots, dtype="Int64"),
+        date_col: last_date,
+        price_col: prices[latest],
+        "previous_sale_date": prev_date,
+        "previous_sale_price": at(prices, previous, np.nan),
+    })
+    out["sale_price_delta"] = out[price_col] - out["previous_sale_price"]
+    out["days_since_previous_sale"] = (out[date_col] - out["previous_sale_date"]).dt.days.astype("Int32")
+    return out
@@ -0,0 +1,46 @@
+"""
+Permit job numbers per building, aggregated without a Python call per group.
+
+BINs and jobs are factorized in sorted order and each distinct (BIN, job)
+pair packed into one int64, so dedup and sort are one integer sort.
+Each BIN's jobs are then a contiguous run: the run boundaries become the
+offsets of an Arrow list array and joining them is a single pyarrow
+kernel:
+
+    BIN      job__            BIN      all_permits
+    1000001  B2        →      1000001  "A1;B2"       (or ["A1", "B2"])
+    1000001  A1               1000002  "C3"
+    1000002  C3
+"""
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+SEPARATOR = ";"
+
+
+def aggregate_jobs(permits: pd.DataFrame, key: str = "BIN", job_col: str = "job__",
+                   out_col: str = "all_permits", as_list: bool = False, sep: str = SEPARATOR) -> pd.DataFrame:
+    """
+    One row per `key` with its distinct jobs in sorted order, joined by
+    `sep` (the old ";".join(sorted(set(jobs)))) or, with `as_list`, as an
+    Arrow list<string> column. Rows without a key or a job are ignored.
+    """
+    pairs = permits[[key, job_col]].dropna()
+    key_codes, key_values = pd.factorize(pairs[key].astype(str), sort=True)
+    job_codes, job_values = pd.factorize(pairs[job_col].astype(str), sort=True)
+
+    packed = np.sort(key_codes.astype(np.int64) * max(len(job_values), 1) + job_codes)
+    packed = packed[np.r_[True, packed[1:] != packed[:-1]]] if len(packed) else packed
+    key_codes, job_codes = np.divmod(packed, max(len(job_values), 1))
+    starts = np.flatnonzero(np.r_[True, key_codes[1:] != key_codes[:-1]]) if len(packed) else packed
+    offsets = pa.array(np.r_[starts, len(packed)].astype(np.int32))
+    jobs = pa.ListArray.from_arrays(offsets, pa.array(np.asarray(job_values, dtype=object)[job_codes], pa.string()))
+
+    if as_list:
+        values = pd.array(jobs, dtype=pd.ArrowDtype(jobs.type))
+    else:
+        values = pd.array(pc.binary_join(jobs, sep), dtype="str")
+    return pd.DataFrame({key: pd.array(np.asarray(key_values, dtype=object)[key_codes[starts]], dtype="str"),
+                         out_col: values})
@@ -0,0 +1,290 @@
+"""
+Computes the renovation-after-sale features consumed by the analysis
+scripts (days_to_permit, renovation_after_sale, off_market_candidate).
+
+Each sale is matched to the first permit issued on or after the sale date
+for the same BBL with an as-of join. A permit issued after the *next* sale
+of the same lot belongs to that later sale, so it is not credited twice.
+
+flag_properties() puts the features of each lot's latest sale on the
+per-building master, for the scoring and map stages.
+"""
+import numpy as np
+import pandas as pd
+
+from etl.transform.keys import bbl_from_parts, to_int_key
+
+# Raw API fields prepare_sales / prepare_permits read, for $select pushdown
+SALES_COLUMNS = ['borough', 'block', 'lot', 'sale_date', 'sale_price', 'neighborhood']
+PERMIT_COLUMNS = ['bin__', 'job__', 'job_type', 'borough', 'block', 'lot', 'issuance_date', 'filing_date']
+
+# Column types of the feature table (one row per sale)
+FEATURE_DTYPES = {
+    'BBL': 'int64',
+    'SALE DATE': 'datetime64[ns]',
+    'SALE PRICE': 'float64',
+    'NEIGHBORHOOD': 'string',
+    'next_sale_date': 'datetime64[ns]',
+    'permit_date': 'datetime64[ns]',
+    'permit_bin': 'Int64',
+    'permit_job': 'string',
+    'permit_job_type': 'string',
+    'days_to_permit': 'Int32',
+    'renovation_after_sale': 'bool',
+    'off_market_candidate': 'bool',
+}
+
+# Feature columns flag_properties() adds to the master, by output name
+PROPERTY_FLAGS = {
+    'NEIGHBORHOOD': 'NEIGHBORHOOD',
+    'days_to_permit': 'days_to_permit',
+    'renovation_after_sale': 'renovation_after_sale',
+    'off_market_candidate': 'off_market_candidate',
+    'permit_date': 'issuance_date',
+    'permit_job_type': 'job_type',
+}
+
+# Lot attributes the feature table carries from the master, for breakdowns
+# (analyze_renovation_stats groups by zoning)
+LOT_COLUMNS = ['ZoneDist1']
+
+
+def prepare_sales(sales: pd.DataFrame) -> pd.DataFrame:
+    """
+    Normalizes a sales frame (API or manual-style columns) to
+    BBL / SALE DATE / SALE PRICE / NEIGHBORHOOD with proper dtypes.
+    """
+    if 'BBL' in sales.columns:
+        bbl = to_int_key(sales['BBL'])
+    elif 'bbl' in sales.columns:
+        bbl = to_int_key(sales['bbl'])
+    elif all(c in sales.columns for c in ('borough', 'block', 'lot')):
+        bbl = bbl_from_parts(sales['borough'], sales['block'], sales['lot'])
+    else:
+        raise KeyError(f"Sales frame has no BBL or borough/block/lot columns; got: {sales.columns.tolist()}")
+
+    date_col = 'SALE DATE' if 'SALE DATE' in sales.columns else 'sale_date'
+    price_col = 'SALE PRICE' if 'SALE PRICE' in sales.columns else 'sale_price'
+    hood_col = 'NEIGHBORHOOD' if 'NEIGHBORHOOD' in sales.columns else 'neighborhood'
+
+    out = pd.DataFrame({
+        'BBL': bbl,
+        'SALE DATE': pd.to_datetime(sales[date_col], errors='coerce').astype('datetime64[ns]'),
+        'SALE PRICE': pd.to_numeric(sales.get(price_col), errors='coerce'),
+        'NEIGHBORHOOD': sales.get(hood_col),
+    })
+    out = out.dropna(subset=['BBL', 'SALE DATE'])
+    # Same lot sold twice on the same day (multi-unit deeds) counts as one sale
+    out = out.drop_duplicates(subset=['BBL', 'SALE DATE'], keep='last')
+    out['BBL'] = out['BBL'].astype('int64')
+    return out
+
+
+def prepare_permits(permits: pd.DataFrame, bin_bbl: pd.DataFrame = None) -> pd.DataFrame:
+    """
+    Normalizes DOB permits to BBL / permit_date / permit_bin / permit_job.
+    BBL comes from borough/block/lot when present, otherwise from a
+    BIN→BBL mapping frame.
+    """
+    bin_col = next((c for c in ('bin__', 'bin', 'BIN') if c in permits.columns), None)
+    date_col = next((c for c in ('issuance_date', 'filing_date') if c in permits.columns), None)
+    if date_col is None:
+        raise KeyError(f"Permits frame has no issuance/filing date; got: {permits.columns.tolist()}")
+
+    out = pd.DataFrame({
+        'permit_date': pd.to_datetime(permits[date_col], errors='coerce').astype('datetime64[ns]'),
+        'permit_bin': to_int_key(permits[bin_col]) if bin_col else pd.NA,
+        'permit_job': permits.get('job__', permits.get('job')),
+        'permit_job_type': permits.get('job_type'),
+    })
+
+    if 'bbl' in permits.columns or 'BBL' in permits.columns:
+        out['BBL'] = to_int_key(permits.get('BBL', permits.get('bbl')))
+    elif all(c in permits.columns for c in ('borough', 'block', 'lot')):
+        out['BBL'] = bbl_from_parts(permits['borough'], permits['block'], permits['lot'])
+    elif bin_bbl is not None and bin_col:
+        mapping = pd.DataFrame({
+            'permit_bin': to_int_key(bin_bbl[next(c for c in bin_bbl.columns if c.lower() == 'bin')]),
+            'BBL': to_int_key(bin_bbl[next(c for c in bin_bbl.columns if c.lower() == 'bbl')]),
+        }).dropna().drop_duplicates(subset=['permit_bin'])
+        out = out.merge(mapping, on='permit_bin', how='left')
+    else:
+        raise KeyError("Permits frame has no BBL, borough/block/lot or BIN→BBL mapping")
+
+    out = out.dropna(subset=['BBL', 'permit_date'])
+    out['BBL'] = out['BBL'].astype('int64')
+    return out
+
+
+def _as_of_match(sales: pd.DataFrame, permits: pd.DataFrame) -> pd.DataFrame:
+    """
+    For each sale, the first permit on/after SALE DATE for the same BBL.
+    """
+    left = sales.sort_values('SALE DATE', kind='stable')
+    right = permits.sort_values('permit_date', kind='stable')
+    return pd.merge_asof(
+        left, right,
+        left_on='SALE DATE', right_on='permit_date',
+        by='BBL', direction='forward', allow_exact_matches=True,
+    )
+
+
+def _finalize(features: pd.DataFrame, window_days: int, as_of) -> pd.DataFrame:
+    """
+    Drops permits that belong to a later sale and derives the flag columns.
+    """
+    belongs_to_later = features['next_sale_date'].notna() & (features['permit_date'] >= features['next_sale_date'])
+    for col in ('permit_date', 'permit_bin', 'permit_job', 'permit_job_type'):
+        features[col] = features[col].mask(belongs_to_later)
+
+    days = (features['permit_date'] - features['SALE DATE']).dt.days
+    features['days_to_permit'] = days.astype('Int32')
+    features['renovation_after_sale'] = (days <= window_days).fillna(False).astype(bool)
+
+    # Latest sale of the lot, recent, and no permit filed yet: a new owner
+    # who has not started work is the lead we want to surface.
+    as_of = pd.Timestamp(as_of) if as_of is not None else pd.Timestamp.now().normalize()
+    recent = (as_of - features['SALE DATE']).dt.days <= window_days
+    features['off_market_candidate'] = (
+        features['next_sale_date'].isna() & features['permit_date'].isna() & recent
+    ).astype(bool)
+
+    features = features.sort_values(['BBL', 'SALE DATE'], kind='stable').reset_index(drop=True)
+    return features.astype(FEATURE_DTYPES)[list(FEATURE_DTYPES)]
+
+
+def compute_renovation_features(
+    sales: pd.DataFrame,
+    permits: pd.DataFrame,
+    bin_bbl: pd.DataFrame = None,
+    window_days: int = 365,
+    as_of=None,
+) -> pd.DataFrame:
+    """
+    Builds the feature table (one row per sale) from raw sales and permits.
+
+    - days_to_permit: days from sale to the first permit after it
+    - renovation_after_sale: a permit followed within `window_days`
+    - off_market_candidate: latest sale within `window_days` of `as_of`
+      with no permit filed since
+    """
+    s = prepare_sales(sales)
+    p = prepare_permits(permits, bin_bbl=bin_bbl)
+    return _finalize(_match_sales(s, p), window_days, as_of)
+
+
+def _match_sales(s: pd.DataFrame, p: pd.DataFrame) -> pd.DataFrame:
+    """
+    Prepared sales with their next sale date and as-of matched permit.
+    """
+    s = s.sort_values(['BBL', 'SALE DATE'], kind='stable')
+    s['next_sale_date'] = s.groupby('BBL', sort=False)['SALE DATE'].shift(-1)
+    return _as_of_match(s, p)
+
+
+def lots_for_bins(features: pd.DataFrame, bins, bin_bbl: pd.DataFrame = None) -> pd.Index:
+    """
+    Lots whose features depend on the buildings `bins`: those a permit
+    on one of them is credited to now, and those the BIN→BBL mapping
+    places them on.
+    """
+    bins = pd.Index(bins).astype('int64')
+    lots = features.loc[features['permit_bin'].isin(bins), 'BBL']
+    if bin_bbl is not None:
+        mapping = pd.DataFrame({
+            'bin': to_int_key(bin_bbl[next(c for c in bin_bbl.columns if c.lower() == 'bin')]),
+            'bbl': to_int_key(bin_bbl[next(c for c in bin_bbl.columns if c.lower() == 'bbl')]),
+        }).dropna()
+        lots = pd.concat([lots, mapping.loc[mapping['bin'].isin(bins), 'bbl']])
+    return pd.Index(lots.astype('int64').unique(), name='BBL')
+
+
+def rebuild_lots(
+    features: pd.DataFrame,
+    sales: pd.DataFrame,
+    permits: pd.DataFrame,
+    bbls,
+    bin_bbl: pd.DataFrame = None,
+    window_days: int = 365,
+    as_of=None,
+) -> pd.DataFrame:
+    """
+    Recomputes the rows of the lots `bbls` from all of their sales and
+    permits, e.g. after footprint changes moved buildings (and so their
+    permits) between lots. The same as compute_renovation_features for
+    those lots; other rows keep their matches.
+    """
+    s = prepare_sales(sales)
+    p = prepare_permits(permits, bin_bbl=bin_bbl)
+    rebuilt = _match_sales(s[s['BBL'].isin(bbls)], p[p['BBL'].isin(bbls)])
+    rest = features.loc[~features['BBL'].isin(bbls)]
+    return _finalize(pd.concat([rest, rebuilt], ignore_index=True), window_days, as_of)
+
+
+def update_renovation_features(
+    features: pd.DataFrame,
+    new_permits: pd.DataFrame,
+    bin_bbl: pd.DataFrame = None,
+    window_days: int = 365,
+    as_of=None,
+) -> pd.DataFrame:
+    """
+    Applies newly arrived permits to an existing feature table.
+
+    Only sales on BBLs touched by the new permits are re-matched; for
+    those, the earlier of the stored permit and the new as-of match wins.
+    The flags of every row are derived again, since off_market_candidate
+    depends on `as_of`.
+    """
+    p = prepare_permits(new_permits, bin_bbl=bin_bbl)
+    affected = features['BBL'].isin(p['BBL'].unique())
+    if not affected.any():
+        return _finalize(features.copy(), window_days, as_of)
+
+    part = features.loc[affected, ['BBL', 'SALE DATE', 'SALE PRICE', 'NEIGHBORHOOD', 'next_sale_date']]
+    matched = _as_of_match(part, p[p['BBL'].isin(part['BBL'].unique())])
+    old = features.loc[affected].set_index(['BBL', 'SALE DATE'])
+    matched = matched.set_index(['BBL', 'SALE DATE']).reindex(old.index)
+
+    # Keep the previously matched permit when it is earlier than the new one
+    keep_old = old['permit_date'].notna() & (
+        matched['permit_date'].isna() | (old['permit_date'] <= matched['permit_date'])
+    )
+    for col in ('permit_date', 'permit_bin', 'permit_job', 'permit_job_type'):
+        matched[col] = matched[col].astype(old[col].dtype).mask(keep_old, old[col])
+
+    rest = features.loc[~affected]
+    return _finalize(pd.concat([rest, matched.reset_index()], ignore_index=True), window_days, as_of)
+
+
+def add_lot_columns(features: pd.DataFrame, lots: pd.DataFrame, columns=LOT_COLUMNS) -> pd.DataFrame:
+    """
+    `features` plus `columns` of each sale's lot, looked up by BBL in
+    `lots` (e.g. the master, one row per building: a lot's first row
+    counts). Columns `lots` does not have are left out.
+    """
+    columns = [c for c in columns if c in lots.columns]
+    keys = to_int_key(lots['BBL'])
+    table = lots.loc[keys.notna(), columns].set_axis(keys.dropna().astype('int64').to_numpy())
+    table = table[~table.index.duplicated()]
+    values = table.reindex(features['BBL'].to_numpy()).set_axis(features.index).astype('string')
+    return pd.concat([features.drop(columns=columns, errors='ignore'), values], axis=1)
+
+
+def flag_properties(properties: pd.DataFrame, features: pd.DataFrame) -> pd.DataFrame:
+    """
+    `properties` (one row per building, with a BBL column) plus the
+    PROPERTY_FLAGS of its lot's latest sale: the matched permit's date
+    and job type become issuance_date / job_type. Columns `properties`
+    already has are kept as they are; lots without a sale are not flagged.
+    """
+    latest = features.drop_duplicates(subset=['BBL'], keep='last')  # sorted by BBL, SALE DATE
+    flags = latest.set_index('BBL')[list(PROPERTY_FLAGS)].rename(columns=PROPERTY_FLAGS)
+    flags = flags.drop(columns=[c for c in flags.columns if c in properties.columns])
+
+    keys = to_int_key(properties['BBL']).fillna(-1).to_numpy(dtype=np.int64)
+    flags = flags.reindex(keys).set_axis(properties.index)
+    for col in ('renovation_after_sale', 'off_market_candidate'):
+        if col in flags.columns:
+            flags[col] = flags[col].fillna(False).astype(bool)
+    return pd.concat([properties, flags], axis=1)
@@ -0,0 +1,190 @@
+"""
+Change detection between successive snapshots of a keyed dataset
+(footprints by BIN, PLUTO by BBL).
+
+Each record is reduced to one 64-bit hash of its attributes and its
+normalized geometry (WKB). The hashes are kept in a manifest next to the
+data; comparing a fresh pull with the previous manifest yields the
+insert/update/delete key sets, so the loader and downstream stages only
+touch what changed.
+"""
+import os
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+import shapely
+
+from etl.transform.keys import to_int_key
+
+# Columns that never take part in the hash (raw geometry payloads)
+IGNORED_COLUMNS = ('the_geom',)
+
+
+def record_hashes(frame: pd.DataFrame, key: str, geometry_col: str = 'geometry') -> pd.Series:
+    """
+    One uint64 hash per key, indexed by the integer key. Attributes are
+    compared as text (so an int that comes back as a string does not count
+    as a change) and geometries as normalized WKB. Records sharing a key
+    are hashed together.
+    """
+    keys = to_int_key(frame[key])
+    skip = {key, geometry_col, *IGNORED_COLUMNS}
+    attrs = frame[sorted(c for c in frame.columns if c not in skip)].astype(str)
+    hashes = {'attrs': pd.util.hash_pandas_object(attrs, index=False).to_numpy()}
+
+    if geometry_col in frame.columns:
+        geoms = shapely.normalize(np.asarray(frame[geometry_col], dtype=object))
+        wkb = shapely.to_wkb(geoms, hex=True)
+        wkb[pd.isna(wkb)] = ''
+        hashes['geometry'] = pd.util.hash_array(wkb.astype(object))
+
+    combined = pd.util.hash_pandas_object(pd.DataFrame(hashes), index=False).to_numpy()
+    valid = keys.notna().to_numpy()
+    return _hash_by_key(keys[valid].astype('int64').to_numpy(), combined[valid], key)
+
+
+def _hash_by_key(keys: np.ndarray, hashes: np.ndarray, label: str) -> pd.Series:
+    """
+    One hash per key, sorted by key. A key shared by several records
+    (placeholder BINs) hashes all of them together, in hash order, so a
+    change to any one of them changes the key's hash.
+    """
+    order = np.lexsort((hashes, keys))
+    keys, hashes = keys[order], hashes[order]
+    starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]]) if len(keys) else np.array([], dtype=np.int64)
+    sizes = np.diff(np.r_[starts, len(keys)])
+    out = hashes[starts]
+    shared = sizes > 1
+    if shared.any():
+        print(f"⚠️ {int(shared.sum())} {label} values shared by several records; hashing each one's records together")
+        position = np.arange(len(keys)) - np.repeat(starts, sizes)
+        mixed = pd.util.hash_pandas_object(pd.DataFrame({'hash': hashes, 'position': position}), index=False)
+        out = np.where(shared, np.add.reduceat(mixed.to_numpy(), starts), out)
+    return pd.Series(out, index=pd.Index(keys[starts], name='key'), name='hash')
+
+
+@dataclass
+class SnapshotDiff:
+    inserts: pd.Index
+    updates: pd.Index
+    deletes: pd.Index
+
+    @property
+    def changed(self) -> pd.Index:
+        """Every key whose row must be rewritten or removed."""
+        return self.inserts.append(self.updates).append(self.deletes)
+
+    @property
+    def upserts(self) -> pd.Index:
+        return self.inserts.append(self.updates)
+
+    def summary(self) -> dict:
+        return {'inserts': len(self.inserts), 'updates': len(self.updates), 'deletes': len(self.deletes)}
+
+
+def diff_snapshots(new: pd.Series, old: pd.Series = None, held: pd.Index = None) -> SnapshotDiff:
+    """
+    Compares two hash manifests. Without an old manifest everything is
+    an insert. Keys in `held` (see quarantined_keys) are left out of
+    `new` by the caller and are not deletes either: their previous row
+    and hash stay until the source fixes them.
+    """
+    if old is None or old.empty:
+        return SnapshotDiff(new.index, new.index[:0], new.index[:0])
+    common = new.index.intersection(old.index)
+    differs = new.loc[common].to_numpy() != old.loc[common].to_numpy()
+    deletes = old.index.difference(new.index)
+    return SnapshotDiff(
+        inserts=new.index.difference(old.index),
+        updates=common[differs],
+        deletes=deletes.difference(held) if held is not None else deletes,
+    )
+
+
+def quarantined_keys(before: pd.DataFrame, after: pd.DataFrame, key: str) -> pd.Index:
+    """
+    Integer keys of the rows geometry QA set aside: in `before` but not
+    in `after` (QA keeps the index). `key` matches case-insensitively.
+    A building or lot quarantined for one run is held at its previous
+    snapshot instead of being deleted and re-inserted.
+    """
+    column = next(c for c in before.columns if c.lower() == key.lower())
+    dropped = before.loc[~before.index.isin(after.index), column]
+    keys = to_int_key(dropped).dropna().astype('int64').unique()
+    return pd.Index(np.sort(keys), name='key')
+
+
+def restrict_to_boroughs(manifest: pd.Series, boroughs, key_digits: int) -> pd.Series:
+    """
+    The part of a manifest inside a borough-scoped run. BINs (7 digits)
+    and BBLs (10 digits) both lead with the borough digit, so keys outside
+    the scope are not reported as deletes.
+    """
+    if manifest is None or not boroughs:
+        return manifest
+    borough = manifest.index.to_numpy() // 10 ** (key_digits - 1)
+    return manifest[np.isin(borough, list(boroughs))]
+
+
+def merge_manifest(old: pd.Series, new: pd.Series, diff: SnapshotDiff) -> pd.Series:
+    """
+    Previous manifest with this snapshot's keys replaced and deletes
+    dropped (keeps keys outside a scoped run untouched).
+    """
+    if old is None or old.empty:
+        return new
+    kept = old[~old.index.isin(new.index) & ~old.index.isin(diff.deletes)]
+    return pd.concat([kept, new]).sort_index()
+
+
+def load_manifest(path: str):
+    """
+    Hash manifest from a previous run, or None on the first run.
+    """
+    if not os.path.exists(path):
+        return None
+    table = pd.read_parquet(path)
+    return pd.Series(table['hash'].to_numpy(), index=pd.Index(table['key'].to_numpy(), name='key'), name='hash')
+
+
+def save_manifest(hashes: pd.Series, path: str):
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    hashes.rename('hash').rename_axis('key').reset_index().to_parquet(path, index=False)
+
+
+def save_changes(diff: SnapshotDiff, path: str):
+    """
+    Adds the changed keys (key, change) to the changes a downstream stage
+    has not applied yet; a key changed again keeps its latest change.
+    The consuming stage calls clear_changes() once it has applied them.
+    """
+    changes = pd.DataFrame({
+        'key': np.concatenate([diff.inserts, diff.updates, diff.deletes]).astype('int64'),
+        'change': ['insert'] * len(diff.inserts) + ['update'] * len(diff.updates) + ['delete'] * len(diff.deletes),
+    })
+    if os.path.exists(path):
+        changes = pd.concat([pd.read_parquet(path), changes], ignore_index=True)
+        changes = changes.drop_duplicates(subset=['key'], keep='last')
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    changes.to_parquet(path + '.tmp', index=False)
+    os.replace(path + '.tmp', path)
+
+
+def load_changed_keys(path: str, changes=('insert', 'update', 'delete')) -> pd.Index:
+    """
+    Keys a downstream stage must recompute, from save_changes output.
+    None when there is no change file (recompute everything).
+    """
+    if not os.path.exists(path):
+        return None
+    table = pd.read_parquet(path)
+    return pd.Index(table.loc[table['change'].isin(changes), 'key'].to_numpy(), name='key')
+
+
+def clear_changes(path: str):
+    """
+    Marks the pending changes at `path` as applied.
+    """
+    if os.path.exists(path):
+        os.remove(path)
@@ -0,0 +1,246 @@
+"""
+SQL merge engine: the master joins and aggregations run in an embedded
+DuckDB instead of pandas.
+
+Inputs are registered with DuckDB as Arrow tables (DataFrames are
+converted once, shapely geometry as WKB) or scanned straight from
+Parquet / CSV files, so nothing is re-hashed in Python. DuckDB runs
+every join, DISTINCT and window on all cores and spills to `temp_dir`
+once `memory_limit` is reached; the pandas merges hold every
+intermediate frame in memory on one core.
+
+Both functions return the same columns, row order and dtypes as their
+pandas counterparts:
+
+    merge_master_sql(base, permits, sales)      # property_data_merger
+    join_master_sql(fp, pl, permits, sales)     # build_master
+
+DuckDB is optional (`pip install duckdb`); it is imported on first use.
+"""
+import os
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+# Source row number added to every input: restores pandas' row order
+ROW = "__row"
+
+
+def connect(memory_limit=None, temp_dir=None, threads=None):
+    """
+    In-memory DuckDB connection. `memory_limit` (e.g. "4GB") caps what
+    it holds before spilling to `temp_dir`.
+    """
+    try:
+        import duckdb
+    except ImportError as e:
+        raise ImportError("The duckdb merge engine needs the duckdb package (pip install duckdb)") from e
+
+    settings = {"memory_limit": memory_limit, "temp_directory": temp_dir, "threads": threads}
+    if temp_dir:
+        os.makedirs(temp_dir, exist_ok=True)
+    return duckdb.connect(config={k: v for k, v in settings.items() if v is not None})
+
+
+def _arrow(result):
+    # to_arrow_table() replaced fetch_arrow_table() in DuckDB 1.4
+    return result.to_arrow_table() if hasattr(result, "to_arrow_table") else result.fetch_arrow_table()
+
+
+def _quote(name):
+    return '"' + str(name).replace('"', '""') + '"'
+
+
+def _geometry_columns(frame):
+    import shapely
+
+    return [c for c in frame.columns if str(frame[c].dtype) == "geometry" or (
+        frame[c].dtype == object and frame[c].map(lambda v: isinstance(v, shapely.Geometry)).any())]
+
+
+def register(con, name, source, dtypes=None):
+    """
+    Registers `source` (DataFrame, Arrow table, or .parquet / .csv path)
+    as view `name` with a ROW column. CSV files are read as all-text,
+    like pd.read_csv(dtype=str). Returns the source's column names.
+    When `dtypes` is a dict, the input dtypes are recorded in it.
+    """
+    if isinstance(source, str) and (source.endswith(".parquet") or "*" in source):
+        path = "'" + source.replace("'", "''") + "'"
+        con.execute(f"CREATE OR REPLACE VIEW {_quote(name)} AS SELECT * EXCLUDE (file_row_number), "
+                    f"file_row_number AS {ROW} FROM read_parquet({path}, file_row_number = true, "
+                    f"hive_partitioning = true)")
+        return [c for c in _arrow(con.execute(f"SELECT * FROM {_quote(name)} LIMIT 0")).column_names
+                if c != ROW]
+    if isinstance(source, str):
+        import pyarrow.csv as pv
+
+        header = pd.read_csv(source, nrows=0).columns
+        source = pv.read_csv(source, convert_options=pv.ConvertOptions(
+            column_types={c: pa.string() for c in header}, strings_can_be_null=True))
+    if isinstance(source, pd.DataFrame):
+        if dtypes is not None:
+            dtypes.update(source.dtypes.to_dict())
+        geometry = _geometry_columns(source)
+        if geometry:
+            import shapely
+
+            source = source.assign(**{c: shapely.to_wkb(np.asarray(source[c], dtype=object)) for c in geometry})
+            if dtypes is not None:
+                dtypes.update({c: "geometry" for c in geometry})
+        source = pa.Table.from_pandas(source, preserve_index=False)
+    table = source.append_column(ROW, pa.array(np.arange(source.num_rows, dtype=np.int64)))
+    con.register(name, table)
+    return list(source.column_names)
+
+
+def fetch(con, sql, dtypes=None):
+    """
+    Runs `sql` into a DataFrame, casting columns back to `dtypes`
+    ({column: dtype}, "geometry" for WKB) where DuckDB changed them and
+    the values allow it (a left join can leave NULLs in an int column,
+    which pandas turns into float as well). List columns come back as
+    Arrow lists.
+    """
+    lists = (lambda t: pd.ArrowDtype(t) if pa.types.is_list(t) or pa.types.is_large_list(t) else None)
+    frame = _arrow(con.execute(sql)).to_pandas(types_mapper=lists)
+    for col, dtype in (dtypes or {}).items():
+        if col not in frame.columns:
+            continue
+        if str(dtype) == "geometry":
+            import shapely
+
+            frame[col] = shapely.from_wkb(frame[col].to_numpy(dtype=object))
+        elif frame[col].dtype != dtype:
+            try:
+                frame[col] = frame[col].astype(dtype)
+            except (TypeError, ValueError):
+                pass
+    return frame
+
+
+def _int_key(expr):
+    # to_int_key in SQL: text, trimmed, trailing '.0' removed, else NULL
+    return f"TRY_CAST(regexp_replace(trim(CAST({expr} AS VARCHAR)), '\\.0+$', '') AS BIGINT)"
+
+
+def merge_master_sql(base, permits, sales, job_col="job__", date_col="SALE DATE", price_col="SALE PRICE",
+                     permits_as_list=False, con=None) -> pd.DataFrame:
+    """
+    merge_property_data's step 2-4 in SQL: base parcels left-joined to
+    their distinct sorted jobs per BIN (all_permits) and to the latest
+    and previous sale per BBL (the latest_sales() columns). `price_col`
+    may be None when sales carry no price.
+    """
+    con = con or connect()
+    dtypes = {}
+    base_cols = register(con, "base", base, dtypes)
+    register(con, "permits", permits)
+    register(con, "sales", sales)
+
+    jobs = "list(job ORDER BY job)" if permits_as_list else "string_agg(job, ';' ORDER BY job)"
+    price = f"TRY_CAST({_quote(price_col)} AS DOUBLE)" if price_col else "CAST(NULL AS DOUBLE)"
+    date = _quote(date_col)
+    sale_cols = [date_col] + ([price_col] if price_col else []) + ["previous_sale_date"] + (
+        ["previous_sale_price", "sale_price_delta"] if price_col else []) + ["days_since_previous_sale"]
+    sale_select = {
+        date_col: f"s.{date}",
+        price_col: "s.price",
+        "previous_sale_date": "s.previous_sale_date",
+        "previous_sale_price": "s.previous_sale_price",
+        "sale_price_delta": "s.price - s.previous_sale_price",
+        "days_since_previous_sale": f"date_diff('day', s.previous_sale_date, s.{date})",
+    }
+    # pandas' merge drops the right-hand BBL key; the base keeps its own
+    select = [f"b.{_quote(c)}" for c in base_cols] + ["p.all_permits"] + [
+        f"{sale_select[c]} AS {_quote(c)}" for c in sale_cols]
+
+    sql = f"""
+    WITH perm AS (
+        SELECT BIN, {jobs} AS all_permits
+        FROM (SELECT DISTINCT CAST(BIN AS VARCHAR) AS BIN, CAST({_quote(job_col)} AS VARCHAR) AS job
+              FROM permits WHERE BIN IS NOT NULL AND {_quote(job_col)} IS NOT NULL)
+        GROUP BY BIN
+    ),
+    typed AS (
+        SELECT {_int_key("BBL")} AS bbl, TRY_CAST({date} AS TIMESTAMP) AS sale_date, {price} AS price, {ROW}
+        FROM sales
+    ),
+    ranked AS (
+        -- Same-day sales: the later row wins, as in latest_sales()
+        SELECT *, row_number() OVER (PARTITION BY bbl ORDER BY sale_date DESC, {ROW} DESC) AS sale_rank
+        FROM typed
+        WHERE bbl IS NOT NULL AND sale_date IS NOT NULL
+    ),
+    s AS (
+        SELECT printf('%010d', bbl) AS BBL,
+               max(sale_date) FILTER (WHERE sale_rank = 1) AS {date},
+               max(price) FILTER (WHERE sale_rank = 1) AS price,
+               max(sale_date) FILTER (WHERE sale_rank = 2) AS previous_sale_date,
+               max(price) FILTER (WHERE sale_rank = 2) AS previous_sale_price
+        FROM ranked
+        WHERE sale_rank <= 2
+        GROUP BY bbl
+    )
+    SELECT {", ".join(select)}
+    FROM base b
+    LEFT JOIN perm p ON CAST(b.BIN AS VARCHAR) = p.BIN
+    LEFT JOIN s ON CAST(b.BBL AS VARCHAR) = s.BBL
+    ORDER BY b.{ROW}
+    """
+    dtypes.update({date_col: "datetime64[ns]", "previous_sale_date": "datetime64[ns]",
+                   "days_since_previous_sale": "Int32"})
+    if not permits_as_list:
+        dtypes["all_permits"] = "str"
+    if price_col:
+        dtypes.update({price_col: "float64", "previous_sale_price": "float64", "sale_price_delta": "float64"})
+    return fetch(con, sql, dtypes)
+
+
+def join_master_sql(fp, pl, permits, sales, con=None) -> pd.DataFrame:
+    """
+    build_master's joins in SQL: footprints ⋈ PLUTO (without geometry)
+    on BBL, then permits on BIN and sales on BBL, all left joins; columns
+    on both sides of the PLUTO join get pandas' _x / _y suffixes and
+    permit / sales columns already in the master are left out. Missing
+    keys match each other, as they do in pandas.
+    """
+    con = con or connect()
+    if isinstance(pl, pd.DataFrame):
+        pl = pl.drop(columns=["geometry"], errors="ignore")
+    inputs = {}
+    for name, source in (("fp", fp), ("pl", pl), ("p", permits), ("s", sales)):
+        source_dtypes = {}
+        columns = register(con, name, source, source_dtypes)
+        inputs[name] = ([c for c in columns if c != "geometry"] if name == "pl" else columns, source_dtypes)
+
+    select, dtypes = [], {}
+
+    def add(alias, column, name):
+        select.append(f"{alias}.{_quote(column)} AS {_quote(name)}")
+        dtypes[name] = inputs[alias][1].get(column)
+
+    overlap = set(inputs["fp"][0]) & set(inputs["pl"][0]) - {"BBL"}
+    for c in inputs["fp"][0]:
+        add("fp", c, f"{c}_x" if c in overlap else c)
+    for c in inputs["pl"][0]:
+        if c != "BBL":
+            add("pl", c, f"{c}_y" if c in overlap else c)
+    for alias, key, label in (("p", "BIN", "permit"), ("s", "BBL", "sales")):
+        dropped = [c for c in inputs[alias][0] if c in dtypes and c != key]
+        if dropped:
+            print(f"Dropping {len(dropped)} overlapping columns before {label} merge: {dropped}")
+        for c in inputs[alias][0]:
+            if c not in dtypes:
+                add(alias, c, c)
+
+    sql = f"""
+    SELECT {", ".join(select)}
+    FROM fp
+    LEFT JOIN pl ON fp.BBL IS NOT DISTINCT FROM pl.BBL
+    LEFT JOIN p ON fp.BIN IS NOT DISTINCT FROM p.BIN
+    LEFT JOIN s ON fp.BBL IS NOT DISTINCT FROM s.BBL
+    ORDER BY fp.{ROW}, pl.{ROW}, p.{ROW}, s.{ROW}
+    """
+    return fetch(con, sql, {c: t for c, t in dtypes.items() if t is not None})
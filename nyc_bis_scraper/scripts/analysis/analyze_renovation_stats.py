@@ -1,36 +1,221 @@
+"""
+Streaming renovation statistics.
+
+Reads only the needed columns, in chunks (CSV) or record batches
+(Parquet), so memory stays flat no matter how big the input is. Each
+partition produces a RenovationStats object with exact counts, a KLL
+sketch for days_to_permit and fixed-bin histograms; partials from
+parallel workers merge into one report.
+
+Usage:
+    python analyze_renovation_stats.py [input ...] [--workers 4]
+
+From the pipeline (main(config)) the inputs and workers come from the
+`renovation_stats` config section, not the runner's command line.
+"""
+import argparse
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
 import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
-
-# Load your full file
-df = pd.read_csv("data/processed/properties_with_renovation_flags.csv")
-
-# Ensure correct types
-df["days_to_permit"] = pd.to_numeric(df["days_to_permit"], errors="coerce")
-df["SALE DATE"] = pd.to_datetime(df["SALE DATE"], errors="coerce")
-
-# Filter for valid values
-valid = df[df["days_to_permit"].notna() & (df["days_to_permit"] >= 0)]
-
-# === Summary Stats ===
-total_sales = df["SALE DATE"].notna().sum()
-sales_with_permits = valid.shape[0]
-pct_renovated = df["renovation_after_sale"].sum() / total_sales * 100
-median_days = valid["days_to_permit"].median()
-
-print("\n🧠 Renovation Summary:")
-print(f"- Total properties sold: {total_sales}")
-print(f"- Sales that led to permits: {sales_with_permits}")
-print(f"- % Renovated within 1 year: {pct_renovated:.2f}%")
-print(f"- Median days to permit: {int(median_days)} days")
-
-# === Histogram Plot ===
-plt.figure(figsize=(10, 6))
-sns.histplot(valid["days_to_permit"], bins=50, color="#1976d2")
-plt.title("Distribution of Days Between Sale and Permit Issuance")
-plt.xlabel("Days to Permit")
-plt.ylabel("Number of Properties")
-plt.grid(True)
-plt.tight_layout()
-plt.savefig("outputs/html/days_to_permit_histogram.png")
-print("\n📊 Histogram saved to: outputs/html/days_to_permit_histogram.png")
+
+from nyc_bis_scraper.scripts.analysis.quantile_sketch import KLLSketch
+
+DEFAULT_INPUT = "data/processed/renovation_features.parquet"
+HISTOGRAM_PATH = "outputs/html/days_to_permit_histogram.png"
+# 30-day bins up to 10 years, then one overflow bin for longer gaps
+BIN_EDGES = np.append(np.arange(0, 3650 + 30, 30), np.inf)
+CHUNK_ROWS = 250_000
+GROUP_COLUMNS = {"borough": "Borough", "neighborhood": "NEIGHBORHOOD", "zoning": "ZoneDist1"}
+STAT_COLUMNS = ["days_to_permit", "SALE DATE", "renovation_after_sale", "BBL"] + list(GROUP_COLUMNS.values())
+BOROUGH_BY_DIGIT = {1: "MN", 2: "BX", 3: "BK", 4: "QN", 5: "SI"}
+
+
+class RenovationStats:
+    """
+    Mergeable summary of one slice of the renovation dataset.
+    """
+
+    def __init__(self, k=200):
+        self.k = k
+        self.total_sales = 0
+        self.sales_with_permits = 0
+        self.renovated = 0
+        self.histogram = np.zeros(len(BIN_EDGES) - 1, dtype=np.int64)
+        self.sketch = KLLSketch(k=k)
+
+    def update(self, days, sold, renovated):
+        valid = days[~np.isnan(days) & (days >= 0)]
+        self.total_sales += int(sold.sum())
+        self.sales_with_permits += len(valid)
+        self.renovated += int(renovated.sum())
+        self.histogram += np.histogram(valid, bins=BIN_EDGES)[0]
+        self.sketch.update(valid)
+
+    def merge(self, other):
+        self.total_sales += other.total_sales
+        self.sales_with_permits += other.sales_with_permits
+        self.renovated += other.renovated
+        self.histogram += other.histogram
+        self.sketch.merge(other.sketch)
+        return self
+
+    def summary(self):
+        return {
+            "total_sales": self.total_sales,
+            "sales_with_permits": self.sales_with_permits,
+            "pct_renovated": self.renovated / self.total_sales * 100 if self.total_sales else np.nan,
+            "median_days": float(self.sketch.quantile(0.5)),
+            "p90_days": float(self.sketch.quantile(0.9)),
+        }
+
+
+def _iter_chunks(path, row_groups=None):
+    """
+    Yields DataFrames holding only STAT_COLUMNS, CHUNK_ROWS at a time.
+    """
+    if path.endswith(".parquet"):
+        import pyarrow.parquet as pq
+        pf = pq.ParquetFile(path)
+        columns = [c for c in STAT_COLUMNS if c in pf.schema_arrow.names]
+        for batch in pf.iter_batches(batch_size=CHUNK_ROWS, row_groups=row_groups, columns=columns):
+            yield batch.to_pandas()
+    else:
+        yield from pd.read_csv(path, usecols=lambda c: c in STAT_COLUMNS, chunksize=CHUNK_ROWS, low_memory=False)
+
+
+def _as_bool(series):
+    if pd.api.types.is_bool_dtype(series):
+        return series.to_numpy()
+    return series.astype(str).str.lower().isin(["true", "1"]).to_numpy()
+
+
+def collect_stats(path, row_groups=None, k=200):
+    """
+    Streams one input (or a subset of a Parquet file's row groups) and
+    returns {"overall": stats, "<dimension>": {group: stats}}.
+    """
+    result = {"overall": RenovationStats(k)}
+    result.update({dim: {} for dim in GROUP_COLUMNS})
+
+    for i, chunk in enumerate(_iter_chunks(path, row_groups)):
+        if "Borough" not in chunk.columns and "BBL" in chunk.columns:
+            boro = pd.to_numeric(chunk["BBL"], errors="coerce") // 1_000_000_000
+            chunk["Borough"] = boro.map(BOROUGH_BY_DIGIT)
+        if i == 0:
+            for dim, col in GROUP_COLUMNS.items():
+                if col not in chunk.columns:
+                    print(f"⚠️ {path} has no {col} column; the {dim} breakdown will be empty")
+        days = pd.to_numeric(chunk["days_to_permit"], errors="coerce").to_numpy(dtype="float64")
+        sold = pd.to_datetime(chunk["SALE DATE"], errors="coerce").notna().to_numpy()
+        renovated = _as_bool(chunk["renovation_after_sale"])
+        result["overall"].update(days, sold, renovated)
+
+        for dim, col in GROUP_COLUMNS.items():
+            if col not in chunk.columns:
+                continue
+            keys = chunk[col].fillna("UNKNOWN").astype(str).to_numpy()
+            order = np.argsort(keys, kind="stable")
+            uniques, starts = np.unique(keys[order], return_index=True)
+            for key, rows in zip(uniques, np.split(order, starts[1:])):
+                stats = result[dim].setdefault(key, RenovationStats(k))
+                stats.update(days[rows], sold[rows], renovated[rows])
+    return result
+
+
+def merge_results(parts):
+    """
+    Merges the outputs of collect_stats from several partitions.
+    """
+    merged = parts[0]
+    for part in parts[1:]:
+        merged["overall"].merge(part["overall"])
+        for dim in GROUP_COLUMNS:
+            for key, stats in part[dim].items():
+                if key in merged[dim]:
+                    merged[dim][key].merge(stats)
+                else:
+                    merged[dim][key] = stats
+    return merged
+
+
+def _partitions(paths, workers):
+    """
+    One task per input file; a single Parquet input is split by row group.
+    """
+    if len(paths) == 1 and paths[0].endswith(".parquet") and workers > 1:
+        import pyarrow.parquet as pq
+        groups = list(range(pq.ParquetFile(paths[0]).num_row_groups))
+        return [(paths[0], list(chunk)) for chunk in np.array_split(groups, min(workers, len(groups))) if len(chunk)]
+    return [(path, None) for path in paths]
+
+
+def save_histogram(stats, output_path=HISTOGRAM_PATH):
+    import matplotlib.pyplot as plt
+
+    # The overflow bin is drawn as one more 30-day bar past the last edge
+    edges = BIN_EDGES[:-1]
+    widths = np.append(np.diff(edges), 30)
+    plt.figure(figsize=(10, 6))
+    bars = plt.bar(edges, stats.histogram, width=widths, align="edge", color="#1976d2")
+    bars[-1].set_color("#90a4ae")
+    plt.annotate(f"{edges[-1]:.0f}+", (edges[-1] + 15, stats.histogram[-1]), ha="center", va="bottom")
+    plt.title("Distribution of Days Between Sale and Permit Issuance")
+    plt.xlabel("Days to Permit")
+    plt.ylabel("Number of Properties")
+    plt.grid(True)
+    plt.tight_layout()
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    plt.savefig(output_path)
+    print(f"\n📊 Histogram saved to: {output_path}")
+
+
+def print_report(result, top_n=10):
+    overall = result["overall"].summary()
+    print("\n🧠 Renovation Summary:")
+    print(f"- Total properties sold: {overall['total_sales']}")
+    print(f"- Sales that led to permits: {overall['sales_with_permits']}")
+    print(f"- % Renovated within 1 year: {overall['pct_renovated']:.2f}%")
+    print(f"- Median days to permit (approx.): {overall['median_days']:.0f} days")
+
+    for dim, groups in result.items():
+        if dim == "overall" or not groups:
+            continue
+        print(f"\nBy {dim} (top {top_n} by sales):")
+        ranked = sorted(groups.items(), key=lambda item: item[1].total_sales, reverse=True)[:top_n]
+        for key, stats in ranked:
+            s = stats.summary()
+            print(f"  {key:<25} sales={s['total_sales']:>7}  permits={s['sales_with_permits']:>6}  "
+                  f"renovated={s['pct_renovated']:5.1f}%  median={s['median_days']:.0f}d")
+
+
+def main(config=None, argv=None):
+    parser = argparse.ArgumentParser(description="Streaming renovation statistics")
+    parser.add_argument("inputs", nargs="*", help=f"CSV or Parquet partitions (default: {DEFAULT_INPUT})")
+    parser.add_argument("--workers", type=int, default=None, help="Parallel partitions")
+    parser.add_argument("--no-plot", action="store_true", help="Skip the histogram PNG")
+    if argv is None and config is not None:
+        # Called from the pipeline: its command line is not ours
+        argv = []
+    args = parser.parse_args(argv)
+
+    settings = (config or {}).get("renovation_stats", {})
+    inputs = args.inputs or settings.get("inputs") or [DEFAULT_INPUT]
+    workers = args.workers or settings.get("workers", 1)
+
+    tasks = _partitions(inputs, workers)
+    if workers > 1 and len(tasks) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            parts = list(pool.map(collect_stats, *zip(*tasks)))
+    else:
+        parts = [collect_stats(path, groups) for path, groups in tasks]
+
+    result = merge_results(parts)
+    print_report(result)
+    if not args.no_plot:
+        save_histogram(result["overall"])
+
+
+if __name__ == "__main__":
+    main()
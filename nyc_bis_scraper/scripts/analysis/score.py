@@ -1,23 +1,228 @@
+"""
+Configurable lead scoring for GC leads.
+
+Features and weight profiles are declared under `scoring:` in
+scripts/pipeline/config.yaml. Each feature is evaluated once as a NumPy
+vector over the typed input frame; every weight profile is then a single
+matrix-vector product over those cached vectors, so several weightings
+can be compared without reloading or re-deriving anything.
+"""
+import os
+
+import numpy as np
 import pandas as pd
 
-# === Load the processed data ===
-df = pd.read_csv("data/processed/properties_with_renovation_flags.csv")
+# Columns read by the utilization feature (besides its FAR column)
+UTILIZATION_COLUMNS = ["BldgArea", "LotArea"]
+TIEBREAK_COLUMN = "SALE DATE"
+
+
+def _flag(frame, spec):
+    col = frame[spec["column"]]
+    if not pd.api.types.is_bool_dtype(col):
+        col = col.astype(str).str.lower().isin(["true", "1", "yes"])
+    return col.fillna(False).to_numpy(dtype=bool)
+
+
+def _threshold(frame, spec):
+    values = frame[spec["column"]].to_numpy(dtype="float64", na_value=np.nan)
+    hit = np.ones(len(values), dtype=bool)
+    if "min" in spec:
+        hit &= values > spec["min"]
+    if "max" in spec:
+        hit &= values <= spec["max"]
+    return hit
+
+
+def _prefix(frame, spec):
+    prefixes = spec["prefix"]
+    prefixes = tuple(prefixes) if isinstance(prefixes, list) else (prefixes,)
+    col = frame[spec["column"]].astype("string").fillna("")
+    return col.str.startswith(prefixes).to_numpy(dtype=bool)
+
+
+def _recency(frame, spec, as_of):
+    dates = frame[spec["column"]].to_numpy(dtype="datetime64[D]")
+    age = (np.datetime64(as_of, "D") - dates).astype("float64")
+    age[np.isnat(dates)] = np.nan
+    return (age >= 0) & (age <= spec["days"])
+
+
+def _utilization(frame, spec):
+    """
+    Built floor area over allowed floor area (LotArea * FAR). Lots below
+    `max` still have unused development rights.
+    """
+    bldg = frame["BldgArea"].to_numpy(dtype="float64", na_value=np.nan)
+    lot = frame["LotArea"].to_numpy(dtype="float64", na_value=np.nan)
+    far_col = spec.get("far_column", "ResidFAR")
+    if far_col in frame.columns:
+        far = frame[far_col].to_numpy(dtype="float64", na_value=np.nan)
+        far = np.where(far > 0, far, spec.get("default_far", np.nan))
+    else:
+        far = np.full(len(frame), spec.get("default_far", np.nan))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ratio = bldg / (lot * far)
+    return ratio < spec["max"]
+
+
+FEATURE_TYPES = {
+    "flag": _flag,
+    "threshold": _threshold,
+    "prefix": _prefix,
+    "recency": _recency,
+    "utilization": _utilization,
+}
+
+
+def required_columns(feature_specs):
+    """
+    Columns the given feature specs read from the input frame.
+    """
+    columns = {TIEBREAK_COLUMN}
+    for spec in feature_specs.values():
+        if spec["type"] == "utilization":
+            columns.update(UTILIZATION_COLUMNS)
+            columns.add(spec.get("far_column", "ResidFAR"))
+        else:
+            columns.add(spec["column"])
+    return columns
+
+
+def load_scoring_frame(path, feature_specs, keep_columns=()):
+    """
+    Loads only the columns needed for scoring (plus `keep_columns`)
+    with numeric and date columns already typed.
+    """
+    wanted = required_columns(feature_specs) | set(keep_columns)
+    if path.endswith(".parquet"):
+        import pyarrow.parquet as pq
+        available = set(pq.read_schema(path).names)
+        frame = pd.read_parquet(path, columns=sorted(wanted & available))
+    else:
+        frame = pd.read_csv(path, usecols=lambda c: c in wanted, low_memory=False)
+
+    for spec in feature_specs.values():
+        if spec.get("column") not in frame.columns and spec["type"] != "utilization":
+            continue
+        if spec["type"] == "threshold":
+            frame[spec["column"]] = pd.to_numeric(frame[spec["column"]], errors="coerce")
+        elif spec["type"] == "recency":
+            frame[spec["column"]] = pd.to_datetime(frame[spec["column"]], errors="coerce")
+        elif spec["type"] == "utilization":
+            for col in UTILIZATION_COLUMNS + [spec.get("far_column", "ResidFAR")]:
+                if col in frame.columns:
+                    frame[col] = pd.to_numeric(frame[col], errors="coerce")
+    if TIEBREAK_COLUMN in frame.columns:
+        frame[TIEBREAK_COLUMN] = pd.to_datetime(frame[TIEBREAK_COLUMN], errors="coerce")
+    return frame
+
+
+def build_feature_matrix(frame, feature_specs, as_of=None):
+    """
+    Evaluates every declared feature once. Returns an (n_rows, n_features)
+    float32 matrix and the feature names in column order.
+    """
+    as_of = as_of or pd.Timestamp.now().normalize()
+    names = list(feature_specs)
+    matrix = np.zeros((len(frame), len(names)), dtype=np.float32)
+    for j, name in enumerate(names):
+        spec = feature_specs[name]
+        fn = FEATURE_TYPES.get(spec["type"])
+        if fn is None:
+            raise ValueError(f"Unknown feature type '{spec['type']}' for feature '{name}'")
+        needed = UTILIZATION_COLUMNS if spec["type"] == "utilization" else [spec["column"]]
+        missing = [c for c in needed if c not in frame.columns]
+        if missing:
+            print(f"Warning: feature '{name}' scores 0, missing columns: {missing}")
+            continue
+        matrix[:, j] = fn(frame, spec, as_of) if spec["type"] == "recency" else fn(frame, spec)
+    return matrix, names
+
+
+def score(matrix, names, weights):
+    """
+    Weighted sum of feature columns. Features missing from `weights`
+    contribute nothing.
+    """
+    unknown = set(weights) - set(names)
+    if unknown:
+        raise ValueError(f"Weights reference undeclared features: {sorted(unknown)}")
+    w = np.array([weights.get(name, 0.0) for name in names], dtype=np.float32)
+    return matrix @ w
+
+
+def _tiebreak_stamps(tiebreak):
+    tb = tiebreak.astype("datetime64[ns]").astype("int64")
+    # NaT is int64 min, which would overflow when negated; rank it last
+    tb[tb == np.iinfo(np.int64).min] += 1
+    return tb
+
+
+def top_k(scores, k, min_score=None, tiebreak=None):
+    """
+    Indices of the k best scores, best first, using argpartition
+    instead of sorting every row. `tiebreak` (e.g. sale dates as
+    datetime64) orders equal scores, newest first, including which of
+    the rows tied at the k-th best score make the cut.
+    """
+    candidates = np.arange(len(scores))
+    if min_score is not None:
+        candidates = candidates[scores >= min_score]
+    if len(candidates) > k > 0:
+        values = scores[candidates]
+        kth = -np.partition(-values, k - 1)[k - 1]
+        above, tied = candidates[values > kth], candidates[values == kth]
+        need = k - len(above)
+        if tiebreak is not None and len(tied) > need:
+            tied = tied[np.argpartition(-_tiebreak_stamps(tiebreak[tied]), need - 1)[:need]]
+        candidates = np.concatenate([above, tied[:need]])
+    elif k <= 0:
+        candidates = candidates[:0]
+    if tiebreak is not None:
+        order = np.lexsort((-_tiebreak_stamps(tiebreak[candidates]), -scores[candidates]))
+    else:
+        order = np.argsort(-scores[candidates], kind="stable")
+    return candidates[order]
+
+
+def run_profiles(frame, scoring_config, as_of=None):
+    """
+    Scores `frame` under every weight profile in the config.
+    Returns {profile_name: DataFrame of top leads with a lead_score column}.
+    """
+    features = scoring_config["features"]
+    matrix, names = build_feature_matrix(frame, features, as_of=as_of)
+    tiebreak = frame[TIEBREAK_COLUMN].to_numpy() if TIEBREAK_COLUMN in frame.columns else None
+
+    results = {}
+    for profile, weights in scoring_config["profiles"].items():
+        scores = score(matrix, names, weights)
+        idx = top_k(scores, scoring_config.get("top_k", 5000),
+                    min_score=scoring_config.get("min_score"), tiebreak=tiebreak)
+        leads = frame.iloc[idx].copy()
+        leads["lead_score"] = scores[idx]
+        results[profile] = leads
+    return results
+
+
+def main(config=None):
+    if config is None:
+        from nyc_bis_scraper.scripts.pipeline.run_pipeline import load_config
+        config = load_config()
+    scoring = config["scoring"]
 
-# === Convert columns ===
-df["SALE PRICE"] = pd.to_numeric(df["SALE PRICE"], errors="coerce")
-df["ZoneDist1"] = df["ZoneDist1"].astype(str)
+    frame = load_scoring_frame(scoring["input"], scoring["features"],
+                               keep_columns=scoring.get("keep_columns", []))
+    print(f"Loaded {len(frame):,} rows with {len(frame.columns)} columns for scoring")
 
-# === Define a simple lead score ===
-df["lead_score"] = (
-    (df["off_market_candidate"] == True).astype(int) * 2 +
-    (df["SALE PRICE"] > 1_000_000).astype(int) +
-    (df["ZoneDist1"].str.startswith("R")).astype(int)
-)
+    output = scoring["output"]
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    for profile, leads in run_profiles(frame, scoring).items():
+        out_path = output if profile == "default" else output.replace(".csv", f"_{profile}.csv")
+        leads.to_csv(out_path, index=False)
+        print(f"✅ {profile}: {len(leads):,} top GC leads saved to {out_path}")
 
-# === Sort by score and recent sale date ===
-df_sorted = df.sort_values(by=["lead_score", "SALE DATE"], ascending=[False, False])
 
-# === Save top leads to CSV ===
-top_leads = df_sorted[df_sorted["lead_score"] >= 2].copy()
-top_leads.to_csv("data/processed/top_gc_leads.csv", index=False)
-print("✅ Top GC leads saved to data/processed/top_gc_leads.csv")
+if __name__ == "__main__":
+    main()
@@ -1,17 +1,20 @@
-import requests
-import pandas as pd
-import time
-from pathlib import Path
+"""
+Fetches DOB permit issuance records (construction jobs) citywide, one
+shard per borough in parallel.
+
+Each borough streams its pages into its own Parquet file under
+`shard_dir`; the shards are then combined into one dataset. All shards
+share one request budget, so the pull stays inside the API's rate limit
+while five boroughs download in about the time one used to.
+"""
+import argparse
+import dataclasses
 
 # === Setup ===
 BASE_URL = "https://data.cityofnewyork.us/resource/ipu4-2q9a.json"
 LIMIT = 50000
-OFFSET = 0
-BOROUGH = "BROOKLYN"
-OUTPUT_FILE = Path("data/raw/permits/construction_jobs_brooklyn.csv")
-
-# Create folder if needed
-OUTPUT_FILE.parent.mkdir(parents=True, exist_ok=True)
+OUTPUT_FILE = "data/raw/permits/construction_jobs.parquet"
+SHARD_DIR = "data/raw/permits/shards"
 
 # === Fields to extract ===
 FIELDS = [
@@ -26,33 +29,66 @@ FIELDS = [
     "dobrundate", "estimated_job_cost"
 ]
 
-# === Pull data in 50k batches ===
-all_records = []
-print("Starting fetch for borough: BROOKLYN")
-
-while True:
-    params = {
-        "$limit": LIMIT,
-        "$offset": OFFSET,
-        "$where": f"borough='{BOROUGH}'",
-        "$select": ",".join(FIELDS)
-    }
-    response = requests.get(BASE_URL, params=params)
-    if response.status_code != 200:
-        print(f"Failed batch at offset {OFFSET}: {response.status_code}")
-        break
-
-    batch = response.json()
-    if not batch:
-        print("No more records.")
-        break
-
-    all_records.extend(batch)
-    print(f"Fetched {len(batch)} records (offset {OFFSET})")
-    OFFSET += LIMIT
-    time.sleep(1)  # avoid rate limits
-
-# === Save to CSV ===
-df = pd.DataFrame(all_records)
-df.to_csv(OUTPUT_FILE, index=False)
-print(f"✅ Saved {len(df)} records to {OUTPUT_FILE}")
+
+def borough_shards(scope, page_size=LIMIT, budget=None):
+    """
+    One SocrataSource per borough in the run scope (all five when it
+    names none), each filtered on the server to its borough and the
+    scope's issuance_date window.
+    """
+    from etl.extract.scope import BOROUGH_NAMES
+    from etl.extract.sources import SocrataSource
+
+    shards = {}
+    for code in scope.boroughs or sorted(BOROUGH_NAMES):
+        borough_scope = dataclasses.replace(scope, boroughs=(code,), bbox=None)
+        name = BOROUGH_NAMES[code].lower().replace(" ", "_")
+        shards[name] = SocrataSource(BASE_URL, page_size=page_size, select=FIELDS, budget=budget,
+                                     where=borough_scope.socrata_where(date_field="issuance_date"))
+    return shards
+
+
+def fetch_construction_jobs(scope, output=OUTPUT_FILE, shard_dir=SHARD_DIR, page_size=LIMIT,
+                            max_in_flight=5, requests_per_second=None):
+    """
+    Pulls every borough shard concurrently and combines them into
+    `output`. Returns {borough: rows}.
+    """
+    from etl.extract.shards import fetch_shards
+    from etl.extract.sources import RequestBudget
+
+    budget = RequestBudget(max_in_flight, requests_per_second)
+    shards = borough_shards(scope, page_size, budget)
+    print(f"Starting fetch for: {', '.join(shards)}")
+    return fetch_shards(shards, shard_dir, output, FIELDS, prefix="construction_jobs_",
+                        connections=max_in_flight)
+
+
+def main(config=None):
+    from etl.extract.scope import RunScope, add_scope_arguments
+
+    if config is None:
+        from nyc_bis_scraper.scripts.pipeline.run_pipeline import load_config
+        config = load_config()
+    settings = config.get("construction_jobs", {})
+
+    parser = argparse.ArgumentParser(description="Fetch DOB construction jobs, one shard per borough")
+    parser.add_argument("--output", default=settings.get("output", OUTPUT_FILE), help="Combined Parquet file")
+    parser.add_argument("--shard-dir", default=settings.get("shard_dir", SHARD_DIR), help="Per-borough Parquet files")
+    parser.add_argument("--max-in-flight", type=int, default=settings.get("max_in_flight", 5),
+                        help="Requests open at once across all shards")
+    parser.add_argument("--requests-per-second", type=float, default=settings.get("requests_per_second"),
+                        help="Request starts per second across all shards")
+    add_scope_arguments(parser)
+    args, _ = parser.parse_known_args()
+    scope = RunScope.from_args(args, config)
+
+    counts = fetch_construction_jobs(scope, args.output, args.shard_dir, settings.get("page_size", LIMIT),
+                                     args.max_in_flight, args.requests_per_second)
+    for name, rows in counts.items():
+        print(f"  {name}: {rows} records")
+    print(f"✅ Saved {sum(counts.values())} records to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -6,40 +6,35 @@ Fetches building footprints via the NYC Building Footprints OData v4 endpoint
 and generates clean BIN→BBL mapping matching your old manual shapefile process.
 """
 import pandas as pd
-import requests
 import sys
 import os
-import geopandas as gpd
-from shapely.geometry import shape
+
+from etl.extract.sources import ODataSource
 
 # OData v4 endpoint for Building Footprints
 API_ENDPOINT = "https://data.cityofnewyork.us/api/odata/v4/5zhs-2jue"
 
 
-def fetch_from_odata(top=50000, skip=0):
+def fetch_from_odata(top=50000, skip=0, columns=None):
     """
     Fetch Building Footprints data from the OData v4 endpoint in paged chunks.
     Returns a GeoDataFrame of the combined results with geometry parsed.
+    `columns` limits the fields requested ($select); the_geom is always kept.
     """
-    chunks = []
-    while True:
-        params = {"$top": top, "$skip": skip}
-        print(f"Fetching OData records: skip={skip}, top={top}")
-        resp = requests.get(API_ENDPOINT, params=params)
-        if resp.status_code != 200:
-            print(f"Error fetching data: {resp.status_code} - {resp.text}")
-            sys.exit(1)
-        data = resp.json().get('value', [])
-        if not data:
-            break
-        df_chunk = pd.DataFrame(data)
-        chunks.append(df_chunk)
-        skip += top
-
-    if not chunks:
+    import geopandas as gpd
+    from shapely.geometry import shape
+    from etl.extract.fetch_footprints import ORDER_COLUMN
+
+    select = list(dict.fromkeys(list(columns) + ['the_geom'])) if columns else None
+    try:
+        df = ODataSource(API_ENDPOINT, page_size=top, select=select, order=ORDER_COLUMN).fetch(offset=skip)
+    except Exception as e:
+        print(f"Error fetching data: {e}")
+        sys.exit(1)
+
+    if df.empty:
         return gpd.GeoDataFrame()
 
-    df = pd.concat(chunks, ignore_index=True)
     if 'the_geom' not in df.columns:
         print("ERROR: 'the_geom' column missing from OData response.")
         sys.exit(1)
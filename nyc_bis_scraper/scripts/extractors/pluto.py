@@ -19,61 +19,32 @@ Options:
 import os
 import sys
 import argparse
-import requests
-import pandas as pd
-import geopandas as gpd
-from shapely.geometry import shape
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../..")))
 from config import db_url
+from etl.extract.sources import ArcGISSource
+
 # Base URL for MapPLUTO FeatureServer layer 0
 BASE_URL = (
     "https://services5.arcgis.com/GfwWNkhOj9bNBqoJ/arcgis/rest/services/"
     "MAPPLUTO/FeatureServer/0/query"
 )
+OUT_FIELDS = ['bbl', 'lotarea', 'zonedist1', 'zonedist2', 'zonedist3', 'zonedist4', 'landuse', 'unitsres', 'unitstotal']
 
 
-def fetch_pluto(top=2000, skip=0):
+def fetch_pluto(top=2000, skip=0, columns=None):
     """
     Fetches MapPLUTO parcels in pages via ArcGIS REST.
     Returns a GeoDataFrame of all parcels.
     """
-    chunks = []
-    params = {
-        'where': '1=1',
-        'outFields': 'bbl,lotarea,zonedist1,zonedist2,zonedist3,zonedist4,landuse,unitsres,unitstotal',
-        'f': 'json',
-        'resultRecordCount': top,
-    }
-    while True:
-        params['resultOffset'] = skip
-        print(f"Fetching parcels: skip={skip}, top={top}")
-        resp = requests.get(BASE_URL, params=params)
-        if resp.status_code != 200:
-            print(f"Error fetching data: {resp.status_code}\n{resp.text}")
-            sys.exit(1)
-        data = resp.json()
-        features = data.get('features', [])
-        if not features:
-            break
-        # Convert Esri JSON features to GeoDataFrame
-        records = []
-        for feat in features:
-            attr = feat.get('attributes', {})
-            geom = feat.get('geometry')
-            if geom:
-               geom = shape({
-    'type': 'Polygon',
-    'coordinates': geom['rings']
-})
-            else:
-                geom = None
-            records.append({**attr, 'geometry': geom})
-        gdf_chunk = gpd.GeoDataFrame(records, crs="EPSG:4326")
-        chunks.append(gdf_chunk)
-        skip += top
-    if chunks:
-        return gpd.GeoDataFrame(pd.concat(chunks, ignore_index=True), crs=chunks[0].crs)
-    return gpd.GeoDataFrame(columns=['geometry'])
+    from etl.extract.fetch_pluto import to_pluto_frame
+
+    source = ArcGISSource(BASE_URL, page_size=top, out_fields=columns or OUT_FIELDS)
+    try:
+        df = source.fetch(offset=skip)
+    except Exception as e:
+        print(f"Error fetching data: {e}")
+        sys.exit(1)
+    return to_pluto_frame(df)
 
 
 def main():
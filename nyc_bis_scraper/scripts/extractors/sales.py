@@ -1,60 +1,175 @@
 # scripts/extractors/sales.py
 
-from sodapy import Socrata
+"""
+Fetches NYC rolling property sales (DOF) for the configured run scope.
+"""
+import asyncio
+import os
 import pandas as pd
 import datetime
 from config import db_url
+from etl.extract.scope import RunScope, and_clauses
+from etl.extract.sources import SocrataSource, open_session
+from etl.transform.keys import bbl_from_parts, bbl_to_str, to_int_key
+
+SALES_URL = "https://data.cityofnewyork.us/resource/{resource_id}.json"
+SALES_STORE = "data/sales_history"
+# Fields to_sales_frame reads
+SALES_COLUMNS = ['borough', 'block', 'lot', 'sale_date', 'sale_price',
+                 'neighborhood', 'building_class_at_time_of_sale']
+
+def sales_source(last_n_days: int = 5*365,
+                 resource_id: str = "usep-8jbt",
+                 columns: list = None,
+                 scope: RunScope = None) -> SocrataSource:
+    """
+    Paged source for DOF sales in the last N days.
+    `columns` is pushed down as $select (None = every field); a RunScope's
+    date window replaces the N-day lookback and its boroughs are filtered
+    on the server.
+    """
+    if scope and (scope.start_date or scope.end_date):
+        where = scope.socrata_where(date_field="sale_date")
+    else:
+        cutoff = (datetime.datetime.now() - datetime.timedelta(days=last_n_days))\
+                 .strftime("%Y-%m-%dT00:00:00")
+        where = and_clauses(f"sale_date >= '{cutoff}'", scope.socrata_where() if scope else None)
+    return SocrataSource(SALES_URL.format(resource_id=resource_id), where=where, select=columns)
+
 def fetch_sales(last_n_days: int = 5*365,
-                resource_id: str = "usep-8jbt") -> pd.DataFrame:
+                resource_id: str = "usep-8jbt",
+                columns: list = None,
+                scope: RunScope = None) -> pd.DataFrame:
     """
     Pull DOF Residential Sales for the last N days,
     detect whether the API returns 'bbl' or rebuild from 'borough'/'block'/'lot',
     and expose manual‑friendly sales columns.
+    Pages are typed as they arrive; the raw JSON of only a few pages is
+    held at a time.
     """
-    client = Socrata("data.cityofnewyork.us", None)
-    cutoff = (datetime.datetime.now() - datetime.timedelta(days=last_n_days))\
-             .strftime("%Y-%m-%dT00:00:00")
-    where  = f"sale_date >= '{cutoff}'"
-    records = client.get(resource_id, where=where, limit=500_000)
-    df = pd.DataFrame.from_records(records)
-    print("Sales API columns:", df.columns.tolist())
+    source = sales_source(last_n_days, resource_id, columns, scope)
+    return source.fetch(on_batch=lambda records: to_sales_frame(pd.DataFrame.from_records(records)))
 
-    # 1) If there's already a 'bbl' field, use it:
-    if 'bbl' in df.columns:
-        df['BBL'] = df['bbl'].astype(str)
+def write_sales(path: str,
+                last_n_days: int = 5*365,
+                resource_id: str = "usep-8jbt",
+                columns: list = None,
+                scope: RunScope = None) -> int:
+    """
+    Streams sales to a CSV page by page until the dataset is exhausted
+    (an empty page ends it; pages the server caps below the requested
+    size are followed, see DatasetSource.batches): memory holds a few
+    pages, never the whole pull.
+    The first page fixes the CSV columns (SODA leaves out fields that are
+    empty in a record, so later pages are aligned to it).
+    Returns the number of rows written.
+    """
+    source = sales_source(last_n_days, resource_id, columns, scope)
 
-    # 2) Otherwise, rebuild from 'borough','block','lot':
-    elif all(col in df.columns for col in ('borough','block','lot')):
-        # map text borough to its digit code
-        borough_map = {
-            'MANHATTAN': '1',
-            'BRONX':     '2',
-            'BROOKLYN':  '3',
-            'QUEENS':    '4',
-            'STATEN ISLAND': '5'
-        }
-        # uppercase and map
-        df['boro_code'] = df['borough'].str.upper().map(borough_map)
-        df['block_padded'] = df['block'].astype(int).astype(str).str.zfill(5)
-        df['lot_padded']   = df['lot'].astype(int).astype(str).str.zfill(4)
-        df['BBL'] = df['boro_code'] + df['block_padded'] + df['lot_padded']
-        df.drop(columns=['boro_code','block_padded','lot_padded'], inplace=True)
+    async def run(f):
+        header, rows = None, 0
+        async with open_session() as session:
+            async for records in source.batches(session):
+                frame = to_sales_frame(pd.DataFrame.from_records(records))
+                if header is None:
+                    header = list(frame.columns)
+                    frame.to_csv(f, index=False)
+                else:
+                    frame.reindex(columns=header).to_csv(f, header=False, index=False)
+                rows += len(frame)
+                print(f"Wrote {len(frame)} sales ({rows} total)")
+        return rows
+
+    # Written under a temporary name: a failed pull keeps the previous file
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", newline="", encoding="utf-8") as f:
+        rows = asyncio.run(run(f))
+    os.replace(tmp_path, path)
+    return rows
 
+def to_sales_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Adds BBL and the manual-style sales columns to raw API records (one
+    page or a whole pull): SALE DATE as datetime, SALE PRICE as float.
+    """
+    # 1) If there's already a 'bbl' field, use it; otherwise rebuild it
+    #    from 'borough' (name or digit), 'block' and 'lot'
+    if 'bbl' in df.columns:
+        bbl = to_int_key(df['bbl'])
+    elif all(col in df.columns for col in ('borough','block','lot')):
+        bbl = bbl_from_parts(df['borough'], df['block'], df['lot'])
     else:
         raise KeyError(
             "Sales dataset missing both 'bbl' and ['borough','block','lot']; "
             f"got: {df.columns.tolist()}"
         )
+    df['BBL'] = bbl_to_str(bbl)
 
-    # 3) Expose your manual‑style sales columns:
-    df['SALE DATE']                   = df.get('sale_date')
-    df['SALE PRICE']                  = df.get('sale_price')
+    # 2) Expose your manual‑style sales columns, typed:
+    missing = pd.Series(None, index=df.index, dtype=object)
+    df['SALE DATE']                   = pd.to_datetime(df.get('sale_date', missing), errors='coerce')
+    df['SALE PRICE']                  = pd.to_numeric(df.get('sale_price', missing), errors='coerce').astype(float)
     df['NEIGHBORHOOD']                = df.get('neighborhood')
     df['BUILDING CLASS AT TIME OF SALE'] = df.get('building_class_at_time_of_sale')
 
     return df
 
+def fetch_sales_pages(start, resource_id: str = "usep-8jbt"):
+    """
+    Typed pages (to_sales_frame) of the sales dated on/after `start`,
+    one at a time: the `fetch` of SalesStore.refresh.
+    """
+    print(f"Fetching sales dated on/after {start.date()}")
+    source = sales_source(resource_id=resource_id, columns=SALES_COLUMNS,
+                          scope=RunScope.from_values(start_date=start))
+    return source.iter_batches(on_batch=lambda records: to_sales_frame(pd.DataFrame.from_records(records)))
+
+def refresh_sales_store(root: str = SALES_STORE,
+                        overlap_days: int = None,
+                        history_days: int = 5*365,
+                        resource_id: str = "usep-8jbt") -> dict:
+    """
+    Brings the month-partitioned sales history up to date, downloading
+    only the months after the last complete one (plus the overlap).
+    Pages go into their month partitions as they arrive, so memory
+    holds a few pages, never the whole pull.
+    The store is citywide: run-scope boroughs do not apply.
+    """
+    from etl.load.sales_store import OVERLAP_DAYS, SalesStore
+
+    store = SalesStore(root)
+    summary = store.refresh(lambda start: fetch_sales_pages(start, resource_id),
+                            overlap_days=OVERLAP_DAYS if overlap_days is None else overlap_days,
+                            history_days=history_days)
+    print(f"Sales store {root}: {summary}")
+    return summary
+
+def export_sales_csv(store, path: str) -> int:
+    """
+    Writes the store to one CSV, a month partition at a time.
+    Returns the number of rows written.
+    """
+    from etl.load.sales_store import STORE_COLUMNS
+
+    tmp_path = f"{path}.tmp"
+    rows = 0
+    with open(tmp_path, "w", newline="", encoding="utf-8") as f:
+        pd.DataFrame(columns=list(STORE_COLUMNS)).to_csv(f, index=False)
+        for month in store.iter_months():
+            month["BBL"] = bbl_to_str(month["BBL"])
+            month.to_csv(f, header=False, index=False)
+            rows += len(month)
+    os.replace(tmp_path, path)
+    return rows
+
 def main(config=None):
-    df = fetch_sales()
-    df.to_csv("data/sales.csv", index=False)
-    print("✅ Saved data/sales.csv")
+    if config is None:
+        from nyc_bis_scraper.scripts.pipeline.run_pipeline import load_config
+        config = load_config()
+    settings = config.get("sales_store") or {}
+    root = settings.get("path", SALES_STORE)
+    refresh_sales_store(root, settings.get("overlap_days"), settings.get("history_days", 5*365))
+
+    # Flat copy for the CSV consumers (renovation features), a month at a time
+    from etl.load.sales_store import SalesStore
+    print(f"✅ Saved {export_sales_csv(SalesStore(root), 'data/sales.csv')} sales to data/sales.csv")
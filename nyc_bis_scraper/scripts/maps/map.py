@@ -1,57 +1,70 @@
+"""
+Quick lot map for one borough from final_properties.csv (WKT geometry).
+"""
 import pandas as pd
-import folium
-from shapely import wkt
-import geopandas as gpd
-from pyproj import CRS
+
 from config import db_url
 
-# Load your cleaned CSV
-df = pd.read_csv('final_properties.csv')
 
-# Drop rows with missing geometry
-df = df.dropna(subset=['geometry'])
+def build_map(input_path='final_properties.csv', borough_code='BK', sample=15000):
+    """
+    Renders a sample of one borough's lots and saves nyc_lots_<borough>_fixed.html.
+    """
+    import folium
+    import geopandas as gpd
+    from etl.transform.crs import ensure_crs
+    from etl.transform.geometry_decode import decode_geometries
+
+    # Load your cleaned CSV
+    df = pd.read_csv(input_path)
+
+    # Drop rows with missing geometry
+    df = df.dropna(subset=['geometry'])
+
+    # Filter by Borough
+    df = df[df['Borough'] == borough_code]
+    print(f"Properties in {borough_code}: {len(df)}")
+
+    # Sample data
+    df = df.sample(n=min(sample, len(df)), random_state=42)
 
-# Parse WKT into shapely objects
-df['geometry'] = df['geometry'].apply(wkt.loads)
+    # Parse only the sampled geometries, in one vectorized call
+    geometry, failed = decode_geometries(df['geometry'])
+    df = df.assign(geometry=geometry)[~failed]
 
-# Filter by Borough
-borough_code = 'BK'
-df = df[df['Borough'] == borough_code]
-print(f"Properties in {borough_code}: {len(df)}")
+    # Convert to GeoDataFrame; the CRS is detected from the coordinates
+    # (older exports are NY State Plane, merged outputs are already WGS84)
+    gdf = ensure_crs(gpd.GeoDataFrame(df, geometry='geometry'))
 
-# Sample data
-df = df.sample(n=15000, random_state=42)
+    print("Coordinate ranges after transformation:")
+    print(f"X range: {gdf.geometry.bounds.minx.min()} to {gdf.geometry.bounds.maxx.max()}")
+    print(f"Y range: {gdf.geometry.bounds.miny.min()} to {gdf.geometry.bounds.maxy.max()}")
 
-# Convert to GeoDataFrame
-gdf = gpd.GeoDataFrame(df, geometry='geometry')
+    # Create map
+    m = folium.Map(location=[40.6782, -73.9442], zoom_start=12)
 
-# Set the correct source CRS - this appears to be NY State Plane Long Island
-# This is the critical step you're missing
-gdf.crs = CRS('EPSG:2263')  # NY State Plane Long Island (NAD83 feet)
+    # Add properties to map
+    for idx, row in gdf.iterrows():
+        folium.GeoJson(
+            row.geometry.__geo_interface__,
+            style_function=lambda x: {
+                "fillColor": "#228B22",
+                "color": "blue",
+                "weight": 1,
+                "fillOpacity": 0.5
+            },
+            tooltip=f"Address: {row.get('Address', 'N/A')}<br>Year Built: {row.get('YearBuilt', 'N/A')}"
+        ).add_to(m)
 
-# Transform to WGS84
-gdf = gdf.to_crs('EPSG:4326')
+    # Save map
+    m.save(f'nyc_lots_{borough_code.lower()}_fixed.html')
+    print("Map saved successfully!")
+    return m
 
-print("Coordinate ranges after transformation:")
-print(f"X range: {gdf.geometry.bounds.minx.min()} to {gdf.geometry.bounds.maxx.max()}")
-print(f"Y range: {gdf.geometry.bounds.miny.min()} to {gdf.geometry.bounds.maxy.max()}")
 
-# Create map
-m = folium.Map(location=[40.6782, -73.9442], zoom_start=12)
+def main(config=None):
+    build_map()
 
-# Add properties to map
-for idx, row in gdf.iterrows():
-    folium.GeoJson(
-        row.geometry.__geo_interface__,
-        style_function=lambda x: {
-            "fillColor": "#228B22",
-            "color": "blue",
-            "weight": 1,
-            "fillOpacity": 0.5
-        },
-        tooltip=f"Address: {row.get('Address', 'N/A')}<br>Year Built: {row.get('YearBuilt', 'N/A')}"
-    ).add_to(m)
 
-# Save map
-m.save(f'nyc_lots_{borough_code.lower()}_fixed.html')
-print("Map saved successfully!")
\ No newline at end of file
+if __name__ == "__main__":
+    main()
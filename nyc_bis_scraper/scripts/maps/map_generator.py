@@ -8,21 +8,12 @@ This script:
 """
 
 import os
-import sys
-from pathlib import Path
 from config import db_url
 
-from Property_map import create_property_map
+def main(config=None):
+    from nyc_bis_scraper.scripts.maps.Property_map import create_property_map
+    from nyc_bis_scraper.scripts.mergers.property_data_merger import merge_property_data
 
-# Add script directories to the path
-script_dir = Path(__file__).parent.parent
-sys.path.insert(0, str(script_dir / "mergers"))
-sys.path.insert(0, str(script_dir / "maps"))
-
-# Import the modules (update these import paths as needed)
-from property_data_merger import merge_property_data
-
-def main():
     print("=== NYC PROPERTY MAP GENERATOR ===")
     
     # Ensure output directories exist
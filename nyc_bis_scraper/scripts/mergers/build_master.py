@@ -1,3 +1,6 @@
+"""
+Builds the master property table from footprints, PLUTO, permits and sales.
+"""
 import pandas as pd
 import sys
 from pathlib import Path
@@ -8,43 +11,38 @@ from config import db_url
 project_root = str(Path(__file__).parent.parent.parent)
 sys.path.insert(0, project_root)
 
-# Import extractor functions
-from nyc_bis_scraper.scripts.extractors.footprints import fetch_footprints
-from nyc_bis_scraper.scripts.extractors.pluto import fetch_pluto
-from nyc_bis_scraper.scripts.extractors.permits import fetch_permits
-from nyc_bis_scraper.scripts.extractors.sales import fetch_sales
+# Import extractor sources (footprints/PLUTO are imported in build_master:
+# they pull in the geospatial stack)
+from etl.extract.fetch_permits import permits_source
+from etl.extract.scope import RunScope, add_scope_arguments
+from etl.extract.sources import fetch_all, union_columns
+from etl.load.master_store import write_master_store
+from etl.transform import bin_bb_mapper, clean_permits, renovation_features
+from etl.transform.keys import bbl_to_str, bin_to_str, to_int_key
+from nyc_bis_scraper.scripts.extractors.sales import SALES_COLUMNS, sales_source, to_sales_frame
 
-def build_master(
-    output_dir: str = "data/processed",
-    use_csv_backups: bool = False
-):
-    # 1️⃣ Ensure output directory exists
-    os.makedirs(output_dir, exist_ok=True)
+# Fields requested from each source: the union of what the master's
+# downstream consumers read
+FOOTPRINT_COLUMNS = bin_bb_mapper.REQUIRED_COLUMNS
+PERMIT_COLUMNS = union_columns(clean_permits.REQUIRED_COLUMNS, renovation_features.PERMIT_COLUMNS)
+SALE_COLUMNS = union_columns(SALES_COLUMNS, renovation_features.SALES_COLUMNS)
 
-    # 2️⃣ Fetch building footprints
-    print("== STEP 1: FETCHING FOOTPRINTS ==")
-    fp = fetch_footprints()
-    print(f"Fetched {len(fp)} footprints")
+def join_master(fp, pl, permits, sales, engine="pandas", duckdb_settings=None):
+    """
+    Footprints ⋈ PLUTO (without its geometry) on BBL, then permits on
+    BIN and sales on BBL, all left joins. Permit / sales columns already
+    in the master are dropped first. engine="duckdb" runs the same joins
+    in DuckDB (etl/transform/sql_merge.py) and returns the same frame;
+    `duckdb_settings` are its connect() arguments (memory_limit, temp_dir).
+    """
+    if engine == "duckdb":
+        from etl.transform.sql_merge import connect, join_master_sql
+        return join_master_sql(fp, pl, permits, sales, con=connect(**(duckdb_settings or {})))
 
-    # 3️⃣ Fetch full PLUTO attributes
-    print("\n== STEP 2: FETCHING PLUTO ATTRIBUTES ==")
-    pl = fetch_pluto()
-    print(f"Fetched {len(pl)} PLUTO records with {len(pl.columns)} columns")
-
-    # 4️⃣ Merge footprints + PLUTO on BBL
-    print("\n== STEP 3: MERGING FOOTPRINTS & PLUTO ==")
-    master = fp.merge(pl, on="BBL", how="left")
+    master = fp.merge(pl.drop(columns=["geometry"]), on="BBL", how="left")
     print(f"Master now has {len(master.columns)} columns after PLUTO merge")
 
-    # 5️⃣ Fetch permits (live or from CSV backup)
-    print("\n== STEP 4: FETCHING PERMITS ==")
-    if use_csv_backups:
-        permits = pd.read_csv(os.path.join(output_dir, "properties_with_permits.csv"), dtype={"BIN":str})
-    else:
-        permits = fetch_permits()
-    print(f"Fetched {len(permits)} permit records")
-
-    # 6️⃣ Drop overlapping columns (except BIN) and merge on BIN
+    # Drop overlapping columns (except BIN) and merge on BIN
     overlapping = [c for c in permits.columns if c in master.columns and c != "BIN"]
     if overlapping:
         print(f"Dropping {len(overlapping)} overlapping columns before permit merge: {overlapping}")
@@ -55,15 +53,7 @@ def build_master(
     )
     print(f"Master now has {len(master.columns)} columns after permits merge")
 
-    # 7️⃣ Fetch sales (live or from CSV backup)
-    print("\n== STEP 5: FETCHING SALES ==")
-    if use_csv_backups:
-        sales = pd.read_csv(os.path.join(output_dir, "properties_with_sales.csv"), dtype={"BBL":str})
-    else:
-        sales = fetch_sales()
-    print(f"Fetched {len(sales)} sales records")
-
-    # 8️⃣ Drop overlapping columns (except BBL) and merge on BBL
+    # Drop overlapping columns (except BBL) and merge on BBL
     overlapping = [c for c in sales.columns if c in master.columns and c != "BBL"]
     if overlapping:
         print(f"Dropping {len(overlapping)} overlapping columns before sales merge: {overlapping}")
@@ -74,11 +64,85 @@ def build_master(
         suffixes=("", "_sale")
     )
     print(f"Master now has {len(master.columns)} columns after sales merge")
+    return master
+
+def build_master(
+    output_dir: str = "data/processed",
+    use_csv_backups: bool = False,
+    scope: RunScope = None,
+    engine: str = "pandas",
+    duckdb_settings: dict = None
+):
+    from etl.extract.fetch_footprints import footprints_source, to_footprints_frame
+    from etl.extract.fetch_pluto import pluto_source, to_pluto_frame
+    from etl.transform.geometry_qa import geometry_qa
 
-    # 9️⃣ Write out final master CSV
+    # 1️⃣ Ensure output directory exists
+    os.makedirs(output_dir, exist_ok=True)
+
+    # 2️⃣ Stream all sources concurrently over one connection pool
+    print("== STEP 1: FETCHING FOOTPRINTS, PLUTO, PERMITS & SALES ==")
+    scope = scope or RunScope()
+    if not scope.is_citywide:
+        print(f"Run scope: {scope}")
+    sources = {
+        "footprints": footprints_source(columns=FOOTPRINT_COLUMNS, scope=scope),
+        "pluto": pluto_source(scope=scope),
+    }
+    if not use_csv_backups:
+        sources.update(
+            permits=permits_source(columns=PERMIT_COLUMNS, scope=scope),
+            sales=sales_source(columns=SALE_COLUMNS, scope=scope),
+        )
+    frames = fetch_all(sources)
+
+    fp = to_footprints_frame(frames["footprints"], scope)
+    fp["BIN"] = bin_to_str(to_int_key(fp["bin"]))
+    fp["BBL"] = bbl_to_str(to_int_key(fp["base_bbl"]))
+    print(f"Fetched {len(fp)} footprints")
+    fp, _ = geometry_qa(fp, "footprints")
+
+    # 3️⃣ PLUTO attributes
+    print("\n== STEP 2: PLUTO ATTRIBUTES ==")
+    pl = to_pluto_frame(frames["pluto"])
+    pl["BBL"] = bbl_to_str(to_int_key(pl["bbl"]))
+    print(f"Fetched {len(pl)} PLUTO records with {len(pl.columns)} columns")
+
+    # 4️⃣ Fetch permits (live or from CSV backup)
+    print("\n== STEP 3: FETCHING PERMITS ==")
+    if use_csv_backups:
+        permits = pd.read_csv(os.path.join(output_dir, "properties_with_permits.csv"), dtype={"BIN":str})
+    else:
+        permits = frames["permits"]
+        permits["BIN"] = bin_to_str(to_int_key(permits["bin__"]))
+    print(f"Fetched {len(permits)} permit records")
+
+    # 5️⃣ Fetch sales (live or from CSV backup)
+    print("\n== STEP 4: FETCHING SALES ==")
+    if use_csv_backups:
+        sales = pd.read_csv(os.path.join(output_dir, "properties_with_sales.csv"), dtype={"BBL":str})
+    else:
+        sales = to_sales_frame(frames["sales"])
+    print(f"Fetched {len(sales)} sales records")
+
+    # 6️⃣ Merge footprints + PLUTO on BBL, permits on BIN, sales on BBL
+    print(f"\n== STEP 5: MERGING FOOTPRINTS, PLUTO, PERMITS & SALES ({engine}) ==")
+    master = join_master(fp, pl, permits, sales, engine, duckdb_settings)
+
+    # 7️⃣ Write out final master CSV
     out_path = os.path.join(output_dir, "properties_master.csv")
     master.to_csv(out_path, index=False)
     print(f"✅ Saved full master to {out_path}")
+    write_master_store(master, os.path.join(output_dir, "properties_master.feather"))
+
+def main(config=None):
+    settings = (config or {}).get("master") or {}
+    build_master(
+        output_dir=(config or {}).get("paths", {}).get("processed_data", "data/processed"),
+        scope=RunScope.from_config(config),
+        engine=settings.get("engine", "pandas"),
+        duckdb_settings=settings.get("duckdb"),
+    )
 
 if __name__ == "__main__":
     import argparse
@@ -86,6 +150,8 @@ if __name__ == "__main__":
     parser.add_argument("--test", action="store_true", help="Run in test mode with limited data")
     parser.add_argument("--output-dir", default="data/processed", help="Output directory for processed data")
     parser.add_argument("--use-backups", action="store_true", help="Use CSV backups instead of live data")
+    parser.add_argument("--engine", choices=["pandas", "duckdb"], default="pandas", help="Merge engine")
+    add_scope_arguments(parser)
     args = parser.parse_args()
     
     if args.test:
@@ -146,4 +212,5 @@ if __name__ == "__main__":
         scripts.extractors.permits.fetch_permits = test_fetch_permits
         scripts.extractors.sales.fetch_sales = test_fetch_sales
     
-    build_master(output_dir=args.output_dir, use_csv_backups=args.use_backups)
+    build_master(output_dir=args.output_dir, use_csv_backups=args.use_backups,
+                 scope=RunScope.from_args(args), engine=args.engine)
@@ -1,16 +1,67 @@
+"""
+Merges base parcels with aggregated permits and sales into properties_master.csv.
+"""
 import pandas as pd
 import os
 from pathlib import Path
 from config import db_url
+from etl.load.master_store import write_master_store
+from etl.transform.keys import bbl_to_str
+from etl.transform.latest_sale import latest_sales
+from etl.transform.permit_jobs import aggregate_jobs
+
+def find_job_column(columns):
+    """
+    The permits' job number column (job__ or similar), or None.
+    """
+    job_columns = [col for col in columns if col.startswith('job') and col.endswith('_')]
+    job_column = job_columns[0] if job_columns else "job__"
+    
+    if job_column not in columns:
+        print(f"Warning: '{job_column}' column not found in permits file")
+        print(f"Available columns: {', '.join(list(columns)[:10])}...")
+        # Look for alternative permit columns we could use
+        alt_permit_cols = [col for col in columns if 'permit' in col.lower() or 'job' in col.lower()]
+        if not alt_permit_cols:
+            return None
+        job_column = alt_permit_cols[0]
+        print(f"Using alternative column for permits: '{job_column}'")
+    return job_column
+
+def find_sale_columns(columns):
+    """
+    The sales' (date, price) columns; either may be missing from `columns`.
+    """
+    date_columns = [col for col in columns if 'date' in col.lower() and 'sale' in col.lower()]
+    price_columns = [col for col in columns if 'price' in col.lower() and 'sale' in col.lower()]
+    
+    date_column = date_columns[0] if date_columns else "sale_date"
+    price_column = price_columns[0] if price_columns else "sale_price"
+    return date_column, price_column
 
 def merge_property_data(
     base_path="data/final_properties.csv",
     permits_path="data/properties_with_permits.csv",
     sales_path="data/properties_with_sales.csv",
-    output_path="data/properties_master.csv"
+    output_path="data/properties_master.csv",
+    sales_store=None,
+    permits_as_list=False,
+    engine="pandas",
+    duckdb_settings=None,
+    incremental=False
 ):
     """
-    Merge property data with improved aggregation of permits and sales
+    Merge property data with improved aggregation of permits and sales.
+    With `sales_store` (a SalesStore root holding partitions), sales are
+    read from it instead of `sales_path`: only the BBL / date / price
+    columns, and only rows for the base parcels' BBLs. `permits_as_list`
+    keeps all_permits as an Arrow list of job numbers per BIN instead of
+    a ";"-joined string. engine="duckdb" runs the aggregations and joins
+    in DuckDB (etl/transform/sql_merge.py) with the same result;
+    `duckdb_settings` are its connect() arguments (memory_limit, temp_dir).
+    With `incremental`, rows whose base row, permits and sales are
+    unchanged since the last build are taken from the stored master and
+    only the rest are merged (etl/load/master_delta.py).
     """
     print("=== MERGING PROPERTY DATA ===")
     
@@ -22,6 +73,11 @@ def merge_property_data(
     print(f"Loading base properties from {base_path}...")
     base = pd.read_csv(base_path, dtype=str, low_memory=False)
     print(f"Loaded {len(base):,} base properties")
+
+    if engine == "duckdb":
+        master = merge_with_duckdb(reproject(base), permits_path, sales_path, sales_store, permits_as_list,
+                                   duckdb_settings)
+        return None if master is None else write_master(master, output_path)
     
     # 2) Aggregate permits: list all job__ by BIN
     print(f"Loading and aggregating permits from {permits_path}...")
@@ -34,35 +90,25 @@ def merge_property_data(
         return None
     
     # Check for job___ column
-    job_columns = [col for col in perm.columns if col.startswith('job') and col.endswith('_')]
-    job_column = job_columns[0] if job_columns else "job__"
-    
-    if job_column not in perm.columns:
-        print(f"Warning: '{job_column}' column not found in permits file")
-        print(f"Available columns: {', '.join(perm.columns[:10])}...")
-        # Look for alternative permit columns we could use
-        alt_permit_cols = [col for col in perm.columns if 'permit' in col.lower() or 'job' in col.lower()]
-        if alt_permit_cols:
-            job_column = alt_permit_cols[0]
-            print(f"Using alternative column for permits: '{job_column}'")
-        else:
-            # Create empty permit aggregation if no columns found
-            perm_agg = pd.DataFrame(columns=["BIN", "all_permits"])
-            
-    if job_column in perm.columns:
-        perm_agg = (
-            perm
-                .dropna(subset=[job_column])                # only rows with a permit
-                .groupby("BIN")[job_column]
-                .agg(lambda jobs: ";".join(sorted(set(jobs))))
-                .rename("all_permits")
-                .reset_index()
-        )
+    job_column = find_job_column(perm.columns)
+    if job_column is None:
+        # Create empty permit aggregation if no columns found
+        perm_agg = pd.DataFrame(columns=["BIN", "all_permits"])
+    else:
+        # Distinct jobs per BIN, sorted, in one pass over all permits
+        perm_agg = aggregate_jobs(perm, "BIN", job_column, "all_permits", as_list=permits_as_list)
         print(f"Aggregated permits for {len(perm_agg):,} unique BINs")
     
-    # 3) Aggregate sales: take the single most recent sale per BBL
-    print(f"Loading and aggregating sales from {sales_path}...")
-    sales = pd.read_csv(sales_path, dtype=str, low_memory=False)
+    # 3) Aggregate sales: the most recent sale per BBL, plus the one before it
+    from etl.load.sales_store import SalesStore
+    if sales_store and SalesStore(sales_store).months():
+        print(f"Loading and aggregating sales from the partitioned store {sales_store}...")
+        bbls = base["BBL"].dropna().unique() if "BBL" in base.columns else None
+        sales = SalesStore(sales_store).read(columns=["BBL", "SALE DATE", "SALE PRICE"], bbls=bbls)
+        sales["BBL"] = bbl_to_str(sales["BBL"])
+    else:
+        print(f"Loading and aggregating sales from {sales_path}...")
+        sales = pd.read_csv(sales_path, dtype=str, low_memory=False)
     
     # Verify BBL column exists
     if "BBL" not in sales.columns:
@@ -71,49 +117,111 @@ def merge_property_data(
         return None
     
     # Check for sale_date and sale_price columns
-    date_columns = [col for col in sales.columns if 'date' in col.lower() and 'sale' in col.lower()]
-    price_columns = [col for col in sales.columns if 'price' in col.lower() and 'sale' in col.lower()]
-    
-    date_column = date_columns[0] if date_columns else "sale_date"
-    price_column = price_columns[0] if price_columns else "sale_price"
+    date_column, price_column = find_sale_columns(sales.columns)
     
     if date_column not in sales.columns:
         print(f"Warning: '{date_column}' column not found in sales file")
         print(f"Available columns: {', '.join(sales.columns[:10])}...")
         sales_agg = pd.DataFrame(columns=["BBL", date_column, price_column])
     else:
-        # Parse dates with error handling
-        sales[date_column] = pd.to_datetime(sales[date_column], errors="coerce")
-        
-        # Check if price column exists
-        if price_column not in sales.columns and price_columns:
-            price_column = price_columns[0]
-        
-        # Create the columns list dynamically based on what's available
-        agg_columns = ["BBL", date_column]
-        if price_column in sales.columns:
-            agg_columns.append(price_column)
-        
-        sales_agg = (
-            sales
-                .dropna(subset=[date_column])
-                .sort_values(date_column)
-                .groupby("BBL")
-                .last()[agg_columns[1:]]  # Skip the BBL column since it's the index
-                .reset_index()
-        )
-        print(f"Aggregated sales for {len(sales_agg):,} unique BBLs")
+        # Latest and previous sale per integer BBL, no sort of the sales
+        sales_agg = latest_sales(sales, "BBL", date_column, price_column)
+        if price_column not in sales.columns:
+            sales_agg = sales_agg.drop(columns=[price_column, "previous_sale_price", "sale_price_delta"])
+        sales_agg["BBL"] = bbl_to_str(sales_agg["BBL"])
+        print(f"Aggregated sales for {len(sales_agg):,} unique BBLs "
+              f"({int(sales_agg['previous_sale_date'].notna().sum()):,} with an earlier sale)")
     
     # 4) Merge back onto base parcels
-    print("Merging aggregated data with base properties...")
-    master = base.merge(perm_agg, on="BIN", how="left")
-    master = master.merge(sales_agg, on="BBL", how="left")
-    
-    # 5) Write out one row per parcel
+    def merge_rows(rows, source_crs=None):
+        master = reproject(rows, source_crs).merge(perm_agg, on="BIN", how="left")
+        return master.merge(sales_agg, on="BBL", how="left")
+
+    if not incremental:
+        print("Merging aggregated data with base properties...")
+        return write_master(merge_rows(base), output_path)
+
+    # The CRS of the parcels, not of whichever few rows changed
+    source_crs = None
+    if "geometry" in base.columns:
+        from etl.transform.crs import detect_column_crs
+        source_crs = detect_column_crs(base["geometry"])
+
+    from etl.load.master_delta import patch_master
+    store_path = os.path.splitext(output_path)[0] + ".feather"
+    print("Merging the parcels whose base row, permits or sales changed...")
+    master, state, stats = patch_master(base, perm_agg, sales_agg, store_path,
+                                        lambda rows: merge_rows(rows, source_crs))
+    print(f"Reused {stats['reused']:,} rows of the stored master, recomputed {stats['recomputed']:,}")
+    return write_master(master, output_path, state)
+
+def reproject(base, source_crs=None):
+    """
+    Parcel geometry reprojected to lon/lat once here, so map builds don't.
+    `source_crs` is detected from the geometry when not given.
+    """
+    if "geometry" in base.columns and base["geometry"].notna().any():
+        from etl.transform.crs import wkt_to_target
+        base = base.assign(geometry=wkt_to_target(base["geometry"], source=source_crs))
+    return base
+
+def merge_with_duckdb(base, permits_path, sales_path, sales_store=None, permits_as_list=False,
+                      duckdb_settings=None):
+    """
+    Steps 2-4 of merge_property_data in DuckDB: permits and sales are
+    scanned from their files (sales from the store's Parquet partitions
+    when there are any) instead of being loaded into pandas.
+    """
+    from etl.load.sales_store import PARTITION, STORE_COLUMNS, SalesStore
+    from etl.transform.sql_merge import connect, merge_master_sql
+
+    perm_columns = pd.read_csv(permits_path, nrows=0).columns
+    job_column = find_job_column(perm_columns)
+    if "BIN" not in perm_columns or job_column is None:
+        print("Warning: permits file needs a 'BIN' and a job column for the duckdb engine")
+        return None
+    if sales_store and SalesStore(sales_store).months():
+        print(f"Joining sales from the partitioned store {sales_store}...")
+        sales = os.path.join(sales_store, f"{PARTITION}=*", "part.parquet")
+        sales_columns = list(STORE_COLUMNS)
+    else:
+        sales = sales_path
+        sales_columns = pd.read_csv(sales_path, nrows=0).columns
+    date_column, price_column = find_sale_columns(sales_columns)
+    if "BBL" not in sales_columns or date_column not in sales_columns:
+        print("Warning: sales need a 'BBL' and a sale date column for the duckdb engine")
+        return None
+
+    print("Aggregating permits and sales and merging in DuckDB...")
+    return merge_master_sql(base, permits_path, sales, job_column, date_column,
+                            price_column if price_column in sales_columns else None, permits_as_list,
+                            con=connect(**(duckdb_settings or {})))
+
+def write_master(master, output_path, state=None):
+    """
+    5) Writes one row per parcel: the CSV plus its memory-mapped copy
+    and, for incremental builds, the MasterState it was built from.
+    """
     master.to_csv(output_path, index=False)
     print(f"✅ Successfully wrote {len(master):,} rows to {output_path} (one per parcel)")
+    # Memory-mapped copy for lookups by BBL without re-reading the CSV
+    store_path = os.path.splitext(output_path)[0] + ".feather"
+    order = write_master_store(master, store_path)
+    if state is not None:
+        state.save(store_path, order)
     
     return master
 
+def main(config=None):
+    if config is None:
+        from nyc_bis_scraper.scripts.pipeline.run_pipeline import load_config
+        config = load_config()
+    settings = config.get("master") or {}
+    merge_property_data(sales_store=(config.get("sales_store") or {}).get("path"),
+                        permits_as_list=settings.get("permits_as_list", False),
+                        engine=settings.get("engine", "pandas"),
+                        duckdb_settings=settings.get("duckdb"),
+                        incremental=settings.get("incremental", False))
+
 if __name__ == "__main__":
-    merge_property_data()
\ No newline at end of file
+    main()
\ No newline at end of file
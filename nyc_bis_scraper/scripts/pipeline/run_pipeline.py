@@ -5,20 +5,41 @@ Automatically discovers and runs scripts in the project
 """
 
 import argparse
+import ast
 import yaml
 import importlib.util
 import os
 import sys
 from pathlib import Path
 
+from nyc_bis_scraper.scripts.pipeline.scheduler import load_stages, run_stages
+from nyc_bis_scraper.utils.instrumentation import current_run_id, instrument, print_summary
+
 def load_config():
     """Load configuration from config.yaml"""
     config_path = Path(__file__).parent / "config.yaml"
     with open(config_path, 'r') as f:
         return yaml.safe_load(f)
 
+def read_script_metadata(script_path):
+    """
+    Description (first docstring line) and whether the script defines
+    main(), read from its source without importing or running it
+    """
+    with open(script_path, 'r', encoding='utf-8') as f:
+        tree = ast.parse(f.read(), filename=script_path)
+    paragraphs = [" ".join(p.split()) for p in (ast.get_docstring(tree) or "").split("\n\n")]
+    # Skip a leading "name.py" line some scripts carry
+    paragraphs = [p for p in paragraphs if p and not p.endswith('.py')]
+    description = paragraphs[0].split(". ")[0].rstrip(".:") if paragraphs else ""
+    has_main = any(
+        isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)) and node.name == 'main'
+        for node in tree.body
+    )
+    return {"description": description, "has_main": has_main}
+
 def find_all_scripts(base_dir):
-    """Find all Python scripts in the given directories"""
+    """Find all Python scripts in the given directories (nothing is imported)"""
     scripts = {}
     script_dirs = {
         "extractors": os.path.join(base_dir, "scripts", "extractors"),
@@ -29,13 +50,14 @@ def find_all_scripts(base_dir):
     for category, dir_path in script_dirs.items():
         scripts[category] = []
         if os.path.exists(dir_path):
-            for file in os.listdir(dir_path):
+            for file in sorted(os.listdir(dir_path)):
                 if file.endswith('.py') and not file.startswith('__'):
                     script_name = file[:-3]  # Remove .py extension
                     script_path = os.path.join(dir_path, file)
                     scripts[category].append({
                         "name": script_name,
-                        "path": script_path
+                        "path": script_path,
+                        **read_script_metadata(script_path)
                     })
     
     return scripts
@@ -50,27 +72,29 @@ def run_script(script_path, config):
     
     # Import the script as a module
     module_name = os.path.basename(script_path).replace('.py', '')
-    spec = importlib.util.spec_from_file_location(module_name, script_path)
-    module = importlib.util.module_from_spec(spec)
-    spec.loader.exec_module(module)
-    
-    # Run the script's main function if available
-    if hasattr(module, 'main'):
-        try:
-            module.main(config)
-        except TypeError:
-            # If main doesn't accept config, try without arguments
-            try:
-                module.main()
-            except TypeError:
-                print(f"Warning: Couldn't execute main() in {module_name}")
-    else:
-        # If no main function, the script was executed on import
-        pass
-    
-    # Remove script dir from path to avoid conflicts
-    if script_dir in sys.path:
-        sys.path.remove(script_dir)
+    try:
+        with instrument(f"script.{module_name}", script=script_path):
+            spec = importlib.util.spec_from_file_location(module_name, script_path)
+            module = importlib.util.module_from_spec(spec)
+            spec.loader.exec_module(module)
+            
+            # Run the script's main function if available
+            if hasattr(module, 'main'):
+                try:
+                    module.main(config)
+                except TypeError:
+                    # If main doesn't accept config, try without arguments
+                    try:
+                        module.main()
+                    except TypeError:
+                        print(f"Warning: Couldn't execute main() in {module_name}")
+            else:
+                # If no main function, the script was executed on import
+                pass
+    finally:
+        # Remove script dir from path to avoid conflicts
+        if script_dir in sys.path:
+            sys.path.remove(script_dir)
 
 def list_available_scripts(scripts):
     """Print all available scripts"""
@@ -79,7 +103,18 @@ def list_available_scripts(scripts):
         if script_list:
             print(f"\n{category.upper()}:")
             for idx, script in enumerate(script_list, 1):
-                print(f"  {idx}. {script['name']}")
+                description = f" - {script['description']}" if script.get('description') else ""
+                print(f"  {idx}. {script['name']}{description}")
+
+def list_stages(stages):
+    """Print the declared pipeline stages and what they read/write"""
+    print("\nPipeline stages:")
+    for name, stage in stages.items():
+        print(f"  - {name}: {stage['module'] or stage['script']}")
+        if stage['inputs']:
+            print(f"      inputs:  {', '.join(stage['inputs'])}")
+        if stage['outputs']:
+            print(f"      outputs: {', '.join(stage['outputs'])}")
 
 def main():
     project_root = Path(__file__).parent.parent.parent
@@ -87,14 +122,36 @@ def main():
     config = load_config()
     
     parser = argparse.ArgumentParser(description="NYC BIS Scraper Pipeline")
-    parser.add_argument('action', nargs='?', choices=['extract', 'merge', 'map', 'all', 'list'], 
+    parser.add_argument('action', nargs='?', choices=['extract', 'merge', 'map', 'all', 'list', 'report'], 
                        default='list', help='Action to perform')
     parser.add_argument('--script', help='Run a specific script by name')
     parser.add_argument('--category', help='Run all scripts in a category')
+    parser.add_argument('--stage', action='append', help='Run a pipeline stage and its dependencies (repeatable)')
+    parser.add_argument('--jobs', type=int, default=None, help='Max stages to run in parallel')
+    parser.add_argument('--force', action='store_true', help='Run stages even if their outputs are up to date')
+    parser.add_argument('--dry-run', action='store_true', help='Show which stages would run')
     args = parser.parse_args()
+    stages = load_stages(config)
     
     if args.action == 'list':
         list_available_scripts(all_scripts)
+        if stages:
+            list_stages(stages)
+        return
+
+    if args.action == 'report':
+        print_summary()
+        return
+
+    # One run id for every stage, including those in worker processes
+    current_run_id()
+
+    if args.stage or (args.action == 'all' and stages):
+        # Dependency-aware run: independent stages in parallel, fresh ones skipped
+        status = run_stages(stages, config, targets=args.stage, jobs=args.jobs,
+                            force=args.force, dry_run=args.dry_run)
+        if any(s in ('failed', 'blocked') for s in status.values()):
+            sys.exit(1)
         return
     
     if args.script:
@@ -0,0 +1,170 @@
+"""
+Dependency-aware stage scheduler for the pipeline.
+
+Stages are declared under `stages:` in config.yaml with the files they
+read (`inputs`) and write (`outputs`). A stage depends on every stage that
+produces one of its inputs (plus any listed in `after`). Independent
+stages run in parallel worker processes, and a stage is skipped when all
+of its outputs exist and are newer than all of its inputs (make-style).
+Source stages read no files, so they are only skipped while their outputs
+are younger than `max_age` hours; without one they always run.
+"""
+import importlib.util
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+
+def load_stages(config):
+    """
+    Normalizes the `stages:` section into {name: stage dict}.
+    """
+    stages = {}
+    for name, spec in (config.get("stages") or {}).items():
+        if "module" not in spec and "script" not in spec:
+            raise ValueError(f"Stage '{name}' needs a 'module' or 'script'")
+        stages[name] = {
+            "name": name,
+            "module": spec.get("module"),
+            "script": spec.get("script"),
+            "inputs": list(spec.get("inputs", [])),
+            "outputs": list(spec.get("outputs", [])),
+            "after": list(spec.get("after", [])),
+            "max_age": spec.get("max_age"),
+        }
+    return stages
+
+
+def resolve_script(stage):
+    """
+    Path of the file a stage runs (modules are located without importing).
+    """
+    if stage["script"]:
+        return stage["script"]
+    spec = importlib.util.find_spec(stage["module"])
+    if spec is None or not spec.origin:
+        raise ValueError(f"Stage '{stage['name']}': module {stage['module']} not found")
+    return spec.origin
+
+
+def build_graph(stages):
+    """
+    Returns {stage: set(upstream stages)}. Raises ValueError on unknown
+    `after` references or dependency cycles.
+    """
+    producers = {}
+    for name, stage in stages.items():
+        for path in stage["outputs"]:
+            producers[os.path.normpath(path)] = name
+
+    deps = {}
+    for name, stage in stages.items():
+        upstream = {producers[os.path.normpath(p)] for p in stage["inputs"] if os.path.normpath(p) in producers}
+        unknown = set(stage["after"]) - set(stages)
+        if unknown:
+            raise ValueError(f"Stage '{name}' runs after unknown stages: {sorted(unknown)}")
+        upstream.update(stage["after"])
+        upstream.discard(name)
+        deps[name] = upstream
+
+    # Kahn's algorithm, only to detect cycles early
+    remaining = {name: set(up) for name, up in deps.items()}
+    while remaining:
+        ready = [name for name, up in remaining.items() if not up]
+        if not ready:
+            raise ValueError(f"Dependency cycle between stages: {sorted(remaining)}")
+        for name in ready:
+            del remaining[name]
+        for up in remaining.values():
+            up.difference_update(ready)
+    return deps
+
+
+def is_up_to_date(stage):
+    """
+    True when every output exists, is at least as new as every input and,
+    when the stage has a `max_age` (hours), younger than that. A stage
+    with no outputs always runs, as does one with no inputs on disk and
+    no max_age: nothing says when its source last changed.
+    """
+    if not stage["outputs"] or not all(os.path.exists(p) for p in stage["outputs"]):
+        return False
+    oldest = min(os.path.getmtime(p) for p in stage["outputs"])
+    max_age = stage.get("max_age")
+    if max_age is not None and time.time() - oldest > max_age * 3600:
+        return False
+    inputs = [p for p in stage["inputs"] if os.path.exists(p)]
+    if not inputs:
+        return max_age is not None
+    return oldest >= max(os.path.getmtime(p) for p in inputs)
+
+
+def _run_stage(script_path, config):
+    """
+    Worker-process entry point. Scripts parse their own argv, so they get
+    a clean one instead of the runner's.
+    """
+    from nyc_bis_scraper.scripts.pipeline.run_pipeline import run_script
+
+    sys.argv = [script_path]
+    run_script(script_path, config)
+
+
+def run_stages(stages, config, targets=None, jobs=None, force=False, dry_run=False):
+    """
+    Runs `targets` (default: all stages) and everything they depend on.
+    Returns {stage: "ran" | "skipped" | "failed" | "blocked"}.
+    """
+    deps = build_graph(stages)
+
+    wanted = set(targets or stages)
+    unknown = wanted - set(stages)
+    if unknown:
+        raise ValueError(f"Unknown stages: {sorted(unknown)}")
+    frontier = list(wanted)
+    while frontier:
+        for up in deps[frontier.pop()]:
+            if up not in wanted:
+                wanted.add(up)
+                frontier.append(up)
+
+    status = {}
+    pending = {name: deps[name] & wanted for name in wanted}
+    running = {}
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        while pending or running:
+            for name in sorted(n for n, up in pending.items() if all(u in status for u in up)):
+                del pending[name]
+                stage = stages[name]
+                upstream = deps[name] & wanted
+                if any(status[u] in ("failed", "blocked") for u in upstream):
+                    status[name] = "blocked"
+                    print(f"⛔ {name}: blocked by failed upstream stage")
+                elif not force and not any(status[u] == "ran" for u in upstream) and is_up_to_date(stage):
+                    status[name] = "skipped"
+                    print(f"⏭️  {name}: up to date")
+                elif dry_run:
+                    status[name] = "ran"
+                    print(f"🔎 {name}: would run {resolve_script(stage)}")
+                else:
+                    missing = [p for p in stage["inputs"] if not os.path.exists(p)
+                               and not any(p in stages[u]["outputs"] for u in upstream)]
+                    if missing:
+                        print(f"Warning: {name} inputs not found: {missing}")
+                    print(f"▶️  {name}: starting")
+                    running[pool.submit(_run_stage, resolve_script(stage), config)] = name
+
+            if not running:
+                continue
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = running.pop(future)
+                try:
+                    future.result()
+                    status[name] = "ran"
+                    print(f"✅ {name}: finished")
+                except BaseException as e:
+                    status[name] = "failed"
+                    print(f"❌ {name}: {type(e).__name__}: {e}")
+    return status
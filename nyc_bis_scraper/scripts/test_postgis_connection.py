@@ -1,10 +1,20 @@
 # scripts/test_postgis_connection.py
-from sqlalchemy import create_engine, text
+"""
+Checks the PostGIS connection and prints the server versions.
+"""
 from config import db_url
 
-engine = create_engine(db_url())
 
-with engine.connect() as conn:
-    result = conn.execute(text("SELECT version(), PostGIS_Full_Version();"))
-    for row in result:
-        print(row)
+def main(config=None):
+    from sqlalchemy import create_engine, text
+
+    engine = create_engine(db_url())
+
+    with engine.connect() as conn:
+        result = conn.execute(text("SELECT version(), PostGIS_Full_Version();"))
+        for row in result:
+            print(row)
+
+
+if __name__ == "__main__":
+    main()
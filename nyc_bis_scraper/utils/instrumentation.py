@@ -0,0 +1,232 @@
+"""
+Per-stage instrumentation for pipeline runs.
+
+Wrap a stage in `instrument()` to record wall time, CPU time, the
+stage's peak RSS (sampled while it runs), rows in/out, HTTP request count and bytes downloaded. Each stage appends
+one JSON line to the run log; `python -m nyc_bis_scraper.utils.instrumentation`
+summarizes the latest run against earlier ones.
+
+    with instrument("permits.extract") as m:
+        raw = fetch_permits()
+        m["rows_out"] = len(raw)
+"""
+import argparse
+import json
+import os
+import resource
+import sys
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+
+RUN_LOG = Path("outputs/logs/pipeline_runs.jsonl")
+RUN_ID_ENV = "NYC_BIS_RUN_ID"
+
+# Metrics dicts of the stages currently running in this process (nested
+# stages each see the HTTP traffic made inside them)
+_active = []
+_http_hooked = False
+
+
+def current_run_id():
+    """
+    Run id shared by every stage of one pipeline invocation, including
+    stages in worker processes (inherited through the environment).
+    """
+    if RUN_ID_ENV not in os.environ:
+        os.environ[RUN_ID_ENV] = datetime.now().strftime("%Y%m%dT%H%M%S") + "-" + uuid.uuid4().hex[:6]
+    return os.environ[RUN_ID_ENV]
+
+
+def record_http(nbytes=0, requests=1):
+    """
+    Counts HTTP traffic against every active stage. Clients other than
+    `requests` (which is hooked automatically) call this directly.
+    """
+    for metrics in _active:
+        metrics["http_requests"] += requests
+        metrics["bytes_downloaded"] += nbytes
+
+
+def _hook_requests():
+    """
+    Patches requests.Session.send once so every call made through
+    `requests` is counted.
+    """
+    global _http_hooked
+    if _http_hooked:
+        return
+    try:
+        import requests
+    except ImportError:
+        return
+    original_send = requests.Session.send
+
+    def send(self, request, **kwargs):
+        response = original_send(self, request, **kwargs)
+        if _active:
+            if kwargs.get("stream"):
+                nbytes = int(response.headers.get("Content-Length", 0) or 0)
+            else:
+                nbytes = len(response.content)
+            record_http(nbytes)
+        return response
+
+    requests.Session.send = send
+    _http_hooked = True
+
+
+def _rss_mb():
+    """
+    Current resident set size. Without /proc (macOS) this is the process
+    high-water mark, the best available there.
+    """
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except OSError:
+        usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss is KiB on Linux and bytes on macOS
+        return usage / (1024 * 1024) if sys.platform == "darwin" else usage / 1024
+
+
+class _PeakRss(threading.Thread):
+    """
+    Samples RSS every `interval` seconds until stop(), so a stage reports
+    its own peak rather than the largest one run before it.
+    """
+
+    def __init__(self, interval=0.05):
+        super().__init__(daemon=True)
+        self.interval = interval
+        self.peak = _rss_mb()
+        self._done = threading.Event()
+
+    def run(self):
+        while not self._done.wait(self.interval):
+            self.peak = max(self.peak, _rss_mb())
+
+    def stop(self):
+        self._done.set()
+        self.join()
+        self.peak = max(self.peak, _rss_mb())
+        return self.peak
+
+
+@contextmanager
+def instrument(stage, log_path=None, **extra):
+    """
+    Measures the wrapped block and appends a record to the run log.
+    The yielded dict accepts `rows_in`, `rows_out` and any extra fields.
+    """
+    _hook_requests()
+    metrics = {
+        "run_id": current_run_id(),
+        "stage": stage,
+        "started_at": datetime.now().isoformat(timespec="seconds"),
+        "rows_in": None,
+        "rows_out": None,
+        "http_requests": 0,
+        "bytes_downloaded": 0,
+        **extra,
+    }
+    _active.append(metrics)
+    rss = _PeakRss()
+    rss.start()
+    wall, cpu = time.perf_counter(), time.process_time()
+    status = "ok"
+    try:
+        yield metrics
+    except BaseException:
+        status = "failed"
+        raise
+    finally:
+        _active.remove(metrics)
+        metrics.update({
+            "status": status,
+            "wall_s": round(time.perf_counter() - wall, 3),
+            "cpu_s": round(time.process_time() - cpu, 3),
+            "peak_rss_mb": round(rss.stop(), 1),
+        })
+        log_path = Path(log_path or RUN_LOG)
+        log_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(log_path, "a") as f:
+            f.write(json.dumps(metrics, default=str) + "\n")
+
+
+def load_runs(log_path=None):
+    """
+    Reads the run log into {run_id: [stage records]} in file order.
+    """
+    runs = {}
+    log_path = Path(log_path or RUN_LOG)
+    if not log_path.exists():
+        return runs
+    with open(log_path) as f:
+        for line in f:
+            if line.strip():
+                record = json.loads(line)
+                runs.setdefault(record["run_id"], []).append(record)
+    return runs
+
+
+def compare_runs(runs, baseline_runs=5, threshold=1.5):
+    """
+    Compares the latest run's stages with the median of up to
+    `baseline_runs` earlier runs. Returns one row per stage with
+    `regressions` listing metrics that grew by more than `threshold`x.
+    """
+    run_ids = list(runs)
+    if not run_ids:
+        return []
+    latest, previous = runs[run_ids[-1]], run_ids[-1 - baseline_runs:-1]
+
+    rows = []
+    for record in latest:
+        history = [r for rid in previous for r in runs[rid] if r["stage"] == record["stage"] and r["status"] == "ok"]
+        row = {"stage": record["stage"], "status": record["status"], "regressions": []}
+        for metric in ("wall_s", "cpu_s", "peak_rss_mb", "rows_out", "http_requests", "bytes_downloaded"):
+            values = sorted(r[metric] for r in history if r.get(metric) is not None)
+            current = record.get(metric)
+            baseline = values[len(values) // 2] if values else None
+            row[metric] = (current, baseline)
+            if current is not None and baseline and current > baseline * threshold:
+                row["regressions"].append(metric)
+        rows.append(row)
+    return rows
+
+
+def print_summary(log_path=None, baseline_runs=5, threshold=1.5):
+    runs = load_runs(log_path)
+    if not runs:
+        print(f"No runs logged in {log_path or RUN_LOG}")
+        return
+    print(f"Run {list(runs)[-1]} vs median of up to {baseline_runs} previous runs:\n")
+    print(f"{'stage':<32}{'wall s':>16}{'cpu s':>16}{'rss MB':>16}{'rows out':>20}{'requests':>16}")
+    for row in compare_runs(runs, baseline_runs, threshold):
+        cells = []
+        for metric, width in (("wall_s", 16), ("cpu_s", 16), ("peak_rss_mb", 16), ("rows_out", 20), ("http_requests", 16)):
+            current, baseline = row[metric]
+            text = "-" if current is None else f"{current:g}"
+            if baseline is not None:
+                text += f" ({baseline:g})"
+            cells.append(text.rjust(width))
+        flag = f"  ⚠️  {', '.join(row['regressions'])}" if row["regressions"] else ""
+        status = "" if row["status"] == "ok" else f"  [{row['status']}]"
+        print(f"{row['stage']:<32}{''.join(cells)}{status}{flag}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Summarize pipeline run metrics")
+    parser.add_argument("--log", default=str(RUN_LOG), help="Run log (JSON lines)")
+    parser.add_argument("--baseline-runs", type=int, default=5, help="Earlier runs to compare against")
+    parser.add_argument("--threshold", type=float, default=1.5, help="Growth factor flagged as a regression")
+    args = parser.parse_args()
+    print_summary(args.log, args.baseline_runs, args.threshold)
+
+
+if __name__ == "__main__":
+    main()
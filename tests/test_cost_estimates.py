@@ -0,0 +1,92 @@
+"""
+Tests for permit $/sq ft estimation against reference cost bands.
+"""
+import numpy as np
+import pandas as pd
+
+from etl.transform.cost_estimates import estimate_permit_costs, reference_bands, summarize_flags
+
+BANDS_CONFIG = {
+    "NB": {"match": "new home", "low": 150, "high": 400},
+    "A2": {"low": 20, "high": 100},
+}
+
+PERMITS = pd.DataFrame({
+    "job__": ["1", "1", "2", "3", "4", "5", "6"],
+    "bin__": ["3000001", "3000001", "3000002", "3000003", "3000004", "9999999", "3000001"],
+    "borough": ["BROOKLYN"] * 7,
+    "job_type": ["A2", "A2", "A2", "NB", "A2", "A2", "SG"],
+    "estimated_job_cost": ["$10,000", "$10,000", "500", "$1,000,000", "$900,000", "$5,000", "$1,000"],
+})
+BIN_BBL = pd.DataFrame({"bin": ["3000001", "3000002", "3000003", "3000004"],
+                        "bbl": ["3000010001", "3000010002", "3000010003", "3000010004"]})
+AREAS = pd.DataFrame({"BBL": ["3000010001", "3000010002", "3000010003", "3000010004"],
+                      "BldgArea": ["200", "100", "0", "1000"], "LotArea": ["2000", "2000", "2500", "2000"]})
+
+
+def test_jobs_are_flagged_against_their_band():
+    bands = reference_bands(None, BANDS_CONFIG)
+    estimates = estimate_permit_costs(PERMITS, BIN_BBL, AREAS, bands).set_index("job__")
+
+    assert len(estimates) == 6  # duplicate filing of job 1 dropped
+    assert estimates["cost_flag"].to_dict() == {
+        "1": "within",   # 10,000 / 200 = 50
+        "2": "under",    # 500 / 100 = 5
+        "3": "within",   # no building yet: 1,000,000 / 2,500 sq ft lot = 400
+        "4": "over",     # 900
+        "5": "unknown",  # BIN not in the mapping
+        "6": "unknown",  # no band for SG
+    }
+    assert estimates.loc["3", "area_basis"] == "LotArea"
+    assert estimates.loc["3", "cost_per_sqft"] == 400
+    assert estimates.loc["1", "BBL"] == 3000010001
+    assert pd.isna(estimates.loc["5", "BBL"]) and np.isnan(estimates.loc["5", "area_sqft"])
+
+
+def test_tolerance_widens_the_band():
+    bands = reference_bands(None, BANDS_CONFIG)
+    estimates = estimate_permit_costs(PERMITS, BIN_BBL, AREAS, bands, tolerance=0.5).set_index("job__")
+    assert estimates.loc["2", "cost_flag"] == "under"  # 5 < 10
+    assert estimates.loc["4", "cost_flag"] == "over"   # 900 > 150
+
+
+def test_reference_costs_per_sqft_override_config_bands():
+    reference = pd.DataFrame({
+        "job_type": ["New home, per sq ft", "New home (luxury)", "Permit fees"],
+        "cost_low": [100, 300, 50], "cost_high": [300, 700, 500],
+        "cost_unit": ["sqft", "sqft", "project"],
+    })
+    bands = reference_bands(reference, BANDS_CONFIG)
+    assert bands.loc["NB"].tolist() == [200.0, 500.0, "reference"]
+    assert bands.loc["A2"].tolist() == [20.0, 100.0, "config"]
+
+
+def test_ratio_to_median_and_flag_summary():
+    bands = reference_bands(None, BANDS_CONFIG)
+    estimates = estimate_permit_costs(PERMITS, BIN_BBL, AREAS, bands).set_index("job__")
+    # A2 in Brooklyn: 50, 5, 900 → median 50
+    assert estimates.loc[["1", "2", "4"], "ratio_to_median"].tolist() == [1.0, 0.1, 18.0]
+
+    summary = summarize_flags(estimates)
+    assert summary.loc["A2"].tolist() == [1, 1, 1, 1]
+    assert summary.loc["NB", "within"] == 1 and summary.loc["SG", "unknown"] == 1
+    assert summary.to_numpy().sum() == len(estimates)
+
+
+def test_areas_file_without_area_columns_falls_back_to_pluto(tmp_path, monkeypatch):
+    from etl.extract import fetch_pluto
+    from etl.pipeline.update_cost_estimates_pipeline import load_areas
+
+    pulls = []
+    pluto = AREAS.rename(columns=str.lower)
+    monkeypatch.setattr(fetch_pluto, "fetch_pluto", lambda **kwargs: pulls.append(kwargs) or pluto)
+
+    full, bbl_only = tmp_path / "full.csv", tmp_path / "bbl_only.csv"
+    AREAS.assign(Address="1 A ST").to_csv(full, index=False)
+    AREAS[["BBL"]].to_csv(bbl_only, index=False)
+    assert list(load_areas(str(full), None).columns) == ["BBL", "BldgArea", "LotArea"] and not pulls
+
+    areas = load_areas(str(bbl_only), None)
+    assert len(pulls) == 1
+    out = estimate_permit_costs(PERMITS, BIN_BBL, areas, reference_bands(None, BANDS_CONFIG))
+    assert out["cost_per_sqft"].notna().any()
@@ -0,0 +1,36 @@
+"""
+Tests for vectorized cost-text parsing.
+"""
+import numpy as np
+import pandas as pd
+
+from etl.transform.cost_text import extract_costs, parse_amount, parse_cost_text
+
+
+def test_ranges_suffixes_and_units_become_numeric_columns():
+    text = pd.Series([
+        "$150–$400 per sq ft",
+        "Usually $1,500 to $5,000.",
+        "$1.2M - $2 million per project",
+        "$150-400k",
+        "Call for a quote",
+        None,
+        "$12 per square foot, or about $30,000 per project",
+        "$85/hr",
+        "$20 a linear foot",
+    ], index=list("abcdefghi"))
+
+    parsed = parse_cost_text(text)
+    assert parsed.index.tolist() == list("abcdefghi")
+    assert parsed["cost_low"].tolist()[:4] == [150, 1500, 1_200_000, 150_000]
+    assert parsed["cost_high"].tolist()[:4] == [400, 5000, 2_000_000, 400_000]
+    assert parsed["cost_unit"].fillna("-").tolist() == ["sqft", "-", "project", "-", "-", "-", "sqft", "hour", "linear_ft"]
+    assert parsed.loc[["e", "f"], "cost_low"].isna().all()
+    # Mixed units: the summary keeps the first unit, extract_costs keeps both
+    assert parsed.loc["g", ["cost_low", "cost_high", "n_amounts"]].tolist() == [12, 12, 2]
+    assert extract_costs(text).loc["g", "unit"].tolist() == ["sqft", "project"]
+
+
+def test_parse_amount_handles_permit_cost_formats():
+    values = pd.Series(["$45,000.00", "45000", None, 3.5, "n/a"])
+    assert np.allclose(parse_amount(values).to_numpy(), [45000, 45000, np.nan, 3.5, np.nan], equal_nan=True)
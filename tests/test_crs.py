@@ -0,0 +1,60 @@
+"""
+Tests for CRS detection and cached reprojection.
+"""
+import geopandas as gpd
+import numpy as np
+import pandas as pd
+import pytest
+import shapely
+from shapely.geometry import Point, box
+
+from etl.transform.crs import detect_crs, ensure_crs, get_transformer, transform_geometries, wkt_to_target
+
+# Brooklyn Borough Hall in NY State Plane (ft) and lon/lat
+STATE_PLANE = (987_000.0, 191_500.0)
+LON_LAT = (-73.9900, 40.6925)
+
+
+def test_transform_matches_to_crs_and_reuses_transformer():
+    geoms = np.array([box(987_000, 191_500, 987_100, 191_600), Point(*STATE_PLANE)], dtype=object)
+    ours = transform_geometries(geoms, "EPSG:2263")
+    reference = gpd.GeoSeries(geoms, crs="EPSG:2263").to_crs("EPSG:4326")
+    assert shapely.equals_exact(ours, reference.to_numpy(), tolerance=1e-9).all()
+    assert np.allclose(shapely.get_coordinates(ours[1])[0], LON_LAT, atol=2e-3)
+
+    hits = get_transformer.cache_info().hits
+    transform_geometries(geoms, "epsg:2263")
+    assert get_transformer.cache_info().hits == hits + 1
+
+
+def test_crs_is_detected_and_mismatches_raise():
+    plane = gpd.GeoDataFrame(geometry=[Point(*STATE_PLANE)])
+    assert detect_crs(plane.geometry.to_numpy()) == "EPSG:2263"
+
+    projected = ensure_crs(plane)
+    assert projected.crs == "EPSG:4326"
+    assert np.allclose(shapely.get_coordinates(projected.geometry.to_numpy())[0], LON_LAT, atol=2e-3)
+    # Already in the target CRS: returned as is, no copy
+    assert ensure_crs(projected) is projected
+
+    with pytest.raises(ValueError, match="CRS mismatch"):
+        ensure_crs(plane.set_crs("EPSG:4326"))
+    with pytest.raises(ValueError, match="Cannot determine"):
+        ensure_crs(gpd.GeoDataFrame(geometry=[Point(0, 0)]))
+
+
+def test_wkt_column_is_reprojected_once():
+    wkt = pd.Series([Point(*STATE_PLANE).wkt, None, "not wkt"])
+    out = wkt_to_target(wkt)
+    assert out.iloc[0].startswith("POINT (-73.99")
+    assert out.iloc[1:].isna().all()
+
+
+def test_wkt_column_already_in_target_is_not_decoded(monkeypatch):
+    from etl.transform import crs
+
+    wkt = pd.Series([Point(*LON_LAT).wkt, None, Point(-73.95, 40.70).wkt])
+    monkeypatch.setattr(crs, "decode_geometries", lambda *a: pytest.fail("decoded a lon/lat WKT column"))
+    monkeypatch.setattr(crs, "detect_column_crs", lambda series: "EPSG:4326")
+    assert wkt_to_target(wkt) is wkt
+    assert wkt_to_target(wkt, source="EPSG:4326") is wkt
@@ -0,0 +1,55 @@
+"""
+Tests for encoding detection and vectorized geometry decoding.
+"""
+import numpy as np
+import pandas as pd
+import shapely
+from shapely.geometry import MultiPolygon, Polygon, box, mapping
+
+from etl.transform import geometry_decode
+from etl.transform.geometry_decode import decode_geometries, detect_encodings
+
+LOT = Polygon([(-73.99, 40.69), (-73.98, 40.69), (-73.98, 40.70), (-73.99, 40.69)])
+HOLED = Polygon(box(0, 0, 10, 10).exterior.coords, [box(2, 2, 4, 4).exterior.coords])
+MULTI = MultiPolygon([box(0, 0, 1, 1), box(2, 2, 3, 3)])
+
+
+def test_every_encoding_round_trips_and_failures_are_masked():
+    values = pd.Series([
+        LOT.wkt,
+        shapely.to_wkb(HOLED, hex=True),
+        shapely.to_geojson(MULTI),
+        str(mapping(HOLED)),
+        mapping(LOT),
+        shapely.to_wkb(MULTI),
+        LOT,
+        None,
+        "POLYGON ((0 0, 1",
+        "{'type': 'Polygon', 'coordinates': oops}",
+    ], index=range(100, 110))
+    kinds = detect_encodings(values)
+    assert kinds.fillna('missing').tolist() == [
+        'wkt', 'wkb_hex', 'geojson', 'repr', 'mapping', 'wkb', 'geometry', 'missing', 'wkt', 'repr',
+    ]
+
+    geoms, failed = decode_geometries(values, crs="EPSG:4326")
+    assert geoms.crs == "EPSG:4326"
+    expected = [LOT, HOLED, MULTI, HOLED, LOT, MULTI, LOT]
+    assert all(shapely.equals(g, e) for g, e in zip(geoms[:7], expected))
+    assert geoms[7] is None
+    assert failed.tolist() == [False] * 8 + [True, True]
+
+
+def test_repr_fallback_and_process_pool_agree(monkeypatch):
+    polygons = [box(i, i, i + 1, i + 1) for i in range(60)]
+    texts = [str(mapping(p)) for p in polygons]
+    # Quotes inside a string value defeat the JSON rewrite → literal_eval path
+    texts[5] = str({**mapping(polygons[5]), 'name': "O'Brien"})
+
+    serial, failed = decode_geometries(texts, workers=1)
+    assert not failed.any()
+    assert shapely.equals(np.asarray(serial), np.asarray(polygons, dtype=object)).all()
+
+    monkeypatch.setattr(geometry_decode, "POOL_THRESHOLD", 10)
+    pooled = geometry_decode._literal_eval_repr(texts, workers=2, chunk_size=16)
+    assert shapely.equals(pooled, np.asarray(polygons, dtype=object)).all()
@@ -0,0 +1,66 @@
+"""
+Tests for Esri ring assembly and the geometry repair/quarantine pass.
+"""
+import geopandas as gpd
+import numpy as np
+import pandas as pd
+import shapely
+from shapely.geometry import MultiPolygon, box
+
+from etl.extract.fetch_pluto import to_pluto_frame
+from etl.transform.geometry_qa import esri_rings_to_geometries, geometry_qa, repair_geometries
+
+
+def _esri(geom):
+    """Esri JSON rings: outer rings clockwise, holes counter-clockwise."""
+    rings = []
+    for part in shapely.get_parts(shapely.orient_polygons(geom, exterior_cw=True)):
+        rings.append(shapely.get_coordinates(part.exterior).tolist())
+        rings.extend(shapely.get_coordinates(r).tolist() for r in part.interiors)
+    return {"rings": rings}
+
+
+def test_rings_assemble_by_orientation():
+    holed = box(0, 0, 10, 10).difference(box(2, 2, 4, 4))
+    multi = MultiPolygon([box(0, 0, 1, 1), box(5, 5, 6, 6).difference(box(5.2, 5.2, 5.4, 5.4))])
+    # The hole is listed right after the wrong outer ring
+    shuffled = _esri(multi)
+    shuffled["rings"] = shuffled["rings"][:1] + shuffled["rings"][1:][::-1]
+
+    geoms, stats = esri_rings_to_geometries([_esri(holed), _esri(multi), None, shuffled, {"rings": [[[0, 0], [1, 1]]]}])
+    assert shapely.equals(geoms[0], holed)
+    assert geoms[1].geom_type == "MultiPolygon" and shapely.equals(geoms[1], multi)
+    assert geoms[2] is None and geoms[4] is None
+    assert shapely.equals(geoms[3], multi)
+    assert stats["reassigned_holes"] == 1 and stats["dropped_rings"] == 1 and stats["multipart"] == 2
+
+
+def test_pluto_frame_keeps_multi_ring_lots():
+    lots = [box(0, 0, 1, 1), MultiPolygon([box(2, 2, 3, 3), box(4, 4, 5, 5)])]
+    df = pd.DataFrame({"bbl": ["3000010001", "3000010002"], "geometry": [_esri(g) for g in lots]})
+    gdf = to_pluto_frame(df)
+    assert list(gdf.geom_type) == ["Polygon", "MultiPolygon"]
+    assert gdf.geometry.is_valid.all()
+    assert gdf.attrs["geometry_assembly"]["multipart"] == 1
+
+
+def test_invalid_shapes_are_repaired_or_quarantined(tmp_path):
+    bowtie = shapely.Polygon([(0, 0), (0, 1), (1, 0), (1, 1), (0, 0)])
+    spike = shapely.Polygon([(0, 0), (1, 0), (2, 0), (0, 0)])  # zero-area ring
+    gdf = gpd.GeoDataFrame(
+        {"bbl": ["1", "2", "3", "4"], "geometry": [box(0, 0, 1, 1), bowtie, spike, None]},
+        geometry="geometry",
+    )
+
+    _, status, _ = repair_geometries(gdf.geometry.to_numpy())
+    assert list(status) == ["valid", "repaired", "quarantined", "quarantined"]
+
+    clean, stats = geometry_qa(gdf, "parcels", quarantine_dir=str(tmp_path))
+    assert list(clean["bbl"]) == ["1", "2"]
+    assert clean.geometry.is_valid.all() and np.isclose(clean.geometry.iloc[1].area, 0.5)
+    assert stats["repaired"] == 1 and stats["quarantined"] == 2
+    assert stats["reasons"]["Self-intersection"] == 2 and stats["reasons"]["Missing geometry"] == 1
+
+    quarantined = pd.read_parquet(tmp_path / "parcels.parquet")
+    assert list(quarantined["bbl"]) == ["3", "4"]
+    assert quarantined["qa_reason"].notna().all()
@@ -0,0 +1,59 @@
+"""
+Tests for pipeline stage instrumentation and run comparison.
+"""
+import json
+import time
+
+import numpy as np
+import pytest
+
+from nyc_bis_scraper.utils import instrumentation
+from nyc_bis_scraper.utils.instrumentation import compare_runs, instrument, load_runs, record_http
+
+
+def test_stage_record_written_with_metrics(tmp_path, monkeypatch):
+    monkeypatch.setenv(instrumentation.RUN_ID_ENV, "run-1")
+    log = tmp_path / "runs.jsonl"
+    with instrument("permits.extract", log_path=log) as m:
+        record_http(1_000)
+        record_http(500)
+        m["rows_out"] = 42
+
+    record = json.loads(log.read_text())
+    assert record["run_id"] == "run-1"
+    assert record["rows_out"] == 42
+    assert record["http_requests"] == 2 and record["bytes_downloaded"] == 1_500
+    assert record["status"] == "ok" and record["wall_s"] >= 0 and record["peak_rss_mb"] > 0
+
+
+def test_peak_rss_is_per_stage(tmp_path):
+    log = tmp_path / "runs.jsonl"
+    with instrument("master.merge", log_path=log):
+        big = np.ones(40_000_000)  # 320 MB, touched
+        time.sleep(0.2)
+    del big
+    with instrument("scores", log_path=log):
+        time.sleep(0.2)
+
+    merge, scores = [json.loads(line) for line in log.read_text().splitlines()]
+    assert merge["peak_rss_mb"] - scores["peak_rss_mb"] > 200
+
+
+def test_failed_stage_is_logged_and_reraised(tmp_path):
+    log = tmp_path / "runs.jsonl"
+    with pytest.raises(RuntimeError):
+        with instrument("parcels.load", log_path=log):
+            raise RuntimeError("db down")
+    assert json.loads(log.read_text())["status"] == "failed"
+
+
+def test_compare_flags_request_count_regression(tmp_path, monkeypatch):
+    log = tmp_path / "runs.jsonl"
+    for run_id, requests in (("r1", 10), ("r2", 11), ("r3", 22)):
+        monkeypatch.setenv(instrumentation.RUN_ID_ENV, run_id)
+        with instrument("footprints.extract", log_path=log):
+            record_http(100, requests=requests)
+
+    rows = compare_runs(load_runs(log))
+    assert rows[0]["http_requests"] == (22, 11)
+    assert "http_requests" in rows[0]["regressions"]
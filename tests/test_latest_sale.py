@@ -0,0 +1,50 @@
+"""
+Tests for the sort-free latest / previous sale aggregation.
+"""
+import numpy as np
+import pandas as pd
+
+from etl.transform.latest_sale import latest_sales
+
+
+def test_latest_and_previous_sale_per_lot():
+    sales = pd.DataFrame({
+        "BBL": ["3000010001", "3000010001", "3000010001.0", "3000010002", "3000010003", None],
+        "SALE DATE": ["2021-05-01", "2023-02-01", "2022-01-15", "2020-01-01", None, "2024-01-01"],
+        "SALE PRICE": ["500000", "900000", "0", "750000", "1", "2"],
+    })
+    out = latest_sales(sales).set_index("BBL")
+
+    assert list(out.index) == [3000010001, 3000010002]  # no date / no key: ignored
+    flip = out.loc[3000010001]
+    assert flip["SALE DATE"] == pd.Timestamp("2023-02-01") and flip["SALE PRICE"] == 900000
+    assert flip["previous_sale_date"] == pd.Timestamp("2022-01-15") and flip["previous_sale_price"] == 0
+    assert flip["sale_price_delta"] == 900000 and flip["days_since_previous_sale"] == 382
+
+    single = out.loc[3000010002]
+    assert pd.isna(single["previous_sale_date"]) and pd.isna(single["sale_price_delta"])
+
+
+def test_matches_sort_then_groupby_last():
+    rng = np.random.default_rng(7)
+    n = 20_000
+    sales = pd.DataFrame({
+        "BBL": 3_000_000_000 + rng.integers(0, 3_000, n),
+        "SALE DATE": pd.Timestamp("2019-01-01") + pd.to_timedelta(rng.integers(0, 400, n), unit="D"),
+        "SALE PRICE": rng.integers(0, 10, n).astype(float),
+    })
+    sales.loc[rng.random(n) < 0.05, "SALE DATE"] = pd.NaT
+
+    ordered = sales.dropna(subset=["SALE DATE"]).sort_values("SALE DATE", kind="stable")
+    expected = ordered.groupby("BBL").tail(2).groupby("BBL")
+    out = latest_sales(sales).set_index("BBL").sort_index()
+
+    last = expected.last()
+    assert (out["SALE DATE"].to_numpy() == last["SALE DATE"].to_numpy()).all()
+    # Same-day ties resolve to the later row, as a stable sort + last() does
+    assert (out["SALE PRICE"].to_numpy() == last["SALE PRICE"].to_numpy()).all()
+    first = expected.first()
+    has_previous = expected.size() > 1
+    assert (out["previous_sale_date"].notna().to_numpy() == has_previous.to_numpy()).all()
+    assert (out.loc[has_previous.to_numpy(), "previous_sale_date"].to_numpy()
+            == first.loc[has_previous, "SALE DATE"].to_numpy()).all()
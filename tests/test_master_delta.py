@@ -0,0 +1,116 @@
+"""
+Tests for incremental master rebuilds.
+"""
+import pandas as pd
+from pandas.testing import assert_frame_equal
+
+from etl.load.master_delta import MasterState, changed_keys, key_hashes, patch_master, state_dir
+from etl.load.master_store import write_master_store
+from nyc_bis_scraper.scripts.mergers.property_data_merger import merge_property_data
+
+BASE = pd.DataFrame({
+    "BIN": ["3000001", "3000002", "3000003", "3000004"],
+    "BBL": ["3000010001", "3000010001", "3000010002", "3000010003"],
+    "Address": ["1 A ST", "1 A ST", "2 A ST", "3 A ST"],
+})
+PERMITS = pd.DataFrame({"BIN": ["3000001", "3000003"], "job__": ["J1", "J3"]})
+SALES = pd.DataFrame({"BBL": ["3000010001", "3000010002"], "SALE DATE": ["2022-01-01", "2023-01-01"],
+                      "SALE PRICE": ["100", "200"]})
+
+
+def write_inputs(tmp_path, base, permits, sales):
+    paths = [str(tmp_path / f"{name}.csv") for name in ("base", "permits", "sales")]
+    for frame, path in zip((base, permits, sales), paths):
+        frame.to_csv(path, index=False)
+    return paths
+
+
+def test_changed_keys_covers_inserts_updates_and_deletes():
+    old = key_hashes(pd.DataFrame({"BIN": ["1", "2", "3"], "jobs": ["a", "b", "c"]}), "BIN")
+    new = key_hashes(pd.DataFrame({"BIN": ["2", "3", "4"], "jobs": ["b", "x", "d"]}), "BIN")
+    assert sorted(changed_keys(new, old)) == ["1", "3", "4"]
+
+
+def test_incremental_build_only_recomputes_changed_rows(tmp_path, capsys):
+    output = str(tmp_path / "properties_master.csv")
+    merge_property_data(*write_inputs(tmp_path, BASE, PERMITS, SALES), output, incremental=True)
+    assert MasterState.load(str(tmp_path / "properties_master.feather")) is not None
+
+    # A new permit on building 3000004 only
+    permits = pd.concat([PERMITS, pd.DataFrame({"BIN": ["3000004"], "job__": ["J4"]})])
+    paths = write_inputs(tmp_path, BASE, permits, SALES)
+    capsys.readouterr()
+    merge_property_data(*paths, output, incremental=True)
+    assert "Reused 3 rows of the stored master, recomputed 1" in capsys.readouterr().out
+
+    # A new sale on lot 3000010001 (two buildings) and an edited parcel
+    sales = pd.concat([SALES, pd.DataFrame({"BBL": ["3000010001"], "SALE DATE": ["2024-01-01"],
+                                            "SALE PRICE": ["150"]})])
+    base = BASE.assign(Address=["1 A ST", "1 A ST", "2 B ST", "3 A ST"])
+    paths = write_inputs(tmp_path, base, permits, sales)
+    patched = merge_property_data(*paths, output, incremental=True)
+    assert "Reused 1 rows of the stored master, recomputed 3" in capsys.readouterr().out
+
+    full = merge_property_data(*paths, str(tmp_path / "full.csv"))
+    assert_frame_equal(patched, full)
+    assert patched.loc[3, "all_permits"] == "J4" and patched.loc[0, "previous_sale_price"] == 100
+    capsys.readouterr()
+
+    # Nothing changed: every row comes from the store
+    merge_property_data(*paths, output, incremental=True)
+    assert "Reused 4 rows of the stored master, recomputed 0" in capsys.readouterr().out
+
+
+def test_unchanged_inputs_with_state_plane_geometry_reuse_every_row(tmp_path, capsys):
+    # Parcels in EPSG:2263: nothing to recompute must not mean nothing to detect the CRS from
+    base = BASE.assign(geometry=[f"POLYGON (({x} 180000, {x + 50} 180000, {x + 50} 180050, {x} 180000))"
+                                 for x in (990000, 990100, 990200, 990300)])
+    output = str(tmp_path / "properties_master.csv")
+    paths = write_inputs(tmp_path, base, PERMITS, SALES)
+    first = merge_property_data(*paths, output, incremental=True)
+    assert first["geometry"].str.startswith("POLYGON ((-73.9").all()
+
+    capsys.readouterr()
+    again = merge_property_data(*paths, output, incremental=True)
+    assert "Reused 4 rows of the stored master, recomputed 0" in capsys.readouterr().out
+    assert_frame_equal(again, first)
+
+    # One changed parcel is reprojected with the CRS of the whole column
+    permits = pd.concat([PERMITS, pd.DataFrame({"BIN": ["3000004"], "job__": ["J4"]})])
+    patched = merge_property_data(*write_inputs(tmp_path, base, permits, SALES), output, incremental=True)
+    assert patched["geometry"].tolist() == first["geometry"].tolist()
+
+
+def test_patched_shapely_geometry_is_read_back_from_wkb(tmp_path):
+    import shapely
+
+    base = BASE.assign(geometry=shapely.points(range(4), range(4)))
+    store_path = str(tmp_path / "properties_master.feather")
+    sales = SALES.drop(columns=["SALE PRICE"])
+
+    def patch(permits):
+        def merge_rows(rows):
+            return rows.merge(permits, on="BIN", how="left").merge(sales, on="BBL", how="left")
+        return patch_master(base, permits, sales, store_path, merge_rows)
+
+    master, state, _ = patch(PERMITS)
+    state.save(store_path, write_master_store(master, store_path))
+
+    master, _, stats = patch(pd.concat([PERMITS, pd.DataFrame({"BIN": ["3000004"], "job__": ["J4"]})]))
+    assert stats["reused"] == 3 and stats["recomputed"] == 1
+    assert all(isinstance(g, shapely.Point) for g in master["geometry"])
+    assert shapely.get_x(master["geometry"].to_numpy(dtype=object)).tolist() == [0, 1, 2, 3]
+
+
+def test_stale_state_falls_back_to_a_full_build(tmp_path, capsys):
+    output = str(tmp_path / "properties_master.csv")
+    paths = write_inputs(tmp_path, BASE, PERMITS, SALES)
+    merge_property_data(*paths, output, incremental=True)
+    merge_property_data(*paths, output)  # rewrites the store, not the state
+    assert MasterState.load(str(tmp_path / "properties_master.feather")) is None
+
+    capsys.readouterr()
+    merge_property_data(*paths, output, incremental=True)
+    assert "recomputed 4" in capsys.readouterr().out
+    assert (tmp_path / "properties_master.state" / "rows.parquet").exists()
+    assert state_dir(output).endswith("properties_master.state")
@@ -0,0 +1,57 @@
+"""
+Tests for the memory-mapped, BBL-sorted master store.
+"""
+import numpy as np
+import pandas as pd
+import pytest
+import shapely
+from shapely.geometry import box
+
+from etl.load.master_store import MasterStore, keys_path, write_master_store
+
+
+@pytest.fixture
+def store_path(tmp_path):
+    master = pd.DataFrame({
+        "BBL": ["3012340056", "1000010001", "3012340056", "3012350001", None, "2000200030", "3012340001"],
+        "BIN": ["3000001", "1000001", "3000002", "3000003", "9999999", "2000001", "3000004"],
+        "LotArea": [2000, 5000, 2000, 1500, 10, 3000, 2500],
+        "geometry": [box(i, i, i + 1, i + 1) for i in range(7)],
+    })
+    path = str(tmp_path / "properties_master.feather")
+    write_master_store(master, path, chunk_size=3)
+    return path
+
+
+def test_store_is_sorted_and_lookup_returns_every_row_of_a_bbl(store_path):
+    store = MasterStore(store_path)
+    assert len(store) == 7
+    assert np.all(np.diff(store.keys) >= 0)
+
+    found = store.lookup(["3012340056", "2000200030.0", "4999999999"], columns=["BBL", "BIN"])
+    assert found.to_dict("records") == [
+        {"BBL": "2000200030", "BIN": "2000001"},
+        {"BBL": "3012340056", "BIN": "3000001"},
+        {"BBL": "3012340056", "BIN": "3000002"},
+    ]
+    assert store.lookup([]).empty
+
+
+def test_scan_by_borough_and_block_is_a_contiguous_slice(store_path):
+    store = MasterStore(store_path)
+    assert store.scan(3, block=1234)["BIN"].tolist() == ["3000004", "3000001", "3000002"]
+    assert store.scan(3)["BIN"].tolist() == ["3000004", "3000001", "3000002", "3000003"]
+    assert store.scan(5).empty
+
+
+def test_columns_and_geometry_come_back_without_parsing(store_path):
+    store = MasterStore(store_path)
+    assert store.column("LotArea").to_pylist()[-1] == 1500
+    geometry = shapely.from_wkb(store.take([1], columns=["geometry"])["geometry"].to_numpy())
+    assert shapely.equals(geometry[0], box(1, 1, 2, 2))
+
+
+def test_mismatched_index_is_rejected(store_path):
+    np.save(keys_path(store_path), np.arange(3, dtype="int64"))
+    with pytest.raises(ValueError, match="does not match"):
+        MasterStore(store_path)
@@ -0,0 +1,36 @@
+"""
+Tests for the vectorized permit job aggregation per BIN.
+"""
+import numpy as np
+import pandas as pd
+
+from etl.transform.permit_jobs import aggregate_jobs
+
+PERMITS = pd.DataFrame({
+    "BIN": ["1000002", "1000001", "1000001", "1000001", None, "1000003"],
+    "job__": ["C3", "B2", "A1", "B2", "D4", None],
+})
+
+
+def test_distinct_sorted_jobs_per_bin():
+    out = aggregate_jobs(PERMITS)
+    assert out["BIN"].tolist() == ["1000001", "1000002"]  # no key / no job: ignored
+    assert out["all_permits"].tolist() == ["A1;B2", "C3"]
+
+    as_list = aggregate_jobs(PERMITS, as_list=True)
+    assert [list(jobs) for jobs in as_list["all_permits"]] == [["A1", "B2"], ["C3"]]
+
+
+def test_matches_groupby_join():
+    rng = np.random.default_rng(3)
+    n = 20_000
+    permits = pd.DataFrame({
+        "BIN": (1_000_000 + rng.integers(0, 2_000, n)).astype(str),
+        "job__": (100_000 + rng.integers(0, 5_000, n)).astype(str),
+    })
+    expected = (permits.groupby("BIN")["job__"]
+                .agg(lambda jobs: ";".join(sorted(set(jobs)))).rename("all_permits").reset_index())
+    out = aggregate_jobs(permits)
+    assert out["BIN"].tolist() == expected["BIN"].tolist()
+    assert out["all_permits"].tolist() == expected["all_permits"].tolist()
+    assert aggregate_jobs(permits.iloc[:0]).empty
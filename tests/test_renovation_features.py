@@ -0,0 +1,109 @@
+"""
+Tests for the renovation-after-sale feature stage.
+"""
+import pandas as pd
+
+from etl.transform.renovation_features import (
+    add_lot_columns, compute_renovation_features, flag_properties, lots_for_bins, rebuild_lots,
+    update_renovation_features,
+)
+
+sales = pd.DataFrame({
+    'BBL': ['3000010001', '3000010001', '3000010002', '3000010003'],
+    'SALE DATE': ['2022-01-01', '2023-01-01', '2022-06-01', '2024-05-01'],
+    'SALE PRICE': ['900000', '1500000', '0', '2000000'],
+    'NEIGHBORHOOD': ['PARK SLOPE', 'PARK SLOPE', 'BUSHWICK', 'DUMBO'],
+})
+
+permits = pd.DataFrame({
+    'borough': ['BROOKLYN', 'BROOKLYN', 'BROOKLYN'],
+    'block': ['00001', '00001', '00001'],
+    'lot': ['00001', '00001', '00002'],
+    'bin__': ['3000001', '3000001', '3000002'],
+    'job__': ['J1', 'J2', 'J3'],
+    'issuance_date': ['2022-03-01', '2023-02-01', '2024-01-01'],
+})
+
+
+def test_first_permit_after_each_sale():
+    f = compute_renovation_features(sales, permits, as_of='2024-06-01')
+    first, second = f[f['BBL'] == 3000010001].itertuples(index=False)
+    assert first.permit_job == 'J1' and first.days_to_permit == 59
+    assert second.permit_job == 'J2' and second.days_to_permit == 31
+    assert f['renovation_after_sale'].tolist() == [True, True, False, False]
+
+
+def test_off_market_candidate_is_recent_unpermitted_sale():
+    f = compute_renovation_features(sales, permits, as_of='2024-06-01')
+    assert f.set_index('BBL')['off_market_candidate'].to_dict() == {
+        3000010001: False, 3000010002: False, 3000010003: True,
+    }
+
+
+def test_permit_after_next_sale_is_not_credited_to_earlier_sale():
+    late = permits[permits['job__'] == 'J2']
+    f = compute_renovation_features(sales, late, as_of='2024-06-01')
+    first = f[f['BBL'] == 3000010001].iloc[0]
+    assert pd.isna(first['permit_date'])
+
+
+def test_incremental_update_matches_full_rebuild():
+    base = compute_renovation_features(sales, permits.iloc[:1], as_of='2024-06-01')
+    updated = update_renovation_features(base, permits.iloc[1:], as_of='2024-06-01')
+    full = compute_renovation_features(sales, permits, as_of='2024-06-01')
+    pd.testing.assert_frame_equal(updated, full)
+
+
+def test_incremental_update_refreshes_off_market_for_every_row():
+    base = compute_renovation_features(sales, permits, as_of='2024-06-01')
+    assert base['off_market_candidate'].any()
+    # No new permit touches a sold lot; a year later no sale is recent any more
+    unrelated = permits.iloc[:1].assign(lot='00009')
+    later = update_renovation_features(base, unrelated, as_of='2025-06-01')
+    assert not later['off_market_candidate'].any()
+
+    updated = update_renovation_features(base, permits.iloc[1:], as_of='2025-06-01')
+    pd.testing.assert_frame_equal(updated, compute_renovation_features(sales, permits, as_of='2025-06-01'))
+
+
+def test_flag_properties_uses_each_lots_latest_sale():
+    f = compute_renovation_features(sales, permits, as_of='2024-06-01')
+    master = pd.DataFrame({
+        'BIN': ['3000001', '3000002', '3000003', '3000004'],
+        'BBL': ['3000010001', '3000010002', '3000010003', '3000010009'],
+        'NEIGHBORHOOD': ['PARK SLOPE', 'BUSHWICK', 'DUMBO', None],
+    })
+    out = flag_properties(master, f)
+    assert out['NEIGHBORHOOD'].tolist() == master['NEIGHBORHOOD'].tolist()
+    assert out['off_market_candidate'].tolist() == [False, False, True, False]
+    assert out['renovation_after_sale'].tolist() == [True, False, False, False]
+    assert out['days_to_permit'].tolist()[:1] == [31]  # J2, after the 2023 sale
+    assert out['job_type'].isna().all() and str(out.loc[0, 'issuance_date'])[:10] == '2023-02-01'
+
+
+def test_lot_columns_come_from_the_master_by_bbl():
+    f = compute_renovation_features(sales, permits, as_of='2024-06-01')
+    master = pd.DataFrame({
+        'BIN': ['3000001', '3000005', '3000002'],
+        'BBL': ['3000010001.0', '3000010001', '3000010002'],  # two buildings on lot 1
+        'ZoneDist1': ['R6', 'R6', 'C4-4'],
+    })
+    out = add_lot_columns(f, master)
+    assert out['ZoneDist1'].fillna('-').tolist() == ['R6', 'R6', 'C4-4', '-']
+    # Re-attaching replaces the column, as incremental runs do
+    assert add_lot_columns(out, master)['ZoneDist1'].equals(out['ZoneDist1'])
+    assert list(add_lot_columns(f, master[['BBL']]).columns) == list(f.columns)
+
+
+def test_rebuild_lots_follows_buildings_moved_between_lots():
+    # BIS-style permits carry only the BIN: the lot comes from the footprints
+    by_bin = permits.drop(columns=['borough', 'block', 'lot'])
+    old_map = pd.DataFrame({'bin': ['3000001', '3000002'], 'bbl': ['3000010001', '3000010002']})
+    new_map = pd.DataFrame({'bin': ['3000001', '3000002'], 'bbl': ['3000010001', '3000010003']})
+    before = compute_renovation_features(sales, by_bin, bin_bbl=old_map, as_of='2024-06-01')
+
+    lots = lots_for_bins(before, [3000002], new_map)
+    assert sorted(lots) == [3000010002, 3000010003]
+    rebuilt = rebuild_lots(before, sales, by_bin, lots, bin_bbl=new_map, as_of='2024-06-01')
+    pd.testing.assert_frame_equal(
+        rebuilt, compute_renovation_features(sales, by_bin, bin_bbl=new_map, as_of='2024-06-01'))
@@ -0,0 +1,95 @@
+"""
+Tests for the KLL sketch and the streaming renovation statistics.
+"""
+import numpy as np
+import pandas as pd
+
+from nyc_bis_scraper.scripts.analysis import analyze_renovation_stats as stats_mod
+from nyc_bis_scraper.scripts.analysis.quantile_sketch import KLLSketch
+
+
+def test_sketch_quantiles_within_rank_error():
+    values = np.random.default_rng(0).exponential(200, 200_000)
+    sketch = KLLSketch(k=200, seed=1)
+    for chunk in np.array_split(values, 50):
+        sketch.update(chunk)
+    for q in (0.1, 0.5, 0.9):
+        rank = (values <= sketch.quantile(q)).mean()
+        assert abs(rank - q) < 0.02
+    assert sum(len(level) for level in sketch.levels) < 3 * 200
+
+
+def test_merged_sketches_cover_union():
+    rng = np.random.default_rng(2)
+    a, b = rng.uniform(0, 100, 50_000), rng.uniform(100, 200, 50_000)
+    left, right = KLLSketch(seed=3), KLLSketch(seed=4)
+    left.update(a)
+    right.update(b)
+    merged = left.merge(right)
+    assert merged.count == 100_000
+    assert abs(merged.quantile(0.5) - 100) < 3
+
+
+def test_partitioned_stats_match_single_pass(tmp_path, monkeypatch):
+    rng = np.random.default_rng(5)
+    n = 10_000
+    df = pd.DataFrame({
+        "days_to_permit": np.where(rng.random(n) < 0.3, rng.integers(0, 900, n), np.nan),
+        "SALE DATE": "2023-01-01",
+        "renovation_after_sale": rng.random(n) < 0.2,
+        "Borough": rng.choice(["BK", "MN", "QN"], n),
+        "NEIGHBORHOOD": rng.choice(["A", "B"], n),
+        "ZoneDist1": rng.choice(["R6", "C4-4"], n),
+    })
+    monkeypatch.setattr(stats_mod, "CHUNK_ROWS", 1_000)
+    paths = []
+    for i, start in enumerate(range(0, n, 4_000)):
+        part = df.iloc[start:start + 4_000]
+        paths.append(str(tmp_path / f"part{i}.csv"))
+        part.to_csv(paths[-1], index=False)
+
+    merged = stats_mod.merge_results([stats_mod.collect_stats(p) for p in paths])
+    overall = merged["overall"]
+    assert overall.total_sales == n
+    assert overall.sales_with_permits == df["days_to_permit"].notna().sum()
+    assert overall.renovated == df["renovation_after_sale"].sum()
+    assert overall.histogram.sum() == overall.sales_with_permits
+    assert merged["borough"]["BK"].total_sales == (df["Borough"] == "BK").sum()
+
+
+def test_gaps_past_ten_years_land_in_the_overflow_bin():
+    stats = stats_mod.RenovationStats()
+    days = np.array([10.0, 3659.0, 3660.0, 5000.0, 20000.0, np.nan])
+    stats.update(days, np.ones(len(days), dtype=bool), np.zeros(len(days), dtype=bool))
+    assert stats.histogram.sum() == stats.sales_with_permits == 5
+    assert stats.histogram[-1] == 3
+    assert stats.histogram[0] == stats.histogram[-2] == 1
+
+
+def test_inputs_come_from_argv_or_config_not_the_runner(tmp_path, monkeypatch, capsys):
+    plotted = []
+    monkeypatch.setattr(stats_mod, "save_histogram", plotted.append)
+    path = str(tmp_path / "features.csv")
+    pd.DataFrame({"days_to_permit": [5, 40], "SALE DATE": "2023-01-01",
+                  "renovation_after_sale": [True, False]}).to_csv(path, index=False)
+    # The pipeline runner's own arguments must not be read as input paths
+    monkeypatch.setattr("sys.argv", ["run.py", "all", "--stage", "scores"])
+
+    stats_mod.main({"renovation_stats": {"inputs": [path]}})
+    assert "Total properties sold: 2" in capsys.readouterr().out
+    assert len(plotted) == 1
+
+    stats_mod.main(argv=[path, "--no-plot"])
+    assert "Sales that led to permits: 2" in capsys.readouterr().out
+    assert len(plotted) == 1
+
+
+def test_missing_group_column_is_reported(tmp_path, capsys):
+    path = str(tmp_path / "features.csv")
+    pd.DataFrame({"BBL": [3000010001], "days_to_permit": [5], "SALE DATE": "2023-01-01",
+                  "renovation_after_sale": [True], "NEIGHBORHOOD": ["DUMBO"]}).to_csv(path, index=False)
+    result = stats_mod.collect_stats(path)
+    out = capsys.readouterr().out
+    assert "no ZoneDist1 column; the zoning breakdown will be empty" in out
+    assert "Borough" not in out  # derived from the BBL
+    assert result["borough"]["BK"].total_sales == 1 and result["zoning"] == {}
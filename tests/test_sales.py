@@ -0,0 +1,94 @@
+"""
+Tests for the paged, streamed sales extraction, run against the local API stub.
+"""
+import pandas as pd
+import pytest
+
+from benchmarks.stub_server import make_server
+from benchmarks.synthetic import generate_dataset
+from etl.extract.scope import RunScope
+from nyc_bis_scraper.scripts.extractors import sales
+
+
+@pytest.fixture
+def stub(monkeypatch):
+    data = generate_dataset(scale=0.002, seed=3, geometry=False)
+    server, base_url, counts = make_server(data)
+    monkeypatch.setattr(sales, "SALES_URL", f"{base_url}/resource/{{resource_id}}.json")
+    # The stub applies the date window; start it at the first synthetic sale
+    yield data, RunScope.from_values(start_date=data["sales"]["sale_date"].min())
+    server.shutdown()
+
+
+def _page_size(monkeypatch, size):
+    make_source = sales.sales_source
+
+    def small_pages(*args, **kwargs):
+        source = make_source(*args, **kwargs)
+        source.page_size = size
+        return source
+
+    monkeypatch.setattr(sales, "sales_source", small_pages)
+
+
+def test_write_sales_streams_every_page_with_typed_columns(stub, tmp_path, monkeypatch):
+    data, scope = stub
+    _page_size(monkeypatch, 300)
+    batches = []
+    to_frame = sales.to_sales_frame
+    monkeypatch.setattr(sales, "to_sales_frame", lambda df: batches.append(len(df)) or to_frame(df))
+
+    path = tmp_path / "sales.csv"
+    assert sales.write_sales(str(path), scope=scope) == len(data["sales"])
+    # Typed page by page, never as one frame
+    assert max(batches) == 300 and sum(batches) == len(data["sales"])
+
+    written = pd.read_csv(path, dtype={"BBL": str})
+    assert len(written) == len(data["sales"])
+    expected = (data["sales"]["borough"] + data["sales"]["block"].str.zfill(5)
+                + data["sales"]["lot"].str.zfill(4))
+    assert written["BBL"].tolist() == expected.tolist()
+    assert written["SALE PRICE"].tolist() == data["sales"]["sale_price"].astype(float).tolist()
+    assert pd.to_datetime(written["SALE DATE"]).notna().all()
+
+
+def test_fetch_sales_types_each_batch(stub, monkeypatch):
+    data, scope = stub
+    _page_size(monkeypatch, 250)
+    frame = sales.fetch_sales(scope=scope)
+    assert len(frame) == len(data["sales"])
+    assert frame["SALE DATE"].dtype.kind == "M" and frame["SALE PRICE"].dtype == float
+    assert frame["BBL"].str.len().eq(10).all()
+
+
+def test_store_refresh_and_csv_export_stream_page_by_page(stub, tmp_path, monkeypatch):
+    from etl.load.sales_store import SalesStore
+
+    data, scope = stub
+    _page_size(monkeypatch, 200)
+    batches = []
+    to_frame = sales.to_sales_frame
+    monkeypatch.setattr(sales, "to_sales_frame", lambda df: batches.append(len(df)) or to_frame(df))
+
+    store = SalesStore(str(tmp_path / "history"))
+    last_sale = pd.Timestamp(data["sales"]["sale_date"].max())
+    summary = store.refresh(sales.fetch_sales_pages, today=last_sale,
+                            history_days=(last_sale - pd.Timestamp(scope.start_date)).days + 31)
+    assert summary["fetched"] == len(data["sales"]) and max(batches) == 200
+    assert not (tmp_path / "history" / "_incoming").exists()
+
+    path = tmp_path / "sales.csv"
+    assert sales.export_sales_csv(store, str(path)) == len(data["sales"])
+    written = pd.read_csv(path, dtype={"BBL": str})
+    assert sorted(written["BBL"]) == sorted(data["sales"]["borough"] + data["sales"]["block"].str.zfill(5)
+                                            + data["sales"]["lot"].str.zfill(4))
+
+
+def test_to_sales_frame_accepts_borough_names_and_missing_values():
+    raw = pd.DataFrame({"borough": ["BROOKLYN", "3", None], "block": ["12", "00012", "1"],
+                        "lot": ["7", "7", "1"], "sale_date": ["2024-01-02T00:00:00.000", "bad", None],
+                        "sale_price": ["1,000", "900000", None]})
+    out = sales.to_sales_frame(raw)
+    assert out["BBL"].tolist()[:2] == ["3000120007", "3000120007"] and pd.isna(out["BBL"].iloc[2])
+    assert out["SALE DATE"].isna().tolist() == [False, True, True]
+    assert out["SALE PRICE"].iloc[1] == 900000.0
@@ -0,0 +1,102 @@
+"""
+Tests for the month-partitioned, incrementally refreshed sales store.
+"""
+import json
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from etl.load.sales_store import SalesStore
+
+
+def _sales(dates, bbls, price=100.0):
+    return pd.DataFrame({
+        "BBL": [str(b) for b in bbls],
+        "SALE DATE": pd.to_datetime(dates),
+        "SALE PRICE": price,
+        "NEIGHBORHOOD": "PARK SLOPE",
+    })
+
+
+class FakeSource:
+    """
+    Stands in for the sales API: returns the sales dated on/after start.
+    """
+
+    def __init__(self, sales):
+        self.sales = sales
+        self.starts = []
+
+    def __call__(self, start):
+        self.starts.append(start)
+        return self.sales[self.sales["SALE DATE"] >= start].copy()
+
+
+def test_refresh_downloads_only_after_the_last_complete_month(tmp_path):
+    rng = np.random.default_rng(0)
+    dates = pd.Timestamp("2024-01-01") + pd.to_timedelta(rng.integers(0, 180, 500), unit="D")
+    history = _sales(dates, 3000010000 + rng.integers(0, 50, 500))
+    source = FakeSource(history)
+    store = SalesStore(str(tmp_path / "sales"))
+
+    summary = store.refresh(source, today="2024-06-20", history_days=200)
+    assert source.starts == [pd.Timestamp("2023-12-01")]
+    assert store.months() == ["2024-01", "2024-02", "2024-03", "2024-04", "2024-05", "2024-06"]
+    assert store.manifest()["complete_through"] == "2024-05"
+    assert summary == {"start": "2023-12-01", "fetched": 500, "months_written": 7}
+
+    # A late-recorded May sale and a new July sale show up upstream
+    source.sales = pd.concat([history, _sales(["2024-05-28", "2024-07-02"], [3000020001, 3000020002], 7.0)])
+    store.refresh(source, today="2024-07-03", overlap_days=14)
+    assert source.starts[-1] == pd.Timestamp("2024-05-18")
+    assert store.manifest()["complete_through"] == "2024-06"
+
+    stored = store.read()
+    assert len(stored) == len(source.sales)  # the overlap replaced, not duplicated
+    assert set(stored.loc[stored["SALE PRICE"] == 7.0, "BBL"]) == {3000020001, 3000020002}
+    assert stored.groupby(stored["SALE DATE"].dt.to_period("M")).size().to_dict() == {
+        pd.Period(m, "M"): n for m, n in store.manifest()["months"].items()}
+
+
+def test_read_prunes_partitions_and_pushes_filters_down(tmp_path):
+    sales = _sales(["2024-01-05", "2024-02-10", "2024-03-15", "2024-03-20"],
+                   [3000010001, 3000010002, 3000010001, 3000010003])
+    store = SalesStore(str(tmp_path / "sales"))
+    store.refresh(FakeSource(sales), today="2024-03-31", history_days=100)
+
+    # January's file is unreadable: a window that excludes it never opens it
+    with open(tmp_path / "sales" / "sale_month=2024-01" / "part.parquet", "wb") as f:
+        f.write(b"not parquet")
+    window = store.read(columns=["BBL", "SALE DATE"], since="2024-02-10", until="2024-03-15")
+    assert window["BBL"].tolist() == [3000010002, 3000010001]
+    assert list(window.columns) == ["BBL", "SALE DATE"]
+
+    picked = store.read(columns=["BBL", "SALE PRICE"], since="2024-02-01", bbls=["3000010001"])
+    assert picked["BBL"].tolist() == [3000010001]
+
+
+def test_manifest_is_the_only_non_partition_file(tmp_path):
+    store = SalesStore(str(tmp_path / "sales"))
+    assert store.read().empty and store.months() == []
+    store.refresh(FakeSource(_sales(["2024-03-02"], [1000010001])), today="2024-03-05", history_days=10)
+    entries = sorted(os.listdir(tmp_path / "sales"))
+    assert entries == ["_manifest.json", "sale_month=2024-03"]
+    with open(tmp_path / "sales" / "_manifest.json") as f:
+        assert json.load(f)["months"] == {"2024-03": 1}
+
+
+def test_failed_pull_leaves_the_store_as_it_was(tmp_path):
+    store = SalesStore(str(tmp_path / "sales"))
+    store.refresh(FakeSource(_sales(["2024-03-02", "2024-03-20"], [1000010001, 1000010002])),
+                  today="2024-03-25", history_days=30)
+
+    def broken(start):
+        yield _sales(["2024-03-21"], [1000010003])
+        raise ConnectionError("page 2 failed")
+
+    with pytest.raises(ConnectionError):
+        store.refresh(broken, today="2024-03-26", history_days=30)
+    assert store.read()["BBL"].tolist() == [1000010001, 1000010002]
+    assert sorted(os.listdir(tmp_path / "sales")) == ["_manifest.json", "sale_month=2024-03"]
@@ -0,0 +1,105 @@
+"""
+Tests for the dependency-aware pipeline scheduler.
+"""
+import os
+import time
+
+import pytest
+
+from nyc_bis_scraper.scripts.pipeline.scheduler import build_graph, load_stages, run_stages
+
+SCRIPT = """
+import time
+from pathlib import Path
+time.sleep({sleep})
+for out in {outputs!r}:
+    Path(out).write_text("done")
+"""
+
+
+@pytest.fixture(autouse=True)
+def _run_in_tmp(tmp_path, monkeypatch):
+    # Stage runs append to the relative run log; keep it out of the repo
+    monkeypatch.chdir(tmp_path)
+
+
+def _stage(tmp_path, name, inputs=(), outputs=(), sleep=0.0, max_age=None):
+    outputs = [str(tmp_path / o) for o in outputs]
+    script = tmp_path / f"{name}.py"
+    script.write_text(SCRIPT.format(sleep=sleep, outputs=outputs))
+    stage = {"script": str(script), "inputs": [str(tmp_path / i) for i in inputs], "outputs": outputs}
+    if max_age is not None:
+        stage["max_age"] = max_age
+    return stage
+
+
+def test_graph_follows_inputs_and_rejects_cycles(tmp_path):
+    stages = load_stages({"stages": {
+        "a": _stage(tmp_path, "a", outputs=["a.csv"]),
+        "b": _stage(tmp_path, "b", outputs=["b.csv"]),
+        "merge": _stage(tmp_path, "merge", inputs=["a.csv", "b.csv"], outputs=["m.csv"]),
+    }})
+    assert build_graph(stages) == {"a": set(), "b": set(), "merge": {"a", "b"}}
+
+    cyclic = load_stages({"stages": {
+        "x": _stage(tmp_path, "x", inputs=["y.csv"], outputs=["x.csv"]),
+        "y": _stage(tmp_path, "y", inputs=["x.csv"], outputs=["y.csv"]),
+    }})
+    with pytest.raises(ValueError, match="cycle"):
+        build_graph(cyclic)
+
+
+def test_independent_stages_run_in_parallel_then_skip_when_fresh(tmp_path):
+    stages = load_stages({"stages": {
+        "a": _stage(tmp_path, "a", outputs=["a.csv"], sleep=1.0, max_age=1),
+        "b": _stage(tmp_path, "b", outputs=["b.csv"], sleep=1.0, max_age=1),
+        "merge": _stage(tmp_path, "merge", inputs=["a.csv", "b.csv"], outputs=["m.csv"]),
+    }})
+    start = time.time()
+    status = run_stages(stages, {}, jobs=2)
+    assert time.time() - start < 1.9
+    assert status == {"a": "ran", "b": "ran", "merge": "ran"}
+    assert os.path.exists(tmp_path / "m.csv")
+
+    assert set(run_stages(stages, {}, jobs=2).values()) == {"skipped"}
+
+    # A newer input makes only the downstream stage stale
+    os.utime(tmp_path / "a.csv", (time.time() + 5, time.time() + 5))
+    assert run_stages(stages, {}, jobs=2) == {"a": "skipped", "b": "skipped", "merge": "ran"}
+
+
+def test_source_stages_rerun_once_their_outputs_age_out(tmp_path):
+    stages = load_stages({"stages": {
+        "pull": _stage(tmp_path, "pull", outputs=["raw.csv"]),
+        "daily": _stage(tmp_path, "daily", outputs=["daily.csv"], max_age=24),
+        "merge": _stage(tmp_path, "merge", inputs=["daily.csv"], outputs=["m.csv"]),
+    }})
+    assert set(run_stages(stages, {}).values()) == {"ran"}
+
+    # No inputs and no max_age: nothing says the source is unchanged
+    assert run_stages(stages, {}) == {"pull": "ran", "daily": "skipped", "merge": "skipped"}
+
+    # A day later the pull is stale, and so is everything downstream of it
+    yesterday = time.time() - 25 * 3600
+    os.utime(tmp_path / "daily.csv", (yesterday, yesterday))
+    assert run_stages(stages, {}) == {"pull": "ran", "daily": "ran", "merge": "ran"}
+
+
+def test_failed_stage_blocks_dependents(tmp_path):
+    broken = tmp_path / "broken.py"
+    broken.write_text("raise RuntimeError('boom')")
+    stages = load_stages({"stages": {
+        "a": {"script": str(broken), "outputs": [str(tmp_path / "a.csv")]},
+        "merge": _stage(tmp_path, "merge", inputs=["a.csv"], outputs=["m.csv"]),
+    }})
+    assert run_stages(stages, {}, targets=["merge"]) == {"a": "failed", "merge": "blocked"}
+
+
+def test_shipped_stages_run_extractors_before_merges_and_scoring():
+    from nyc_bis_scraper.scripts.pipeline.run_pipeline import load_config
+
+    deps = build_graph(load_stages(load_config()))
+    assert {"footprints", "parcels", "permits", "sales"} <= deps["master"]
+    assert "master" in deps["renovation_features"]
+    assert "renovation_features" in deps["scores"]
+    assert {"renovation_features", "scores"} <= deps["renovation_map"]
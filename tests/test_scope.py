@@ -0,0 +1,66 @@
+"""
+Tests for RunScope filter translation and scoped extraction against the stub.
+"""
+import argparse
+
+import pytest
+
+from benchmarks.stub_server import make_server, point_extractors_at
+from benchmarks.synthetic import generate_dataset
+from etl.extract import fetch_footprints, fetch_permits, fetch_pluto
+from etl.extract.scope import RunScope, add_scope_arguments
+
+
+def test_from_values_normalizes_boroughs_dates_and_bbox():
+    scope = RunScope.from_values(["bk", "Manhattan", 3], "2024-01-05", "2024-03-31", "-74.1,40.6,-73.9,40.7")
+    assert scope.boroughs == (1, 3)
+    assert scope.start_date == "2024-01-05"
+    assert scope.bbox == (-74.1, 40.6, -73.9, 40.7)
+    assert not scope.is_citywide
+    assert RunScope().is_citywide
+
+    with pytest.raises(ValueError):
+        RunScope.from_values(["Jersey"])
+    with pytest.raises(ValueError):
+        RunScope.from_values(bbox=[1, 2, 0, 3])
+
+
+def test_scope_translates_to_each_filter_dialect():
+    scope = RunScope.from_values(["BK"], "2024-01-01", "2024-12-31", [-74.0, 40.6, -73.9, 40.7])
+    assert scope.socrata_where(date_field="issuance_date", geometry_field="location") == (
+        "(borough in ('BROOKLYN', '3')) AND "
+        "((issuance_date >= '2024-01-01T00:00:00') AND (issuance_date < '2025-01-01T00:00:00')) AND "
+        "(within_box(location, 40.7, -74.0, 40.6, -73.9))"
+    )
+    assert scope.odata_filter() == "startswith(base_bbl,'3')"
+    assert scope.arcgis_where() == "borough IN ('BK')"
+    assert scope.arcgis_geometry()["geometry"] == "-74.0,40.6,-73.9,40.7"
+    assert RunScope().arcgis_where() == "1=1"
+
+    # The scope's window replaces the default two-year permit lookback
+    where = fetch_permits.permits_source(scope=scope).params["$where"]
+    assert "EW" not in where and "2024-01-01" in where
+
+
+def test_cli_flags_override_config():
+    parser = add_scope_arguments(argparse.ArgumentParser())
+    args = parser.parse_args(["--borough", "QN", "--since", "2023-06-01"])
+    scope = RunScope.from_args(args, {"scope": {"boroughs": ["BK"], "end_date": "2023-12-31"}})
+    assert scope == RunScope((4,), "2023-06-01", "2023-12-31", None)
+
+
+def test_brooklyn_run_downloads_only_brooklyn():
+    data = generate_dataset(scale=0.002, seed=2)
+    server, base_url, _ = make_server(data)
+    try:
+        point_extractors_at(base_url)
+        scope = RunScope.from_values(["BROOKLYN"])
+        footprints = fetch_footprints.fetch_footprints(top=500, columns=["bin", "base_bbl"], scope=scope)
+        lots = fetch_pluto.fetch_pluto(top=400, columns=["bbl", "borough"], scope=scope)
+    finally:
+        server.shutdown()
+
+    assert len(footprints) == (data["footprints"]["BBL"] // 1_000_000_000 == 3).sum()
+    assert footprints["base_bbl"].str.startswith("3").all()
+    assert len(lots) == (data["lots"]["borough"] == 3).sum()
+    assert set(lots["borough"]) == {"BK"}
@@ -0,0 +1,74 @@
+"""
+Tests for the configurable lead-scoring engine.
+"""
+import numpy as np
+import pandas as pd
+
+from nyc_bis_scraper.scripts.analysis.score import build_feature_matrix, main, run_profiles, score, top_k
+
+FEATURES = {
+    "off_market": {"type": "flag", "column": "off_market_candidate"},
+    "price_over_1m": {"type": "threshold", "column": "SALE PRICE", "min": 1_000_000},
+    "residential_zoning": {"type": "prefix", "column": "ZoneDist1", "prefix": "R"},
+    "underbuilt_lot": {"type": "utilization", "max": 0.5, "default_far": 2.0},
+}
+
+frame = pd.DataFrame({
+    "off_market_candidate": ["True", "False", "True", np.nan],
+    "SALE PRICE": [1_500_000, 2_000_000, 500_000, np.nan],
+    "ZoneDist1": ["R6", "C4-4", "R5B", None],
+    "BldgArea": [1000, 9000, 4000, 100],
+    "LotArea": [2000, 2000, 2000, 2000],
+    "ResidFAR": [2.0, 4.0, np.nan, 0],
+    "SALE DATE": pd.to_datetime(["2023-01-01", "2023-05-01", "2024-01-01", None]),
+})
+
+
+def test_default_weights_match_original_score():
+    matrix, names = build_feature_matrix(frame, FEATURES)
+    weights = {"off_market": 2, "price_over_1m": 1, "residential_zoning": 1}
+    assert score(matrix, names, weights).tolist() == [4, 1, 3, 0]
+
+
+def test_utilization_uses_far_with_default_fallback():
+    matrix, names = build_feature_matrix(frame, FEATURES)
+    assert matrix[:, names.index("underbuilt_lot")].tolist() == [1, 0, 0, 1]
+
+
+def test_top_k_orders_by_score_then_newest_sale():
+    scores = np.array([2, 5, 2, 7, 2], dtype=np.float32)
+    dates = pd.to_datetime(["2020-01-01", "2021-01-01", "2022-01-01", "2019-01-01", None]).to_numpy()
+    assert top_k(scores, 4, tiebreak=dates).tolist() == [3, 1, 2, 0]
+    assert top_k(scores, 10, min_score=3).tolist() == [3, 1]
+
+
+def test_top_k_breaks_ties_at_the_cutoff_by_newest_sale():
+    # Every row ties at the k-th score: the sale date decides who makes the cut
+    scores = np.ones(1000, dtype=np.float32)
+    dates = (np.datetime64("2020-01-01") + np.arange(1000)).astype("datetime64[ns]")
+    assert top_k(scores, 5, tiebreak=dates).tolist() == [999, 998, 997, 996, 995]
+
+    # One row above the tie, four slots left among the tied rows
+    scores[10] = 2
+    assert top_k(scores, 5, tiebreak=dates).tolist() == [10, 999, 998, 997, 996]
+    assert top_k(scores, 3).tolist() == [10, 0, 1]
+
+
+def test_profiles_share_one_feature_matrix():
+    config = {
+        "features": FEATURES,
+        "top_k": 2,
+        "min_score": 1,
+        "profiles": {"default": {"off_market": 2, "price_over_1m": 1}, "dev": {"underbuilt_lot": 1}},
+    }
+    leads = run_profiles(frame, config)
+    assert leads["default"]["lead_score"].tolist() == [3, 2]
+    assert leads["dev"].index.tolist() == [0, 3]
+
+
+def test_output_may_be_a_bare_filename(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    frame.to_csv("flags.csv", index=False)
+    main({"scoring": {"input": "flags.csv", "output": "leads.csv", "features": FEATURES, "top_k": 2,
+                      "min_score": 1, "profiles": {"default": {"off_market": 2, "price_over_1m": 1}}}})
+    assert pd.read_csv(tmp_path / "leads.csv")["lead_score"].tolist() == [3, 2]
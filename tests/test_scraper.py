@@ -0,0 +1,134 @@
+"""
+Tests for the concurrent, cached cost-guide scraper against a local
+HTTP server with ETag support.
+"""
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pandas as pd
+import pytest
+
+from etl.extract import scraper
+from etl.extract.scraper import parse_page, scrape_sites
+from nyc_bis_scraper.scripts.extractors.construction_webscraper import scrape_cost_guides
+
+PAGE = """
+<html><body>
+  <div><h2 class="Type_title3___voqu">New home, per sq ft</h2></div>
+  <div class="mb4"><span class="b">$150 - $400</span></div>
+  <div><h2 class="Type_title3___voqu">Permit fees</h2></div>
+  <p>Varies by town.</p>
+  <div><h2 class="Type_title3___voqu">Site prep</h2></div>
+  <p>Usually $1,500 to $5,000.</p>
+  <ul class="flex-column stack_root">
+    <li><span>Land survey fee</span><span>$400</span></li>
+    <li><span>n/a</span></li>
+  </ul>
+</body></html>
+"""
+
+EXTRACTORS = [
+    {"items": ".Type_title3___voqu", "required": ["quote_text"],
+     "fields": {"job_type": {"selector": ""}, "quote_text": {"after": "div.mb4 span.b, p", "contains": "$"}}},
+    {"items": "ul[class*=flex-column][class*=stack_root] li", "required": ["quote_text"],
+     "fields": {"job_type": {"selector": "span", "not_contains": "$", "min_length": 6, "all": True},
+                "quote_text": {"selector": "span", "contains": "$"}}},
+]
+
+
+def test_extractors_follow_items_but_not_into_the_next_one():
+    records = parse_page(PAGE, EXTRACTORS)
+    assert [(r["job_type"], r["quote_text"]) for r in records] == [
+        ("New home, per sq ft", "$150 - $400"),
+        # "Permit fees" has no "$" line before the next heading: dropped
+        ("Site prep", "Usually $1,500 to $5,000."),
+        ("Land survey fee", "$400"),
+    ]
+    assert [r["item_number"] for r in records] == [1, 2, 3]
+
+
+@pytest.fixture
+def site_server():
+    state = {"requests": 0, "not_modified": 0, "active": 0, "max_active": 0}
+    lock = threading.Lock()
+
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def do_GET(self):
+            with lock:
+                state["requests"] += 1
+                state["active"] += 1
+                state["max_active"] = max(state["max_active"], state["active"])
+            time.sleep(0.05)
+            etag = f'"{self.path}-v1"'
+            with lock:
+                state["active"] -= 1
+            if self.headers.get("If-None-Match") == etag:
+                state["not_modified"] += 1
+                self.send_response(304)
+                self.end_headers()
+                return
+            body = PAGE.encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("ETag", etag)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}", state
+    server.shutdown()
+
+
+def test_pages_are_throttled_per_host_and_revalidated_from_cache(site_server, tmp_path, monkeypatch):
+    base_url, state = site_server
+    sites = [{"name": "guide", "urls": [f"{base_url}/p/{i}" for i in range(6)], "extractors": EXTRACTORS}]
+    scraping = {"sites": sites, "cache_dir": str(tmp_path / "cache"), "max_per_host": 2, "delay_seconds": 0}
+
+    output = tmp_path / "costs.csv"
+    assert scrape_cost_guides(scraping, output) == 18
+    assert state["max_active"] <= 2
+    costs = pd.read_csv(output).drop_duplicates(["job_type"])
+    assert costs[["cost_low", "cost_high"]].values.tolist() == [[150, 400], [1500, 5000], [400, 400]]
+
+    # Second run: every page answers 304 and nothing is parsed again
+    parses = []
+    monkeypatch.setattr(scraper, "parse_page", lambda *a: parses.append(a) or [])
+    pages = []
+    summary = scrape_sites(sites, lambda site, url, records: pages.append(len(records)),
+                           cache_dir=scraping["cache_dir"], delay_seconds=0)
+    assert summary == {"not_modified": 6}
+    assert state["not_modified"] == 6 and not parses
+    assert pages == [3] * 6
+
+    # Changing an extractor invalidates the cached records
+    sites[0]["extractors"] = EXTRACTORS[:1]
+    summary = scrape_sites(sites, lambda *a: None, cache_dir=scraping["cache_dir"], delay_seconds=0)
+    assert summary == {"parsed": 6} and len(parses) == 6
+
+
+def test_failed_scrape_keeps_the_last_good_output(site_server, tmp_path, monkeypatch):
+    base_url, _ = site_server
+    sites = [{"name": "guide", "urls": [f"{base_url}/p/0"], "extractors": EXTRACTORS}]
+    output = tmp_path / "costs.csv"
+    assert scrape_cost_guides({"sites": sites, "cache_dir": str(tmp_path / "cache"), "delay_seconds": 0}, output) == 3
+    good = output.read_text()
+
+    # Blocked: every page fails and nothing is cached to fall back on
+    sites[0]["urls"] = ["http://127.0.0.1:9/p/0"]
+    assert scrape_cost_guides({"sites": sites, "cache_dir": str(tmp_path / "empty"), "delay_seconds": 0}, output) == 0
+    assert output.read_text() == good
+
+    def crash(*args, **kwargs):
+        raise RuntimeError("interrupted")
+
+    monkeypatch.setattr(scraper, "scrape_sites", crash)
+    with pytest.raises(RuntimeError):
+        scrape_cost_guides({"sites": sites}, output)
+    assert output.read_text() == good
+    assert not output.with_suffix(".tmp").exists()
@@ -0,0 +1,112 @@
+"""
+Tests for snapshot hashing, diffing and manifest bookkeeping.
+"""
+import geopandas as gpd
+import pandas as pd
+from shapely.geometry import Point, box
+
+from etl.transform.geometry_qa import geometry_qa
+from etl.transform.snapshot_diff import (
+    SnapshotDiff, clear_changes, diff_snapshots, load_changed_keys, load_manifest, merge_manifest, quarantined_keys,
+    record_hashes, restrict_to_boroughs, save_changes, save_manifest,
+)
+
+
+def _footprints(rows):
+    return gpd.GeoDataFrame(
+        [{"bin": b, "base_bbl": bbl, "geometry": geom} for b, bbl, geom in rows],
+        geometry="geometry", crs="EPSG:4326",
+    )
+
+
+def test_diff_finds_inserts_updates_and_deletes():
+    old = _footprints([
+        ("3000001", "3000010001", box(0, 0, 1, 1)),
+        ("3000002", "3000010002", box(1, 1, 2, 2)),
+        ("3000003", "3000010003", box(2, 2, 3, 3)),
+    ])
+    new = _footprints([
+        ("3000001", "3000010001", box(0, 0, 1, 1)),       # unchanged
+        ("3000002", "3000010002", box(1, 1, 2, 2.5)),     # geometry changed
+        ("3000004", "3000010004", box(4, 4, 5, 5)),       # new building
+    ])
+    diff = diff_snapshots(record_hashes(new, "bin"), record_hashes(old, "bin"))
+    assert list(diff.inserts) == [3000004]
+    assert list(diff.updates) == [3000002]
+    assert list(diff.deletes) == [3000003]
+
+
+def test_hash_ignores_representation_noise():
+    a = _footprints([("3000001", "3000010001", box(0, 0, 1, 1))])
+    # Same ring starting at another vertex, key with a CSV-style ".0"
+    b = _footprints([("3000001.0", "3000010001", box(0, 0, 1, 1).reverse())])
+    assert record_hashes(a, "bin").equals(record_hashes(b, "bin"))
+
+    c = a.assign(base_bbl="3000010009")
+    assert not record_hashes(a, "bin").equals(record_hashes(c, "bin"))
+
+
+def test_records_sharing_a_key_are_hashed_together():
+    # Placeholder BIN 3000000 on three lots
+    rows = [("3000000", "3000010001", box(0, 0, 1, 1)), ("3000000", "3000010002", box(1, 1, 2, 2)),
+            ("3000000", "3000010003", box(2, 2, 3, 3)), ("3000001", "3000010004", box(3, 3, 4, 4))]
+    old = record_hashes(_footprints(rows), "bin")
+    assert list(old.index) == [3000000, 3000001]
+    assert record_hashes(_footprints(rows[::-1]), "bin").equals(old)
+
+    # Only the first of the shared records changes
+    edited = [("3000000", "3000010009", box(0, 0, 1, 1))] + rows[1:]
+    assert list(diff_snapshots(record_hashes(_footprints(edited), "bin"), old).updates) == [3000000]
+
+
+def test_changes_accumulate_until_cleared(tmp_path):
+    path = str(tmp_path / "changes.parquet")
+    keys = (lambda *k: pd.Index(k, dtype="int64"))
+    save_changes(SnapshotDiff(keys(1), keys(2), keys()), path)
+    save_changes(SnapshotDiff(keys(3), keys(), keys(1)), path)  # a run later, not yet applied
+    assert sorted(load_changed_keys(path)) == [1, 2, 3]
+    assert list(load_changed_keys(path, changes=("delete",))) == [1]
+    clear_changes(path)
+    assert load_changed_keys(path) is None
+
+
+def test_scoped_run_keeps_other_boroughs(tmp_path):
+    old = pd.Series([1, 2, 3], index=pd.Index([1000001, 3000001, 3000002], name="key"), dtype="uint64")
+    new = pd.Series([2, 9], index=pd.Index([3000001, 3000005], name="key"), dtype="uint64")
+
+    diff = diff_snapshots(new, restrict_to_boroughs(old, (3,), key_digits=7))
+    assert diff.summary() == {"inserts": 1, "updates": 0, "deletes": 1}
+
+    merged = merge_manifest(old, new, diff)
+    assert list(merged.index) == [1000001, 3000001, 3000005]
+
+    save_manifest(merged, str(tmp_path / "manifest.parquet"))
+    assert load_manifest(str(tmp_path / "manifest.parquet")).equals(merged)
+    save_changes(diff, str(tmp_path / "changes.parquet"))
+    assert sorted(load_changed_keys(str(tmp_path / "changes.parquet"))) == [3000002, 3000005]
+    assert load_changed_keys(str(tmp_path / "missing.parquet")) is None
+
+
+def test_quarantined_keys_are_held_not_deleted(tmp_path):
+    first = _footprints([
+        ("3000001", "3000010001", box(0, 0, 1, 1)),
+        ("3000002", "3000010002", box(1, 1, 2, 2)),
+    ])
+    manifest = record_hashes(first, "bin")
+
+    # One run where the source sends a point for building 3000002
+    raw = _footprints([
+        ("3000001", "3000010001", box(0, 0, 1, 1)),
+        ("3000002", "3000010002", Point(1, 1)),
+    ])
+    clean, _ = geometry_qa(raw, "footprints", quarantine_dir=str(tmp_path))
+    held = quarantined_keys(raw, clean, "BIN")
+    assert list(held) == [3000002]
+    hashes = record_hashes(clean, "bin").drop(held, errors="ignore")
+    diff = diff_snapshots(hashes, manifest, held)
+    assert diff.summary() == {"inserts": 0, "updates": 0, "deletes": 0}
+    manifest = merge_manifest(manifest, hashes, diff)
+    assert manifest.loc[3000002] == record_hashes(first, "bin").loc[3000002]
+
+    # Fixed the next run, back as it was: nothing to reload
+    assert diff_snapshots(record_hashes(first, "bin"), manifest).summary() == {"inserts": 0, "updates": 0, "deletes": 0}
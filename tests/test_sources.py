@@ -0,0 +1,146 @@
+"""
+Tests for the shared paged dataset sources, run against the local API stub.
+"""
+import asyncio
+
+import aiohttp
+import pandas as pd
+import pytest
+
+from benchmarks.stub_server import ARCGIS_PATH, make_server
+from benchmarks.synthetic import generate_dataset
+from etl.extract.sources import ArcGISSource, ODataSource, RequestBudget, SocrataSource, fetch_all, union_columns
+
+
+@pytest.fixture(scope="module")
+def stub():
+    data = generate_dataset(scale=0.002, seed=1)
+    server, base_url, counts = make_server(data)
+    yield data, base_url, counts
+    server.shutdown()
+
+
+def test_sources_page_until_exhausted(stub):
+    data, base_url, counts = stub
+    permits = SocrataSource(f"{base_url}/resource/ipu4-2q9a.json", page_size=1000).fetch()
+    assert len(permits) == len(data["permits"])
+    assert permits["job__"].is_unique
+    # 6 pages of 1000 plus at most `prefetch` pages past the end
+    assert counts["/resource/ipu4-2q9a.json"] <= len(data["permits"]) // 1000 + 2
+
+
+def test_all_sources_stream_in_one_loop(stub):
+    data, base_url, _ = stub
+    frames = fetch_all({
+        "footprints": ODataSource(f"{base_url}/api/odata/v4/5zhs-2jue", page_size=500),
+        "pluto": ArcGISSource(f"{base_url}{ARCGIS_PATH}", page_size=400, out_fields=["bbl", "lotarea"]),
+        "sales": SocrataSource(f"{base_url}/resource/usep-8jbt.json", page_size=300),
+    })
+    assert len(frames["footprints"]) == len(data["footprints"])
+    assert "the_geom" in frames["footprints"].columns
+    assert list(frames["pluto"].columns) == ["bbl", "lotarea", "geometry"]
+    assert frames["pluto"]["geometry"].iloc[0]["rings"]
+    assert len(frames["sales"]) == len(data["sales"])
+
+
+def test_pages_capped_by_the_server_are_followed():
+    data = generate_dataset(scale=0.002, seed=1)
+    server, base_url, counts = make_server(data, max_page=700)
+    try:
+        # Every page comes back shorter than asked for: neither source stops early
+        lots = ArcGISSource(f"{base_url}{ARCGIS_PATH}", page_size=2000, out_fields=["bbl"], geometry=False).fetch()
+        assert len(lots) == len(data["lots"]) and lots["bbl"].is_unique
+        permits = SocrataSource(f"{base_url}/resource/ipu4-2q9a.json", page_size=1000).fetch()
+        assert len(permits) == len(data["permits"]) and permits["job__"].is_unique
+    finally:
+        server.shutdown()
+
+
+def test_dropped_connections_are_retried(capsys):
+    data = generate_dataset(scale=0.002, seed=1)
+    server, base_url, counts = make_server(data, drop_requests=3)
+    try:
+        sales = SocrataSource(f"{base_url}/resource/usep-8jbt.json", page_size=5000, prefetch=1).fetch()
+        assert len(sales) == len(data["sales"])
+        assert "ServerDisconnectedError" in capsys.readouterr().out
+
+        server.RequestHandlerClass.drops["left"] = 100
+        with pytest.raises(aiohttp.ClientError):
+            SocrataSource(f"{base_url}/resource/usep-8jbt.json", prefetch=1, retries=1).fetch()
+    finally:
+        server.shutdown()
+
+
+def test_offset_skips_leading_records(stub):
+    data, base_url, _ = stub
+    sales = SocrataSource(f"{base_url}/resource/usep-8jbt.json", page_size=300).fetch(offset=250)
+    assert len(sales) == len(data["sales"]) - 250
+
+
+def test_column_projection_is_pushed_down(stub):
+    data, base_url, _ = stub
+    from benchmarks.stub_server import point_extractors_at
+    from etl.extract import fetch_footprints, fetch_pluto
+    from etl.transform import bin_bb_mapper
+
+    point_extractors_at(base_url)
+    footprints = fetch_footprints.fetch_footprints(top=500, columns=bin_bb_mapper.REQUIRED_COLUMNS)
+    assert set(footprints.columns) == {"bin", "base_bbl", "the_geom", "geometry"}
+    assert len(bin_bb_mapper.extract_bin_bbl(footprints)) == len(data["footprints"])
+
+    lots = fetch_pluto.fetch_pluto(top=400, columns=["bbl", "lotarea"], geometry=False)
+    assert list(lots.columns) == ["bbl", "lotarea"]
+
+
+def test_union_columns_keeps_order_and_all_wins():
+    assert union_columns(["bin", "bbl"], ["bbl", "the_geom"]) == ["bin", "bbl", "the_geom"]
+    assert union_columns(["bin"], None) is None
+
+
+def test_request_budget_caps_requests_across_sources():
+    state = {"active": 0, "max_active": 0, "starts": []}
+
+    async def request(budget):
+        async with budget.request():
+            state["starts"].append(asyncio.get_running_loop().time())
+            state["active"] += 1
+            state["max_active"] = max(state["max_active"], state["active"])
+            await asyncio.sleep(0.02)
+            state["active"] -= 1
+
+    async def run():
+        budget = RequestBudget(max_in_flight=3, per_second=200)
+        await asyncio.gather(*(request(budget) for _ in range(12)))
+
+    asyncio.run(run())
+    assert state["max_active"] == 3
+    gaps = pd.Series(state["starts"]).diff().dropna()
+    assert (gaps >= 0.004).all()
+
+
+def test_borough_shards_stream_to_parquet_and_combine(stub, tmp_path):
+    data, base_url, counts = stub
+    from benchmarks.stub_server import point_extractors_at
+    from etl.extract.scope import RunScope
+    from nyc_bis_scraper.scripts.extractors import fetch_construction_jobs as jobs
+
+    point_extractors_at(base_url)
+    output = tmp_path / "construction_jobs.parquet"
+    rows = jobs.fetch_construction_jobs(RunScope(), output=str(output), shard_dir=str(tmp_path / "shards"),
+                                        page_size=500, max_in_flight=2)
+
+    expected = data["permits"]["borough"].str.lower().str.replace(" ", "_").value_counts()
+    assert rows == expected.to_dict()
+    for name, n in rows.items():
+        shard = pd.read_parquet(tmp_path / "shards" / f"construction_jobs_{name}.parquet")
+        assert len(shard) == n and shard["borough"].str.lower().str.replace(" ", "_").eq(name).all()
+
+    permits = pd.read_parquet(output)
+    assert list(permits.columns) == jobs.FIELDS
+    assert len(permits) == len(data["permits"]) and permits["job__"].is_unique
+    assert set(permits["job__"]) == set(data["permits"]["job__"])
+
+    # A borough scope pulls only that shard
+    rows = jobs.fetch_construction_jobs(RunScope.from_values(["BK"]), output=str(output),
+                                        shard_dir=str(tmp_path / "shards"), page_size=500)
+    assert list(rows) == ["brooklyn"] and len(pd.read_parquet(output)) == rows["brooklyn"]
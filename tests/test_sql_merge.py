@@ -0,0 +1,73 @@
+"""
+Tests for the DuckDB merge engine against the pandas merges.
+"""
+import numpy as np
+import pandas as pd
+import pytest
+from pandas.testing import assert_frame_equal
+
+pytest.importorskip("duckdb")
+
+from etl.transform.keys import bbl_to_str  # noqa: E402
+from etl.transform.latest_sale import latest_sales  # noqa: E402
+from etl.transform.permit_jobs import aggregate_jobs  # noqa: E402
+from etl.transform.sql_merge import join_master_sql, merge_master_sql  # noqa: E402
+
+
+def make_inputs(seed=5, n_lots=300):
+    rng = np.random.default_rng(seed)
+    lots = pd.DataFrame({
+        "BBL": [f"{3000010000 + i:010d}" for i in range(n_lots)],
+        "borough": "3",
+        "LotArea": rng.integers(1000, 5000, n_lots).astype(float),
+    })
+    footprints = pd.DataFrame({
+        "BIN": [f"{3000000 + i:07d}" for i in range(n_lots + 50)],
+        "BBL": lots["BBL"].sample(n_lots + 50, replace=True, random_state=seed).to_numpy(),
+        "borough": "BROOKLYN",
+    })
+    permits = pd.DataFrame({
+        "BIN": footprints["BIN"].sample(2_000, replace=True, random_state=seed).to_numpy(),
+        "job__": (100_000 + rng.integers(0, 800, 2_000)).astype(str),
+        "borough": "BROOKLYN",
+    })
+    sales = pd.DataFrame({
+        "BBL": lots["BBL"].sample(600, replace=True, random_state=seed).to_numpy(),
+        "SALE DATE": (pd.Timestamp("2020-01-01") + pd.to_timedelta(rng.integers(0, 60, 600), unit="D"))
+        .strftime("%Y-%m-%d"),
+        "SALE PRICE": rng.integers(0, 100, 600).astype(str),
+    })
+    return footprints, lots, permits, sales
+
+
+def test_merge_master_sql_matches_pandas(tmp_path):
+    footprints, lots, permits, sales = make_inputs()
+    base = footprints.merge(lots.drop(columns=["borough"]), on="BBL", how="left").astype(str)
+    permits_path, sales_path = tmp_path / "permits.csv", tmp_path / "sales.csv"
+    permits.to_csv(permits_path, index=False)
+    sales.to_csv(sales_path, index=False)
+
+    sales_agg = latest_sales(pd.read_csv(sales_path, dtype=str))
+    sales_agg["BBL"] = bbl_to_str(sales_agg["BBL"])
+    expected = (base.merge(aggregate_jobs(pd.read_csv(permits_path, dtype=str)), on="BIN", how="left")
+                .merge(sales_agg, on="BBL", how="left"))
+
+    out = merge_master_sql(base, str(permits_path), str(sales_path))
+    assert_frame_equal(out, expected)
+
+    as_list = merge_master_sql(base, permits, sales, permits_as_list=True)
+    jobs = as_list["all_permits"].dropna().map(";".join)
+    assert jobs.tolist() == expected["all_permits"].dropna().tolist()
+
+
+def test_join_master_sql_matches_pandas_joins():
+    from nyc_bis_scraper.scripts.mergers.build_master import join_master
+
+    footprints, lots, permits, sales = make_inputs()
+    lots["geometry"] = None
+    footprints.loc[:2, "BBL"] = None  # missing keys match each other in pandas
+    expected = join_master(footprints, lots, permits, sales)
+
+    out = join_master_sql(footprints, lots, permits, sales)
+    assert "borough_x" in out.columns and "borough_y" in out.columns
+    assert_frame_equal(out, expected)
@@ -0,0 +1,46 @@
+"""
+Tests that script modules import without heavy dependencies or side
+effects, and that script discovery does not execute anything.
+"""
+import pytest
+
+from benchmarks.import_time import probe_import, script_modules
+from nyc_bis_scraper.scripts.pipeline.run_pipeline import find_all_scripts, read_script_metadata
+
+
+@pytest.mark.parametrize("module", [
+    "nyc_bis_scraper.scripts.maps.Property_map",
+    "nyc_bis_scraper.scripts.maps.permits_map",
+    "nyc_bis_scraper.scripts.extractors.construction_webscraper",
+    "nyc_bis_scraper.scripts.mergers.build_master",
+    "nyc_bis_scraper.scripts.pipeline.run_pipeline",
+])
+def test_script_import_is_light_and_offline(module):
+    assert module in script_modules()
+    result = probe_import(module)
+    assert result["error"] is None
+    assert result["heavy"] == []
+
+
+def test_discovery_reads_metadata_without_running(tmp_path):
+    extractors = tmp_path / "scripts" / "extractors"
+    extractors.mkdir(parents=True)
+    marker = tmp_path / "ran.txt"
+    (extractors / "job.py").write_text(
+        '"""\nFetches things.\n\nLonger notes.\n"""\n'
+        f"open({str(marker)!r}, 'w').write('ran')\n"
+        "def main(config=None):\n    pass\n"
+    )
+
+    scripts = find_all_scripts(tmp_path)
+    assert scripts["extractors"] == [{
+        "name": "job", "path": str(extractors / "job.py"),
+        "description": "Fetches things", "has_main": True,
+    }]
+    assert not marker.exists()
+
+
+def test_metadata_skips_filename_line_and_detects_missing_main(tmp_path):
+    script = tmp_path / "legacy.py"
+    script.write_text('"""\nlegacy.py\n\nDoes the legacy thing. Then more.\n"""\nx = 1\n')
+    assert read_script_metadata(script) == {"description": "Does the legacy thing", "has_main": False}